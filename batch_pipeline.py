@@ -0,0 +1,127 @@
+import os
+import json
+import logging
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from data_upload import (DataUpload, TABDB_REQUIRED_COLUMNS, TABDB_COLUMN_RENAMES,
+                         PLAYDB_REQUIRED_COLUMNS, REQUESTDB_REQUIRED_COLUMNS)
+from data_Preprocessing import DataPreprocessing
+from data_engine import ENGINES, get_engine
+
+class BatchPipeline:
+    """
+    Runs the preprocessing pipeline over many venues/years at once.
+
+    A manifest lists one tabdb/playdb/requestdb triple per partition. Each partition is loaded,
+    cleaned, reshaped and merged in its own worker process, and the results are combined into one
+    dataset with provenance columns recording which partition every row came from.
+
+    Manifest format (JSON), with file paths relative to the manifest:
+
+        [{"partition": "dublin-2023", "tabdb": "dublin/tabdb.csv", "playdb": "dublin/playdb.csv",
+          "requestdb": "dublin/requestdb.csv", "venue": "Dublin"}, ...]
+
+    Extra keys such as "venue" are added as 'partition_<key>' columns.
+    """
+    SOURCE_KEYS = ['tabdb', 'playdb', 'requestdb']
+
+    def __init__(self, max_workers=None, engine='pandas'):
+        """
+        :param max_workers: Number of worker processes. Defaults to the number of CPUs.
+        :param engine: Name of the dataframe engine used in each worker (see data_engine.ENGINES).
+        """
+        self.max_workers = max_workers or os.cpu_count()
+        self.engine = engine
+
+    def load_manifest(self, manifest_path):
+        """
+        Reads a manifest and resolves its file paths.
+
+        :param manifest_path: Path of the JSON manifest.
+        :return: List of partition dictionaries.
+        """
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict):
+            manifest = manifest.get('partitions', [])
+
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        partitions = []
+        for i, entry in enumerate(manifest):
+            missing_keys = [key for key in self.SOURCE_KEYS if key not in entry]
+            if missing_keys:
+                raise ValueError(f"Manifest entry {i} is missing: {', '.join(missing_keys)}")
+            entry = dict(entry)
+            entry.setdefault('partition', f'partition_{i}')
+            for key in self.SOURCE_KEYS:
+                entry[key] = os.path.join(base_dir, entry[key])
+            partitions.append(entry)
+        logging.info(f"Loaded manifest with {len(partitions)} partitions from {manifest_path}.")
+        return partitions
+
+    def run(self, partitions):
+        """
+        Processes all partitions in parallel and combines the results.
+
+        :param partitions: List of partition dictionaries, as returned by load_manifest.
+        :return: Combined DataFrame with provenance columns.
+        """
+        workers = max(1, min(self.max_workers, len(partitions)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(partial(process_partition, engine=self.engine), partitions))
+        combined = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+        logging.info(f"Combined {len(partitions)} partitions into {len(combined)} rows using {workers} processes.")
+        return combined
+
+def _read_source(file_path, required_columns, column_renames=None):
+    """Loads a source CSV, raising instead of showing a dialog when it is invalid."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    df = pd.read_csv(file_path)
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"{file_path} is missing required columns: {', '.join(missing_columns)}")
+    if column_renames:
+        df = DataUpload().ensure_consistent_columns(df, column_renames)
+    return df
+
+def process_partition(partition, engine='pandas'):
+    """
+    Runs load, clean, reshape and merge for a single partition. Runs in a worker process.
+
+    :param partition: Partition dictionary with 'partition', 'tabdb', 'playdb' and 'requestdb' keys.
+    :param engine: Name of the dataframe engine to use.
+    :return: Combined and cleaned DataFrame for the partition, with provenance columns.
+    """
+    tab_db = _read_source(partition['tabdb'], TABDB_REQUIRED_COLUMNS, TABDB_COLUMN_RENAMES)
+    play_db = _read_source(partition['playdb'], PLAYDB_REQUIRED_COLUMNS)
+    request_db = _read_source(partition['requestdb'], REQUESTDB_REQUIRED_COLUMNS)
+
+    preprocessor = DataPreprocessing(get_engine(engine))
+    combined = preprocessor.preprocess_for_analysis(play_db=play_db, request_db=request_db, tab_db=tab_db)
+    combined = preprocessor.clean_data(combined)
+
+    combined['partition'] = partition['partition']
+    for key, value in partition.items():
+        if key not in BatchPipeline.SOURCE_KEYS and key != 'partition':
+            combined[f'partition_{key}'] = value
+    logging.info(f"Processed partition '{partition['partition']}' ({len(combined)} rows).")
+    return combined
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocess many tabdb/playdb/requestdb triples in parallel.")
+    parser.add_argument('manifest', help="JSON manifest listing the source files of each partition.")
+    parser.add_argument('-o', '--output', default='combined_dataset.csv', help="Path of the combined CSV to write.")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Number of worker processes.")
+    parser.add_argument('--engine', choices=list(ENGINES), default='pandas', help="Dataframe engine used for preprocessing.")
+    args = parser.parse_args()
+
+    pipeline = BatchPipeline(max_workers=args.workers, engine=args.engine)
+    combined = pipeline.run(pipeline.load_manifest(args.manifest))
+    combined.to_csv(args.output, index=False)
+    logging.info(f"Saved combined dataset to {args.output}.")
+
+if __name__ == "__main__":
+    main()
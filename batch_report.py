@@ -0,0 +1,138 @@
+import io
+import os
+import json
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use('Agg')  # Render without a display; must be set before pyplot is imported
+import matplotlib.pyplot as plt
+from pypdf import PdfWriter
+from data_snapshot import load_dataset
+from data_Visualisation_plots import DataVisualisation, BASIC_CHARTS, advanced_chart
+
+# Dataset loaded once per worker process by _init_worker
+_worker_data = None
+
+def _init_worker(data_path, snapshot_dir):
+    global _worker_data
+    _worker_data = load_dataset(data_path, snapshot_dir)
+
+def _render_chart(task):
+    """
+    Draws and rasterizes one chart in a worker process.
+
+    :param task: Tuple of (name, method, keyword arguments, 'pdf' or 'png').
+    :return: Tuple of (name, single-page PDF or PNG bytes, None), or (name, None, error) if the chart fails.
+    """
+    name, method, kwargs, fmt = task
+    fig = plt.figure()
+    try:
+        DataVisualisation().plot_chart(_worker_data.copy(deep=False), method, kwargs, fig)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt)
+        return name, buffer.getvalue(), None
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+    finally:
+        plt.close(fig)
+
+class BatchReport:
+    """
+    Renders the chart set to a multi-page PDF or a folder of PNGs without the GUI.
+
+    Charts are drawn and saved in parallel worker processes with the non-interactive Agg backend,
+    each worker loading the persisted combined dataset once; the parent only writes the PNGs or
+    concatenates the single-page PDFs. Nothing from Tk, pygame or tkcalendar
+    is imported, so the report can be produced by a scheduled job.
+    """
+    def __init__(self, data_path=None, snapshot_dir='session_snapshot', max_workers=None):
+        """
+        :param data_path: Combined dataset CSV. If None, the session snapshot is used.
+        :param snapshot_dir: Session snapshot directory saved by the GUI.
+        :param max_workers: Number of worker processes. Defaults to the number of CPUs.
+        """
+        self.data_path = data_path
+        self.snapshot_dir = snapshot_dir
+        self.max_workers = max_workers or os.cpu_count()
+
+    def charts_from_config(self, config=None):
+        """
+        Lists the charts to render.
+
+        :param config: Optional dictionary with 'basic' (true, or a list of basic chart names) and
+                       'advanced' (list of {"chart": ..., "group_by": ..., "column": ...}) entries.
+        :return: List of (name, method, keyword arguments).
+        """
+        config = config or {}
+        basic = config.get('basic', True)
+        charts = [chart for chart in BASIC_CHARTS if basic is True or (basic and chart[0] in basic)]
+        for entry in config.get('advanced', []):
+            charts.append(advanced_chart(entry['chart'], entry['group_by'], entry.get('column')))
+        return charts
+
+    def render(self, charts, fmt='pdf'):
+        """
+        Renders the charts in parallel.
+
+        :param charts: List of (name, method, keyword arguments).
+        :param fmt: 'pdf' to render each chart as a single-page PDF, or 'png'.
+        :return: List of (name, bytes) in the order given. Charts that fail are logged and left out.
+        """
+        workers = max(1, min(self.max_workers, len(charts)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.data_path, self.snapshot_dir)) as executor:
+            rendered = []
+            for name, data, error in executor.map(_render_chart, [(*chart, fmt) for chart in charts]):
+                if error is not None:
+                    logging.error(f"Error rendering chart '{name}': {error}")
+                else:
+                    rendered.append((name, data))
+                    logging.info(f"Rendered chart '{name}'.")
+        logging.info(f"Rendered {len(rendered)} of {len(charts)} charts using {workers} processes.")
+        return rendered
+
+    def save_pdf(self, pages, file_path):
+        """Concatenates the single-page PDFs rendered by render(charts, 'pdf') into one PDF."""
+        writer = PdfWriter()
+        for _, data in pages:
+            writer.append(io.BytesIO(data))
+        with open(file_path, 'wb') as f:
+            writer.write(f)
+        logging.info(f"Saved report to {file_path}.")
+
+    def save_png(self, images, output_dir):
+        """Writes the PNGs rendered by render(charts, 'png') to output_dir."""
+        os.makedirs(output_dir, exist_ok=True)
+        for i, (name, data) in enumerate(images, start=1):
+            file_name = f"{i:02d}_{''.join(ch if ch.isalnum() else '_' for ch in name)}.png"
+            with open(os.path.join(output_dir, file_name), 'wb') as f:
+                f.write(data)
+        logging.info(f"Saved {len(images)} charts to {output_dir}.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the chart report without the GUI.")
+    parser.add_argument('--data', default=None, help="Combined dataset CSV. Defaults to the session snapshot.")
+    parser.add_argument('--snapshot', default='session_snapshot', help="Session snapshot directory.")
+    parser.add_argument('--config', default=None, help="JSON file listing the basic and advanced charts to render.")
+    parser.add_argument('--format', choices=['pdf', 'png'], default='pdf', help="Output format.")
+    parser.add_argument('-o', '--output', default=None, help="PDF file or PNG directory to write.")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    report = BatchReport(args.data, args.snapshot, args.workers)
+    rendered = report.render(report.charts_from_config(config), args.format)
+    if args.format == 'pdf':
+        report.save_pdf(rendered, args.output or 'report.pdf')
+    else:
+        report.save_png(rendered, args.output or 'report')
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import pandas as pd
 import logging
+from data_engine import PandasEngine
 
 class DataPreprocessing:
-    def __init__(self):
-        pass
+    def __init__(self, engine=None):
+        """
+        :param engine: Dataframe engine from data_engine used for the heavy operations. Defaults to pandas.
+        """
+        self.engine = engine or PandasEngine()
 
     def clean_data(self, df):
         """Clean the input dataframe."""
@@ -45,12 +49,10 @@ class DataPreprocessing:
 
         # Handle dynamic date columns
         date_columns = [col for col in df.columns if col.isdigit()]
-        for col in date_columns:
-            if col in df.columns:
-            # Ensure consistent formatting and remove whitespace
-                df[col] = df[col].astype(str).str.strip()
-                df[col] = df[col].replace(replace_dict)
-                logging.info(f"Replaced values in date column '{col}' using replace_dict.")
+        if date_columns:
+            # Ensure consistent formatting, remove whitespace and replace codes
+            df = self.engine.replace_values(df, date_columns, replace_dict)
+            logging.info(f"Replaced values in {len(date_columns)} date columns using replace_dict.")
 
         return df
 
@@ -121,13 +123,14 @@ class DataPreprocessing:
         
         
         
-    def preprocess_for_analysis(self, play_db, request_db, tab_db):
+    def preprocess_for_analysis(self, play_db, request_db, tab_db, matcher=None):
         """
         Preprocess the data for analysis by cleaning and merging datasets.
 
         :param play_db: DataFrame for play database.
         :param request_db: DataFrame for request database.
         :param tab_db: DataFrame for tab database.
+        :param matcher: Optional FuzzyMatcher used to resolve play/request titles to tabdb titles.
         :return: Combined and cleaned DataFrame ready for analysis.
         """
         # Clean individual datasets
@@ -135,37 +138,51 @@ class DataPreprocessing:
         request_db = self.clean_data(request_db)
         tab_db = self.clean_data(tab_db)
 
+        # Resolve title variants (case, accents, version suffixes) to the tabdb titles
+        if matcher is not None:
+            play_db, request_db = matcher.resolve_sources(tab_db, play_db, request_db)
+
         # Melt datasets to create a 'dates' column
         play_db_melted = self._reshape_db(play_db, 'play')
         request_db_melted = self._reshape_db(request_db, 'requested')
 
         # Merge play_db and request_db on song, artist, and dates
-        combined_play_request = pd.merge(
+        combined_play_request = self._merge_play_request(play_db_melted, request_db_melted)
+
+        # Merge the combined play/request data with tab_db
+        combined_data = self._merge_with_tab(combined_play_request, tab_db)
+
+        # Add additional features for visualization
+        return self._add_features(combined_data)
+
+    def _merge_play_request(self, play_db_melted, request_db_melted):
+        """Merges the reshaped play and request datasets on song, artist, and dates."""
+        combined_play_request = self.engine.merge(
             play_db_melted, request_db_melted, on=['song', 'artist', 'dates'], how='outer'
         )
         logging.info("Combined play and request datasets.")
+        return combined_play_request
 
-        # Merge the combined play/request data with tab_db
-        combined_data = pd.merge(
+    def _merge_with_tab(self, combined_play_request, tab_db):
+        """Merges the combined play/request dataset with the tab dataset."""
+        combined_data = self.engine.merge(
             combined_play_request, tab_db, on=['song', 'artist'], how='left'
         )
         logging.info("Merged combined play/request dataset with tab data.")
+        return combined_data
 
-        # Add additional features for visualization
+    def _add_features(self, combined_data):
+        """Adds the integer 'year' and 'decade' columns used for visualization."""
         if 'year' in combined_data.columns:
             combined_data['year'] = combined_data['year'].astype('Int64')
             combined_data['decade'] = (combined_data['year'] // 10) * 10
             logging.info("Converted 'year' to integer and added 'decade' column based on 'year'.")
-
         return combined_data
 
 
     def _reshape_db(self, db, db_name):
         """Reshapes the play or request database for merging."""
-        melted_db = pd.melt(db, id_vars=['song', 'artist'], var_name='dates', value_name=f'{db_name}_value')
-        melted_db.dropna(subset=['dates'], inplace=True)
-        melted_db['dates'] = pd.to_datetime(melted_db['dates'], format='%Y%m%d', errors='coerce')
-        melted_db.dropna(subset=['dates'], inplace=True)
+        melted_db = self.engine.reshape(db, f'{db_name}_value', date_format='%Y%m%d')
         logging.info(f"Reshaped '{db_name}' dataset for merging.")
         return melted_db
 
@@ -1,8 +1,80 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
+from data_timeseries import WeeklySeries, lttb
+
+# The "Basic Charts" set: (name, DataVisualisation method, keyword arguments)
+BASIC_CHARTS = [
+    ("Histogram of Songs by Difficulty Level", 'plot_histogram', {'column': 'difficulty', 'title': "Histogram of Songs by Difficulty Level"}),
+    ("Histogram of Songs by Duration", 'plot_histogram', {'column': 'duration', 'title': "Histogram of Songs by Duration"}),
+    ("Bar Chart of Songs by Language", 'plot_bar_chart', {'column': 'language', 'title': "Bar Chart of Songs by Language"}),
+    ("Bar Chart of Songs by Source", 'plot_bar_chart', {'column': 'source', 'title': "Bar Chart of Songs by Source"}),
+    ("Bar Chart of Songs by Decade", 'plot_decade_bar', {}),
+    ("Cumulative Line Chart of Songs Played Each Tuesday", 'plot_cumulative_line', {}),
+    ("Pie Chart of Songs by Type of Performer", 'plot_pie_chart', {'column': 'type_of_performer', 'title': "Pie Chart of Songs by Type of Performer"}),
+]
+
+def advanced_chart(chart, group_by, column=None):
+    """
+    Returns the (name, method, keyword arguments) of an "Advanced Charts" selection.
+
+    :param chart: 'Bar Chart', 'Pie Chart', 'Line Chart' or 'Grouped Bar Chart'.
+    :param group_by: Categorical column to group by.
+    :param column: Categorical column counted within each group, for grouped bar charts.
+    """
+    name = f"{chart} by {group_by}"
+    if chart == "Bar Chart":
+        return name, 'plot_bar_chart', {'column': group_by, 'title': name}
+    if chart == "Pie Chart":
+        return name, 'plot_pie_chart', {'column': group_by, 'title': name}
+    if chart == "Line Chart":
+        return name, 'plot_cumulative_line', {'group_column': group_by}
+    if chart == "Grouped Bar Chart":
+        name = f"{column} by {group_by}"
+        return name, 'plot_grouped_bar_chart', {'categorical_column': column, 'group_column': group_by, 'title': name}
+    raise ValueError(f"Unknown chart type: {chart}")
 
 class DataVisualisation:
+    MAX_CATEGORIES = 20
+    OTHER_LABEL = 'Other'
+
+    def _collapse_categories(self, counts, top_n=None, coverage=None):
+        """
+        Keeps the most frequent categories and folds the rest into a single 'Other' entry,
+        so charts of high-cardinality columns stay readable and quick to draw.
+
+        :param counts: Series of counts indexed by category, sorted in descending order.
+        :param top_n: Maximum number of categories to keep. Defaults to MAX_CATEGORIES.
+        :param coverage: Optional fraction of all rows (e.g. 0.9) the kept categories should cover.
+        :return: Series of counts with at most top_n categories plus 'Other'.
+        """
+        if top_n is None:
+            top_n = self.MAX_CATEGORIES
+        keep = min(top_n, len(counts))
+        if coverage is not None and len(counts):
+            covered = counts.cumsum() / counts.sum()
+            keep = min(keep, int((covered < coverage).sum()) + 1)
+        if keep >= len(counts):
+            return counts
+        collapsed = counts.iloc[:keep].copy()
+        collapsed.index = collapsed.index.astype(object)  # A categorical index can't take the new label
+        # A real category may already be called 'Other'; add the remainder to it
+        collapsed[self.OTHER_LABEL] = collapsed.get(self.OTHER_LABEL, 0) + counts.iloc[keep:].sum()
+        return collapsed
+
+    def _collapse_column(self, series, top_n=None, coverage=None):
+        """Replaces the values of a column outside its most frequent categories with 'Other'."""
+        kept = self._collapse_categories(series.value_counts(), top_n, coverage).index
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if self.OTHER_LABEL not in series.cat.categories:
+                series = series.cat.add_categories([self.OTHER_LABEL])
+            return series.where(series.isin(kept), self.OTHER_LABEL).cat.remove_unused_categories()
+        return series.where(series.isin(kept), self.OTHER_LABEL)
+
+    def plot_chart(self, df, method, kwargs, fig, **extra):
+        """Draws a chart given as a method name and keyword arguments, as in BASIC_CHARTS."""
+        getattr(self, method)(df, fig=fig, **kwargs, **extra)
+
     def plot_histogram(self, df, column, title, fig):
         """Plots a histogram."""
         if column in df.columns:
@@ -15,11 +87,12 @@ class DataVisualisation:
         else:
             print(f"Error: Column '{column}' not found in DataFrame.")
 
-    def plot_bar_chart(self, df, column, title, fig):
-        """Plots a bar chart."""
+    def plot_bar_chart(self, df, column, title, fig, top_n=None, coverage=None):
+        """Plots a bar chart of the most frequent categories, with the rest shown as 'Other'."""
         if column in df.columns:
             plt.figure(fig.number)  # Set the current figure
-            sns.countplot(x=column, data=df, color='skyblue', edgecolor='black')
+            counts = self._collapse_categories(df[column].value_counts(), top_n, coverage)
+            plt.bar(counts.index.astype(str), counts.to_numpy(), color='skyblue', edgecolor='black')
             plt.title(title)
             plt.xlabel(column)
             plt.ylabel('Count')
@@ -27,11 +100,12 @@ class DataVisualisation:
         else:
             print(f"Error: Column '{column}' not found in DataFrame.")
 
-    def plot_pie_chart(self, df, column, title, fig):
-        """Plots a pie chart."""
+    def plot_pie_chart(self, df, column, title, fig, top_n=None, coverage=None):
+        """Plots a pie chart of the most frequent categories, with the rest shown as 'Other'."""
         if column in df.columns:
             plt.figure(fig.number)  # Set the current figure
-            df[column].value_counts().plot(kind='pie', autopct='%1.1f%%', startangle=90)
+            self._collapse_categories(df[column].value_counts(), top_n, coverage).plot(
+                kind='pie', autopct='%1.1f%%', startangle=90)
             plt.title(title)
             plt.ylabel('')  # Hide y-axis label for pie charts
         else:
@@ -41,34 +115,58 @@ class DataVisualisation:
         """Plots a bar chart of songs by decade."""
         if 'year' in df.columns:
             plt.figure(fig.number)  # Set the current figure
-            df['decade'] = (df['year'] // 10) * 10
-            df['decade'] = df['decade'].fillna('Unknown')
-            df['decade'].value_counts().sort_index().plot(kind='bar', title='Songs by Decade')
+            decade = (df['year'] // 10) * 10
+            # Sort the numeric decades before adding 'Unknown', as numbers and strings can't be compared
+            counts = decade.value_counts().sort_index()
+            counts.index = counts.index.astype(int).astype(str)
+            unknown = int(decade.isna().sum())
+            if unknown:
+                counts['Unknown'] = unknown
+            counts.plot(kind='bar', title='Songs by Decade')
             plt.xlabel('Decade')
             plt.ylabel('Count')
             plt.xticks(rotation=90)
         else:
             print(f"Error: Column 'year' not found in DataFrame.")
 
-    def plot_cumulative_line(self, df, fig):
-        """Plots a cumulative line chart of songs played."""
+    def plot_cumulative_line(self, df, fig, series=None, group_column=None, max_points=500):
+        """
+        Plots a cumulative line chart of songs played, with one line per group if group_column is given.
+
+        :param series: Pre-aggregated WeeklySeries to draw. If None, one is built from df.
+        :param max_points: Maximum number of points drawn per line; longer histories are downsampled.
+        """
         if 'dates' in df.columns:
             plt.figure(fig.number)  # Set the current figure
-            df['week'] = df['dates'].dt.to_period('W')
-            weekly_counts = df.groupby('week').size()
-            weekly_counts.cumsum().plot(kind='line', title='Cumulative Songs Played')
+            if series is None:
+                series = WeeklySeries(group_column)
+                series.update(df)
+            cumulative = series.cumulative()
+            x = cumulative.index.to_numpy()
+            x_numeric = x.astype('datetime64[ns]').astype('int64')
+            for col in cumulative.columns:
+                y = cumulative[col].to_numpy()
+                keep = lttb(x_numeric, y, max_points)
+                plt.plot(x[keep], y[keep], label=str(col))
+            if series.group_column:
+                plt.legend(title=series.group_column)
+                plt.title(f'Cumulative Songs Played by {series.group_column}')
+            else:
+                plt.title('Cumulative Songs Played')
             plt.xlabel('Week')
             plt.ylabel('Cumulative Songs Played')
             plt.xticks(rotation=90)
         else:
             print(f"Error: Column 'dates' not found in DataFrame.")
 
-    def plot_grouped_bar_chart(self, df, categorical_column, group_column, title, fig):
-        """Plots a grouped bar chart."""
+    def plot_grouped_bar_chart(self, df, categorical_column, group_column, title, fig, top_n=None, coverage=None):
+        """Plots a grouped bar chart, keeping the most frequent categories of both columns."""
         if categorical_column in df.columns and group_column in df.columns:
             plt.figure(fig.number)  # Set the current figure
-            grouped = df.groupby([group_column, categorical_column]).size().unstack(fill_value=0)
-            grouped.plot(kind="bar", stacked=True, figsize=(10, 6), title=title)
+            groups = self._collapse_column(df[group_column], top_n, coverage)
+            categories = self._collapse_column(df[categorical_column], top_n, coverage)
+            grouped = categories.groupby([groups, categories]).size().unstack(fill_value=0)
+            grouped.plot(kind="bar", stacked=True, ax=plt.gca(), title=title)
             plt.xlabel(group_column)
             plt.ylabel('Count')
             plt.xticks(rotation=90)
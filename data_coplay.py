@@ -0,0 +1,126 @@
+import math
+import heapq
+import logging
+from bisect import bisect_left, bisect_right
+from collections import Counter
+import pandas as pd
+from data_filtering import event_indicator, new_sessions
+
+class CoPlayIndex:
+    """
+    Answers "which songs are often played on the same Tuesday as X".
+
+    Keeps a sparse song x song co-play matrix (one Counter of neighbours per song) and, for
+    every song, the list of sessions it was played in. Adding a session costs the square of the
+    number of songs played that night, not of the catalog, and the top neighbours of a song are
+    recomputed only when one of its counts changed. Queries limited to a date range count the
+    co-plays from the song's own sessions in that range.
+
+    Neighbours are ranked by cosine similarity, co_plays / sqrt(plays(X) * plays(Y)), so songs
+    played every week don't come out as similar to everything.
+    """
+    def __init__(self, top_n=20, min_co_plays=2):
+        """
+        :param top_n: Number of neighbours precomputed per song.
+        :param min_co_plays: Minimum number of shared sessions for a song to count as a neighbour.
+        """
+        self.top_n = top_n
+        self.min_co_plays = min_co_plays
+        self.dates = []
+        self.songs = []
+        self._song_ids = {}
+        self._sessions = []
+        self._postings = []
+        self._co_plays = []
+        self._top = {}
+        self._dirty = set()
+
+    @staticmethod
+    def song_key(song, artist):
+        """Returns the name of a song as shown in queries."""
+        return f"{song} - {artist}"
+
+    def _song_id(self, key):
+        if key not in self._song_ids:
+            self._song_ids[key] = len(self.songs)
+            self.songs.append(key)
+            self._postings.append([])
+            self._co_plays.append(Counter())
+        return self._song_ids[key]
+
+    def update(self, df):
+        """
+        Adds the sessions in df that are newer than the latest session already indexed.
+
+        :param df: Combined DataFrame with 'song', 'artist', 'dates' and 'play_value' columns.
+        """
+        df, dates = new_sessions(df, self.dates[-1] if self.dates else None)
+        played = event_indicator(df['play_value']) > 0
+        if not played.any():
+            return
+
+        keys = (df['song'].astype(str) + ' - ' + df['artist'].astype(str))[played]
+        sessions = keys.groupby(dates[played]).unique()
+        for date, session_keys in sessions.items():
+            session = sorted({self._song_id(key) for key in session_keys})
+            session_index = len(self._sessions)
+            self.dates.append(pd.Timestamp(date))
+            self._sessions.append(session)
+            for song_id in session:
+                self._postings[song_id].append(session_index)
+                self._co_plays[song_id].update(other for other in session if other != song_id)
+            # A song's scores change when its own play count or a neighbour's does
+            self._dirty.update(session)
+            for song_id in session:
+                self._dirty.update(self._co_plays[song_id])
+        logging.info(f"Added {len(sessions)} sessions to the co-play index ({len(self.songs)} songs).")
+
+    def _neighbours(self, song_id, co_plays, plays, n):
+        """Picks the n best neighbours from a Counter of co-plays, given each song's play counts."""
+        candidates = ((other, count, count / math.sqrt(plays(song_id) * plays(other)))
+                      for other, count in co_plays.items() if count >= self.min_co_plays)
+        return heapq.nsmallest(n, candidates, key=lambda item: (-item[2], -item[1], self.songs[item[0]]))
+
+    def _refresh(self):
+        """Recomputes the top neighbours of the songs whose counts changed since the last query."""
+        plays = lambda song_id: len(self._postings[song_id])
+        for song_id in self._dirty:
+            self._top[song_id] = self._neighbours(song_id, self._co_plays[song_id], plays, self.top_n)
+        if self._dirty:
+            logging.info(f"Recomputed top {self.top_n} neighbours of {len(self._dirty)} songs.")
+        self._dirty = set()
+
+    def similar(self, song_key, n=None, start_date=None, end_date=None):
+        """
+        Returns the songs most often played on the same Tuesday as the given song.
+
+        :param song_key: Song name as returned by song_key, e.g. 'Jolene - Dolly Parton'.
+        :param n: Number of songs to return. Defaults to top_n.
+        :param start_date: Only count sessions from this date (inclusive).
+        :param end_date: Only count sessions up to this date (inclusive).
+        :return: DataFrame with 'song', 'co_plays' and 'score' columns.
+        """
+        if song_key not in self._song_ids:
+            raise ValueError(f"Song not found in the play data: {song_key}")
+        song_id = self._song_ids[song_key]
+        n = n or self.top_n
+
+        if start_date is None and end_date is None and n <= self.top_n:
+            self._refresh()
+            neighbours = self._top[song_id][:n]
+        else:
+            # Count co-plays and plays within the window from the song's own sessions
+            lo = bisect_left(self.dates, pd.Timestamp(start_date)) if start_date is not None else 0
+            hi = bisect_right(self.dates, pd.Timestamp(end_date)) if end_date is not None else len(self.dates)
+            postings = self._postings[song_id]
+            window = postings[bisect_left(postings, lo):bisect_left(postings, hi)]
+            co_plays = Counter()
+            for session_index in window:
+                co_plays.update(self._sessions[session_index])
+            del co_plays[song_id]
+            plays = lambda other: bisect_left(self._postings[other], hi) - bisect_left(self._postings[other], lo) \
+                if other != song_id else len(window)
+            neighbours = self._neighbours(song_id, co_plays, plays, n) if window else []
+
+        rows = [(self.songs[other], count, round(score, 3)) for other, count, score in neighbours]
+        return pd.DataFrame(rows, columns=['song', 'co_plays', 'score'])
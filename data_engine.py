@@ -0,0 +1,257 @@
+import logging
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:  # Optional dependency, only needed for the polars engine
+    pl = None
+
+# Dtype pandas gives strings converted with astype(str): object, or 'str' on newer pandas,
+# which also keeps missing values missing instead of turning them into 'nan'
+STRING_DTYPE = pd.Series(['']).astype(str).dtype
+ASTYPE_STR_KEEPS_NA = bool(pd.isna(pd.Series([np.nan], dtype=object).astype(str).iloc[0]))
+
+MISSING_EVENT_VALUES = ['Unknown', '?', 'nan', '', '0', '0.0']
+
+def event_indicator(series):
+    """
+    Converts a play or request value column into 1 where the song was played/requested and 0 otherwise.
+
+    :param series: 'play_value' or 'requested_value' column.
+    :return: Integer Series.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return (series.fillna(0) != 0).astype(int)
+    values = series.astype(str).str.strip()
+    return (series.notna() & ~values.isin(MISSING_EVENT_VALUES)).astype(int)
+
+class PandasEngine:
+    """
+    Reference engine: the eager pandas operations the pipeline has always used.
+
+    DataPreprocessing and DataFiltering hand their heavy stages (string replacement, melt,
+    merge, filtering, deduplication) to an engine. Other engines must return the same
+    DataFrames as this one, including row order, index and dtypes.
+    """
+    name = 'pandas'
+
+    def replace_values(self, df, columns, mapping):
+        """Converts columns to stripped strings and replaces values using mapping. Modifies df."""
+        for col in columns:
+            df[col] = df[col].astype(str).str.strip().replace(mapping)
+        return df
+
+    def reshape(self, db, value_name, date_format='%Y%m%d'):
+        """Melts the date columns of a play or request database into 'dates' and value_name columns."""
+        melted_db = pd.melt(db, id_vars=['song', 'artist'], var_name='dates', value_name=value_name)
+        melted_db.dropna(subset=['dates'], inplace=True)
+        melted_db['dates'] = pd.to_datetime(melted_db['dates'], format=date_format, errors='coerce')
+        melted_db.dropna(subset=['dates'], inplace=True)
+        return melted_db
+
+    def merge(self, left, right, on, how):
+        """Merges two DataFrames like pd.merge."""
+        return pd.merge(left, right, on=on, how=how)
+
+    def filter_mask(self, df, filters=None, date_range=None):
+        """Returns a boolean array of the rows matching column == value filters and a (start, end) date range."""
+        mask = np.ones(len(df), dtype=bool)
+        for col, value in (filters or {}).items():
+            if col in df.columns:
+                mask &= (df[col] == value).to_numpy()
+        if date_range and 'dates' in df.columns:
+            start_date, end_date = date_range
+            mask &= ((df['dates'] >= start_date) & (df['dates'] <= end_date)).to_numpy()
+        return mask
+
+    def standardize_text(self, df, columns):
+        """Lowercases and strips text columns. Modifies df."""
+        for col in columns:
+            df[col] = df[col].str.lower().str.strip()
+        return df
+
+    def drop_duplicates(self, df, subset=None):
+        """Drops duplicate rows, keeping the first. Modifies df."""
+        df.drop_duplicates(subset=subset, inplace=True)
+        return df
+
+    def count_events(self, df, columns):
+        """Returns, per row, the number of the given play/request columns that record an event."""
+        return sum(event_indicator(df[col]) for col in columns)
+
+class PolarsEngine(PandasEngine):
+    """
+    Runs the heavy stages as lazy polars queries, which use all cores.
+
+    DataFrames still go in and come out as pandas, so the rest of the program is unchanged.
+    Filtering and deduplication only compute a row mask in polars and apply it in pandas, which
+    keeps the original index. If a frame can't be converted (e.g. an object column mixing
+    types), the pandas implementation is used for that call.
+    """
+    name = 'polars'
+
+    def __init__(self):
+        if pl is None:
+            raise ImportError("The polars engine requires the 'polars' and 'pyarrow' packages "
+                              "(pip install -r requirements-polars.txt).")
+
+    @staticmethod
+    def _to_pandas(result, dtypes, index=None):
+        """Converts a polars result to pandas with the dtypes and missing values pandas would produce."""
+        df = result.to_pandas()
+        for col, dtype in dtypes.items():
+            if col not in df.columns or df[col].dtype == dtype:
+                continue
+            if dtype == object:
+                # Keep Python objects such as datetime.date as they were, not as numpy values
+                df[col] = pd.Series(result[col].to_list(), index=df.index, dtype=object)
+            else:
+                df[col] = df[col].astype(dtype)
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].where(df[col].notna(), np.nan)
+        if index is not None:
+            df.index = index
+        return df
+
+    def _fallback(self, operation, error):
+        logging.warning(f"polars engine could not run '{operation}' ({error}); using pandas instead.")
+
+    def replace_values(self, df, columns, mapping):
+        if not columns:
+            return df
+        try:
+            text = [pl.col(col).cast(pl.String) for col in columns]
+            if not ASTYPE_STR_KEEPS_NA:
+                text = [expression.fill_null('nan') for expression in text]
+            result = pl.from_pandas(df[columns]).lazy().with_columns([
+                expression.str.strip_chars().replace(mapping) for expression in text
+            ]).collect()
+        except Exception as e:
+            self._fallback('replace_values', e)
+            return super().replace_values(df, columns, mapping)
+        df[columns] = self._to_pandas(result, {col: STRING_DTYPE for col in columns}, df.index)
+        return df
+
+    def reshape(self, db, value_name, date_format='%Y%m%d'):
+        date_columns = [col for col in db.columns if col not in ('song', 'artist')]
+        # Parse each date header once instead of once per row
+        parsed = pd.to_datetime(pd.Series(date_columns, dtype=object), format=date_format, errors='coerce')
+        valid = {col: date for col, date in zip(date_columns, parsed) if pd.notna(date)}
+        if len(set(db[list(valid)].dtypes)) > 1:
+            # polars would cast the kept values to one type, where pandas keeps each value as it is
+            self._fallback('reshape', "date columns of different types")
+            return super().reshape(db, value_name, date_format)
+        try:
+            # pd.melt stacks the date columns one after another; its index is the position in that stack
+            result = pl.from_pandas(db[['song', 'artist'] + date_columns]).lazy() \
+                .unpivot(index=['song', 'artist'], on=date_columns, variable_name='dates', value_name=value_name) \
+                .with_row_index('position') \
+                .filter(pl.col('dates').is_in(list(valid))) \
+                .with_columns(pl.col('dates').replace_strict({col: date.to_pydatetime() for col, date in valid.items()},
+                                                             return_dtype=pl.Datetime('us'))) \
+                .collect()
+        except Exception as e:
+            self._fallback('reshape', e)
+            return super().reshape(db, value_name, date_format)
+        dtypes = {'song': db['song'].dtype, 'artist': db['artist'].dtype, 'dates': parsed.dtype,
+                  # Melting no rows gives the dtype pandas picks for the values of all the columns
+                  value_name: pd.melt(db.iloc[:0], id_vars=['song', 'artist'], value_name=value_name)[value_name].dtype}
+        index = pd.Index(result['position'].to_numpy().astype(np.int64))
+        return self._to_pandas(result.drop('position'), dtypes, index)
+
+    def merge(self, left, right, on, how):
+        overlap = [col for col in left.columns if col in right.columns and col not in on]
+        try:
+            left_pl = pl.from_pandas(left.rename(columns={col: f'{col}_x' for col in overlap})).lazy()
+            right_pl = pl.from_pandas(right.rename(columns={col: f'{col}_y' for col in overlap})).lazy()
+            if how == 'outer':
+                # pd.merge sorts the keys of an outer join
+                query = left_pl.join(right_pl, on=on, how='full', coalesce=True, nulls_equal=True) \
+                    .sort(on, nulls_last=True, maintain_order=True)
+            else:
+                query = left_pl.join(right_pl, on=on, how=how, coalesce=True, nulls_equal=True,
+                                     maintain_order='left_right' if how == 'left' else None)
+            result = query.collect()
+        except Exception as e:
+            self._fallback('merge', e)
+            return super().merge(left, right, on, how)
+        dtypes = {f'{col}_x' if col in overlap else col: dtype for col, dtype in left.dtypes.items()}
+        dtypes.update({f'{col}_y' if col in overlap else col: dtype for col, dtype in right.dtypes.items() if col not in on})
+        return self._to_pandas(result, dtypes)
+
+    @staticmethod
+    def _evaluate(expression, frame):
+        """Evaluates one expression over a pandas frame and returns it as a numpy array."""
+        return pl.from_pandas(frame).lazy().select(expression.alias('result')).collect()['result'].to_numpy()
+
+    def filter_mask(self, df, filters=None, date_range=None):
+        columns = [col for col in (filters or {}) if col in df.columns]
+        use_dates = bool(date_range) and 'dates' in df.columns
+        if not columns and not use_dates:
+            return np.ones(len(df), dtype=bool)
+        try:
+            condition = pl.lit(True)
+            for col in columns:
+                condition &= pl.col(col) == filters[col]
+            if use_dates:
+                start_date, end_date = (pd.Timestamp(date).to_pydatetime() for date in date_range)
+                condition &= pl.col('dates').is_between(start_date, end_date)
+            return self._evaluate(condition.fill_null(False), df[columns + (['dates'] if use_dates else [])])
+        except Exception as e:
+            self._fallback('filter_mask', e)
+            return super().filter_mask(df, filters, date_range)
+
+    def standardize_text(self, df, columns):
+        if not columns:
+            return df
+        try:
+            result = pl.from_pandas(df[columns]).lazy().with_columns([
+                pl.col(col).str.to_lowercase().str.strip_chars() for col in columns
+            ]).collect()
+        except Exception as e:
+            self._fallback('standardize_text', e)
+            return super().standardize_text(df, columns)
+        df[columns] = self._to_pandas(result, {col: df[col].dtype for col in columns}, df.index)
+        return df
+
+    def drop_duplicates(self, df, subset=None):
+        columns = list(subset) if subset is not None else list(df.columns)
+        try:
+            keep = self._evaluate(pl.struct(columns).is_first_distinct(), df[columns])
+        except Exception as e:
+            self._fallback('drop_duplicates', e)
+            return super().drop_duplicates(df, subset)
+        return df[keep]
+
+    def count_events(self, df, columns):
+        expressions = []
+        for col in columns:
+            if pd.api.types.is_numeric_dtype(df[col].dtype):
+                values = pl.col(col).fill_null(0)
+                if pd.api.types.is_float_dtype(df[col].dtype):
+                    values = values.fill_nan(0)
+                expressions.append((values != 0).cast(pl.Int64))
+            else:
+                values = pl.col(col).cast(pl.String).str.strip_chars()
+                expressions.append((pl.col(col).is_not_null() & ~values.is_in(MISSING_EVENT_VALUES)).cast(pl.Int64))
+        try:
+            counts = self._evaluate(pl.sum_horizontal(expressions), df[columns])
+        except Exception as e:
+            self._fallback('count_events', e)
+            return super().count_events(df, columns)
+        return pd.Series(counts, index=df.index, dtype='int64')
+
+ENGINES = {'pandas': PandasEngine, 'polars': PolarsEngine}
+
+def get_engine(name='pandas'):
+    """
+    Returns a dataframe engine by name.
+
+    :param name: One of ENGINES ('pandas' or 'polars').
+    :return: Engine instance.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown dataframe engine: {name}. Choose from {', '.join(ENGINES)}.")
+    return ENGINES[name]()
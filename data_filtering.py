@@ -1,9 +1,39 @@
 import pandas as pd
 import logging
+from data_engine import PandasEngine, MISSING_EVENT_VALUES, event_indicator
+
+def new_sessions(df, last_date=None):
+    """
+    Selects the sessions newer than the latest one an index has already seen, so indexes that
+    are extended one Tuesday at a time can be given the whole combined dataset.
+
+    :param df: Combined DataFrame with a 'dates' column.
+    :param last_date: Latest session already seen, or None if the index is empty.
+    :return: Tuple of (rows of the newer sessions, their dates normalized to midnight).
+    """
+    dates = df['dates'].dt.normalize()
+    if last_date is not None:
+        newer = dates > last_date
+        df, dates = df[newer], dates[newer]
+    return df, dates
+
+def decade_labels(df):
+    """
+    Labels each row with its decade, e.g. '1990s', or 'Unknown' if its year is missing.
+
+    :param df: DataFrame with a 'decade' or 'year' column.
+    :return: Series of labels.
+    """
+    decade = pd.to_numeric(df['decade'], errors='coerce') if 'decade' in df.columns \
+        else (pd.to_numeric(df['year'], errors='coerce') // 10) * 10
+    return decade.map(lambda d: 'Unknown' if pd.isna(d) else f"{int(d)}s")
 
 class DataFiltering:
-    def __init__(self):
-        pass
+    def __init__(self, engine=None):
+        """
+        :param engine: Dataframe engine from data_engine used for the heavy operations. Defaults to pandas.
+        """
+        self.engine = engine or PandasEngine()
 
     def filter_data(self, df, filters=None, date_range=None):
         """
@@ -14,20 +44,12 @@ class DataFiltering:
         :param date_range: Tuple containing start and end dates for filtering.
         :return: Filtered DataFrame.
         """
-        # Apply column filters
-        if filters:
-            for col, value in filters.items():
-                if col in df.columns:
-                    df = df[df[col] == value]
-                    logging.info(f"Filtered data by {col} == {value}.")
-
-        # Apply date range filter
-        if date_range:
-            start_date, end_date = date_range
-            if 'dates' in df.columns:
-                df = df[(df['dates'] >= start_date) & (df['dates'] <= end_date)]
-                logging.info(f"Filtered data between dates {start_date} and {end_date}.")
-
+        df = df[self.engine.filter_mask(df, filters, date_range)]
+        for col, value in (filters or {}).items():
+            if col in df.columns:
+                logging.info(f"Filtered data by {col} == {value}.")
+        if date_range and 'dates' in df.columns:
+            logging.info(f"Filtered data between dates {date_range[0]} and {date_range[1]}.")
         return df
 
     def remove_outliers(self, df, columns, z_threshold=3):
@@ -48,29 +70,49 @@ class DataFiltering:
                 logging.info(f"Removed outliers in column '{col}' using Z-score method with threshold {z_threshold}.")
         return df
 
-    def create_flags(self, df):
+    def create_flags(self, df, popularity=None, last_n_weeks=None):
         """
         Creates additional flags to help with analysis, like popularity scores.
 
         :param df: DataFrame for which to create flags.
+        :param popularity: Optional RollingPopularity engine. If given, 'is_popular' compares each
+                           song's score over the window against the mean song score in that window.
+        :param last_n_weeks: Number of most recent weeks in the window. If None, the full history is used.
         :return: DataFrame with additional flags.
         """
         # Popularity flag based on play and request counts
-        if 'play_value' in df.columns and 'request_value' in df.columns:
-            df['popularity_score'] = df['play_value'].fillna(0) + df['request_value'].fillna(0)
-            df['is_popular'] = df['popularity_score'] > df['popularity_score'].mean()
+        request_column = 'requested_value' if 'requested_value' in df.columns else 'request_value'
+        if 'play_value' in df.columns and request_column in df.columns:
+            df['popularity_score'] = self.engine.count_events(df, ['play_value', request_column])
+            if popularity is not None:
+                scores = popularity.window_scores(last_n_weeks)
+                popular = scores[scores > scores.mean()].index
+                df['is_popular'] = pd.MultiIndex.from_frame(df[['song', 'artist']]).isin(popular)
+            else:
+                df['is_popular'] = df['popularity_score'] > df['popularity_score'].mean()
             logging.info("Created 'popularity_score' and 'is_popular' columns based on play and request data.")
         return df
 
-    def filter_popular_songs(self, df, min_popularity_score=None):
+    def filter_popular_songs(self, df, min_popularity_score=None, popularity=None, last_n_weeks=None, end_date=None):
         """
         Filters songs that are popular based on a minimum popularity score.
 
         :param df: DataFrame to filter.
         :param min_popularity_score: Minimum score to consider a song popular.
+        :param popularity: Optional RollingPopularity engine. If given, songs are scored over a window of
+                           weeks using its prefix sums instead of the 'popularity_score' column.
+        :param last_n_weeks: Number of weeks in the window. If None, the full history is used.
+        :param end_date: Last date of the window. If None, the window ends at the latest week.
         :return: Filtered DataFrame with only popular songs.
         """
-        if 'popularity_score' in df.columns:
+        if popularity is not None:
+            scores = popularity.window_scores(last_n_weeks, end_date)
+            if min_popularity_score is None:
+                min_popularity_score = scores.mean()
+            popular = scores[scores >= min_popularity_score].index
+            df = df[pd.MultiIndex.from_frame(df[['song', 'artist']]).isin(popular)]
+            logging.info(f"Filtered {len(popular)} popular songs with window score >= {min_popularity_score}.")
+        elif 'popularity_score' in df.columns:
             if min_popularity_score is None:
                 min_popularity_score = df['popularity_score'].mean()
             df = df[df['popularity_score'] >= min_popularity_score]
@@ -116,10 +158,10 @@ class DataFiltering:
         :param columns: List of column names to standardize.
         :return: DataFrame with standardized text columns.
         """
+        columns = [col for col in columns if col in df.columns]
+        df = self.engine.standardize_text(df, columns)
         for col in columns:
-            if col in df.columns:
-                df[col] = df[col].str.lower().str.strip()
-                logging.info(f"Standardized text in column '{col}'.")
+            logging.info(f"Standardized text in column '{col}'.")
         return df
 
     def remove_duplicates(self, df, subset=None):
@@ -131,6 +173,6 @@ class DataFiltering:
         :return: DataFrame without duplicate rows.
         """
         original_count = len(df)
-        df.drop_duplicates(subset=subset, inplace=True)
+        df = self.engine.drop_duplicates(df, subset)
         logging.info(f"Removed {original_count - len(df)} duplicate rows based on columns {subset if subset else 'all columns'}.")
         return df
@@ -0,0 +1,99 @@
+import logging
+import numpy as np
+import pandas as pd
+from data_filtering import event_indicator
+
+class RequestLatency:
+    """
+    How long a requested song waits to be played, and what share of requests are played at all.
+
+    Requests and plays of all songs are matched in one sorted as-of merge: every request is
+    joined to the first play of the same song on or after the request date. Lags are given in
+    days and in sessions (Tuesdays with any activity), and summarised per requester type
+    ('Audience', 'Group') and per period.
+    """
+    KEY_COLUMNS = ['song', 'artist']
+
+    def __init__(self, max_lag_weeks=None, requester_column='requested_value'):
+        """
+        :param max_lag_weeks: A request only counts as played if the play is at most this many
+                              weeks later. If None, any later play counts.
+        :param requester_column: Column holding the requester type of each request.
+        """
+        self.max_lag_weeks = max_lag_weeks
+        self.requester_column = requester_column
+
+    def request_lags(self, df):
+        """
+        Matches every request to the next play of the same song.
+
+        :param df: Combined DataFrame with 'song', 'artist', 'dates', 'play_value' and the requester column.
+        :return: DataFrame with one row per request: 'song', 'artist', 'requested_by', 'request_date',
+                 'play_date' (NaT if not played), 'lag_days', 'lag_sessions' and 'played'.
+        """
+        if self.requester_column not in df.columns:
+            raise ValueError(f"Column '{self.requester_column}' not found in the data.")
+        df = df.dropna(subset=['dates'])
+        dates = pd.to_datetime(df['dates']).dt.normalize()
+        # Session number of every Tuesday, so lags can also be counted in sessions
+        sessions = pd.Series(np.arange(dates.nunique()), index=np.sort(dates.unique()))
+
+        requests = pd.DataFrame({'song': df['song'], 'artist': df['artist'],
+                                 'requested_by': df[self.requester_column].fillna('Unknown'),
+                                 'request_date': dates})[event_indicator(df[self.requester_column]).to_numpy() > 0]
+        # A song can be requested by several people on the same night, count each request
+        played = event_indicator(df['play_value']).to_numpy() > 0
+        plays = pd.DataFrame({'song': df['song'], 'artist': df['artist'], 'play_date': dates})[played] \
+            .drop_duplicates()
+
+        # merge_asof needs both sides sorted on the date; 'by' matches the song within that order
+        tolerance = pd.Timedelta(weeks=self.max_lag_weeks) if self.max_lag_weeks is not None else None
+        lags = pd.merge_asof(requests.sort_values('request_date', kind='stable'),
+                             plays.sort_values('play_date', kind='stable'),
+                             left_on='request_date', right_on='play_date', by=self.KEY_COLUMNS,
+                             direction='forward', allow_exact_matches=True, tolerance=tolerance)
+
+        lags['lag_days'] = (lags['play_date'] - lags['request_date']).dt.days.astype('Int64')
+        lags['lag_sessions'] = (lags['play_date'].map(sessions) - lags['request_date'].map(sessions)).astype('Int64')
+        lags['played'] = lags['play_date'].notna()
+        logging.info(f"Matched {len(lags)} requests to plays, {int(lags['played'].sum())} were played.")
+        return lags.reset_index(drop=True)
+
+    def summary(self, df, freq=None, start_date=None, end_date=None, lags=None):
+        """
+        Summarises request to play lags per requester type, and optionally per period.
+
+        :param df: Combined DataFrame, as for request_lags.
+        :param freq: Optional pandas period frequency ('M', 'Q', 'Y') of the request dates to split by.
+        :param start_date: Only include requests from this date (inclusive).
+        :param end_date: Only include requests up to this date (inclusive).
+        :param lags: Result of request_lags(df), if already computed.
+        :return: DataFrame with 'requests', 'played', 'conversion_rate', 'same_night_rate',
+                 'median_lag_days', 'mean_lag_days' and 'mean_lag_sessions' per requester type
+                 (and 'period' if freq is given).
+        """
+        if lags is None:
+            lags = self.request_lags(df)
+        if start_date is not None:
+            lags = lags[lags['request_date'] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            lags = lags[lags['request_date'] <= pd.Timestamp(end_date)]
+
+        keys = ['requested_by']
+        if freq:
+            lags = lags.assign(period=lags['request_date'].dt.to_period(freq).astype(str))
+            keys = ['period'] + keys
+        lags = lags.assign(same_night=lags['lag_days'].eq(0).fillna(False).astype(bool),
+                           lag_days=lags['lag_days'].astype('float64'),
+                           lag_sessions=lags['lag_sessions'].astype('float64'))
+        summary = lags.groupby(keys).agg(requests=('request_date', 'size'),
+                                         played=('played', 'sum'),
+                                         same_night=('same_night', 'sum'),
+                                         median_lag_days=('lag_days', 'median'),
+                                         mean_lag_days=('lag_days', 'mean'),
+                                         mean_lag_sessions=('lag_sessions', 'mean')).reset_index()
+        summary['conversion_rate'] = (summary['played'] / summary['requests']).round(3)
+        summary['same_night_rate'] = (summary.pop('same_night') / summary['requests']).round(3)
+        summary[['mean_lag_days', 'mean_lag_sessions']] = summary[['mean_lag_days', 'mean_lag_sessions']].round(2)
+        return summary[keys + ['requests', 'played', 'conversion_rate', 'same_night_rate',
+                               'median_lag_days', 'mean_lag_days', 'mean_lag_sessions']]
@@ -0,0 +1,115 @@
+import heapq
+import logging
+from bisect import bisect_left, bisect_right
+from collections import Counter
+import pandas as pd
+from data_filtering import event_indicator, new_sessions, decade_labels
+
+class Leaderboard:
+    """
+    Answers "top K songs, artists, decades or requesters between two dates" from per-week counts.
+
+    Counts are kept per Tuesday session and per dimension, so a query only merges the small
+    per-week tables inside the date range and picks the top K with a heap. Its cost depends on
+    the number of weeks and the songs played each week, not on the number of rows.
+    """
+    DIMENSIONS = ['song', 'artist', 'decade', 'requester']
+    METRICS = ['plays', 'requests']
+
+    def __init__(self):
+        self.dates = []
+        self._counts = {}
+
+    @staticmethod
+    def _keys(df, dimension):
+        """Returns the leaderboard key of each row for the given dimension."""
+        if dimension == 'song':
+            return df['song'].astype(str) + ' - ' + df['artist'].astype(str)
+        if dimension == 'artist':
+            return df['artist'].astype(str)
+        if dimension == 'decade':
+            return decade_labels(df)
+        if dimension == 'requester':
+            return df['requested_value'].astype(str)
+        raise ValueError(f"Unknown leaderboard dimension: {dimension}")
+
+    def update(self, df):
+        """
+        Adds the sessions in df that are newer than the latest session already counted.
+
+        :param df: Combined DataFrame with 'song', 'artist', 'dates', 'play_value' and 'requested_value'.
+        """
+        df, dates = new_sessions(df, self.dates[-1] if self.dates else None)
+        if df.empty:
+            return
+
+        events = {'plays': event_indicator(df['play_value'])}
+        if 'requested_value' in df.columns:
+            events['requests'] = event_indicator(df['requested_value'])
+
+        new_dates = sorted(dates.unique())
+        for dimension in self.DIMENSIONS:
+            for metric, indicator in events.items():
+                if dimension == 'requester' and metric != 'requests':
+                    continue
+                try:
+                    keys = self._keys(df, dimension)
+                except KeyError:
+                    continue
+                counts = indicator[indicator > 0].groupby([dates, keys]).sum()
+                per_date = {date: Counter() for date in new_dates}
+                for (date, key), count in counts.items():
+                    per_date[date][key] = int(count)
+                self._counts.setdefault((dimension, metric), [Counter() for _ in self.dates])
+                self._counts[(dimension, metric)].extend(per_date[date] for date in new_dates)
+
+        self.dates.extend(pd.Timestamp(date) for date in new_dates)
+        for counts in self._counts.values():
+            counts.extend(Counter() for _ in range(len(self.dates) - len(counts)))
+        logging.info(f"Added {len(new_dates)} weeks to the leaderboard.")
+
+    def _merge(self, dimension, metric, start_date, end_date):
+        """Sums the per-week counts between two dates (inclusive)."""
+        if (dimension, metric) not in self._counts:
+            raise ValueError(f"No '{metric}' counts available for '{dimension}'.")
+        lo = bisect_left(self.dates, pd.Timestamp(start_date))
+        hi = bisect_right(self.dates, pd.Timestamp(end_date))
+        total = Counter()
+        for counts in self._counts[(dimension, metric)][lo:hi]:
+            total.update(counts)
+        return total
+
+    def top_k(self, dimension, start_date, end_date, k=20, metric='plays'):
+        """
+        Returns the top K keys for a date range with their rank change against the previous
+        window of the same length.
+
+        :param dimension: One of 'song', 'artist', 'decade' or 'requester'.
+        :param start_date: Start of the range (inclusive).
+        :param end_date: End of the range (inclusive).
+        :param k: Number of entries to return.
+        :param metric: 'plays' or 'requests'.
+        :return: DataFrame with 'rank', dimension, 'count', 'previous_rank' and 'rank_change' columns.
+        """
+        start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        current = self._merge(dimension, metric, start_date, end_date)
+        top = heapq.nsmallest(k, current.items(), key=lambda item: (-item[1], item[0]))
+
+        # Previous window of the same length, ending the day before this one starts
+        previous_end = start_date - pd.Timedelta(days=1)
+        previous = self._merge(dimension, metric, previous_end - (end_date - start_date), previous_end)
+        previous_ranks = {key: rank for rank, (key, _) in
+                          enumerate(sorted(previous.items(), key=lambda item: (-item[1], item[0])), start=1)}
+
+        rows = []
+        for rank, (key, count) in enumerate(top, start=1):
+            previous_rank = previous_ranks.get(key)
+            rows.append({
+                'rank': rank,
+                dimension: key,
+                'count': count,
+                'previous_rank': previous_rank,
+                'rank_change': previous_rank - rank if previous_rank is not None else None,
+            })
+        logging.info(f"Computed top {k} {dimension} by {metric} between {start_date.date()} and {end_date.date()}.")
+        return pd.DataFrame(rows, columns=['rank', dimension, 'count', 'previous_rank', 'rank_change'])
@@ -0,0 +1,268 @@
+import os
+import re
+import logging
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+import pandas as pd
+from data_filtering import event_indicator
+
+# Parenthesised or dashed suffixes that mark a version of a song rather than a different song
+VERSION_WORDS = r'(?:version|remaster(?:ed)?|live|edit|mix|remix|mono|stereo|single|album|radio|acoustic|demo|bonus|feat\.?|ft\.?|from)'
+VERSION_SUFFIX = re.compile(r'\s*(?:[\(\[][^\)\]]*\b' + VERSION_WORDS + r'\b[^\)\]]*[\)\]]|\s-\s.*\b' + VERSION_WORDS + r'\b.*)$')
+FEATURING = re.compile(r'\s+(?:feat\.?|ft\.?|featuring)\s.*$')
+
+def normalize_text(text, strip_versions=True):
+    """
+    Normalizes a song or artist name for matching: removes accents, version suffixes such as
+    '(Single Version)' or '- Remastered 2011', punctuation and a leading 'the'.
+
+    :param text: Song or artist name.
+    :param strip_versions: Whether to remove version suffixes (used for song titles).
+    :return: Normalized string.
+    """
+    if not isinstance(text, str):
+        return ''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower().strip()
+    if strip_versions:
+        # Suffixes can be stacked, e.g. 'Song (Live) - Remastered'
+        previous = None
+        while previous != text:
+            previous, text = text, VERSION_SUFFIX.sub('', text)
+    text = FEATURING.sub('', text)
+    text = text.replace('&', ' and ')
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return re.sub(r'^the ', '', text)
+
+def _numbers(text):
+    return sorted(re.findall(r'\d+', text))
+
+def _ngrams(text, n=3):
+    padded = f' {text} '
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+class FuzzyMatcher:
+    """
+    Matches song/artist pairs from playdb and requestdb to the titles in tabdb when the strings
+    differ in case, accents, punctuation or version suffixes.
+
+    Candidates come from a character trigram index over the tabdb titles, so each lookup only
+    scores the few titles that share rare trigrams with it instead of every title. The song
+    title and the artist are scored separately and must each pass their threshold, and numbers
+    in the title must match exactly, so 'Song 3' never matches 'Song 2'.
+
+    The default title threshold lets a one-letter typo through in all but the shortest titles
+    ('Jolenne', 'Wonderwal'), while different titles such as 'Angie' and 'Angel' (0.8) stay
+    apart; the artist threshold, the numbers and the margin over the next candidate do the rest.
+
+    Resolved matches are kept in an alias table on disk, so later runs match them by lookup. A
+    fuzzy match is only used and added to it if it is clearly better than the next candidate;
+    other fuzzy matches are left unresolved and written to a review file instead.
+    """
+    ALIAS_COLUMNS = ['song', 'artist', 'matched_song', 'matched_artist', 'confidence']
+
+    def __init__(self, alias_path='song_aliases.csv', threshold=0.85, artist_threshold=0.85, min_margin=0.05,
+                 review_path='song_aliases_review.csv', max_candidates=20, max_gram_share=0.05):
+        """
+        :param alias_path: CSV file of resolved aliases. If None, aliases are not persisted.
+        :param threshold: Minimum similarity (0-1) of the song titles to accept a fuzzy match.
+        :param artist_threshold: Minimum similarity (0-1) of the artists to accept a fuzzy match.
+        :param min_margin: Minimum lead of a fuzzy match's title similarity over the next candidate
+                           for it to be saved as an alias without review.
+        :param review_path: CSV file the fuzzy matches that need review are written to. If None, they aren't written.
+        :param max_candidates: Number of candidates scored per lookup.
+        :param max_gram_share: Trigrams found in more than this share of titles are skipped when blocking.
+        """
+        self.alias_path = alias_path
+        self.threshold = threshold
+        self.artist_threshold = artist_threshold
+        self.min_margin = min_margin
+        self.review_path = review_path
+        self.max_candidates = max_candidates
+        self.max_gram_share = max_gram_share
+        self.aliases = self.load_aliases()
+        self.review = {}
+        self.last_report = None
+        self._titles = []
+        self._normalized_titles = []
+        self._exact = {}
+        self._normalized = {}
+        self._index = {}
+
+    def load_aliases(self):
+        """Loads the persisted alias table as a dictionary of (song, artist) -> (song, artist, confidence)."""
+        if not self.alias_path or not os.path.exists(self.alias_path):
+            return {}
+        aliases = pd.read_csv(self.alias_path)
+        logging.info(f"Loaded {len(aliases)} song aliases from {self.alias_path}.")
+        return {(row.song, row.artist): (row.matched_song, row.matched_artist, row.confidence)
+                for row in aliases.itertuples(index=False)}
+
+    def alias_table(self):
+        """Returns the alias table as a DataFrame."""
+        rows = [(song, artist, *match) for (song, artist), match in self.aliases.items()]
+        return pd.DataFrame(rows, columns=self.ALIAS_COLUMNS)
+
+    def save_aliases(self):
+        """
+        Saves the alias table so later runs can match by lookup, and the fuzzy matches that need
+        review. Reviewed rows can be copied from the review file into the alias file.
+        """
+        for path, table, name in ((self.alias_path, self.aliases, 'song aliases'),
+                                  (self.review_path, self.review, 'fuzzy matches to review')):
+            if not path or (not table and not os.path.exists(path)):
+                continue
+            rows = [(song, artist, *match) for (song, artist), match in table.items()]
+            pd.DataFrame(rows, columns=self.ALIAS_COLUMNS).to_csv(path, index=False)
+            logging.info(f"Saved {len(rows)} {name} to {path}.")
+
+    def build_index(self, tab_db):
+        """
+        Builds the lookup tables and trigram blocking index over the tabdb titles.
+
+        :param tab_db: DataFrame with 'song' and 'artist' columns.
+        """
+        self.last_report = None
+        self._titles = list(tab_db[['song', 'artist']].drop_duplicates().itertuples(index=False, name=None))
+        self._normalized_titles = [(normalize_text(song), normalize_text(artist, strip_versions=False))
+                                   for song, artist in self._titles]
+        self._exact = {title: title for title in self._titles}
+        self._normalized = {}
+        postings = defaultdict(list)
+        for i, (song_norm, artist_norm) in enumerate(self._normalized_titles):
+            self._normalized.setdefault((song_norm, artist_norm), self._titles[i])
+            for gram in _ngrams(song_norm):
+                postings[gram].append(i)
+
+        # Very common trigrams don't narrow the candidates down, so they are left out of the index
+        max_postings = max(10, int(self.max_gram_share * len(self._titles)))
+        self._index = {gram: ids for gram, ids in postings.items() if len(ids) <= max_postings}
+        logging.info(f"Built fuzzy matching index over {len(self._titles)} tabdb titles.")
+
+    def _score(self, song_norm, artist_norm, i):
+        """Returns the (song, artist) similarity to a tabdb title, with 0 for the song if their numbers differ."""
+        cand_song, cand_artist = self._normalized_titles[i]
+        if _numbers(song_norm) != _numbers(cand_song):
+            return 0.0, 0.0
+        song_score = SequenceMatcher(None, song_norm, cand_song).ratio()
+        artist_score = SequenceMatcher(None, artist_norm, cand_artist).ratio()
+        return song_score, artist_score
+
+    def match_one(self, song, artist):
+        """
+        Finds the tabdb title for a song/artist pair.
+
+        :return: Tuple of (matched song, matched artist, confidence, method), with None for the
+                 match and method 'unmatched' if no title passes the thresholds. Fuzzy matches
+                 have method 'fuzzy', or 'review' if the next candidate is within min_margin.
+                 The confidence is the song title similarity.
+        """
+        if (song, artist) in self._exact:
+            return song, artist, 1.0, 'exact'
+        alias = self.aliases.get((song, artist))
+        if alias is not None and alias[:2] in self._exact:
+            return (*alias, 'alias')
+
+        song_norm, artist_norm = normalize_text(song), normalize_text(artist, strip_versions=False)
+        if (song_norm, artist_norm) in self._normalized:
+            return (*self._normalized[(song_norm, artist_norm)], 1.0, 'normalized')
+
+        shared = Counter()
+        for gram in _ngrams(song_norm):
+            shared.update(self._index.get(gram, ()))
+        best, best_score, runner_up = None, 0.0, 0.0
+        for i, _ in shared.most_common(self.max_candidates):
+            song_score, artist_score = self._score(song_norm, artist_norm, i)
+            if artist_score < self.artist_threshold:
+                continue
+            if song_score > best_score:
+                best, best_score, runner_up = self._titles[i], song_score, best_score
+            elif song_score > runner_up:
+                runner_up = song_score
+        if best is not None and best_score >= self.threshold:
+            method = 'fuzzy' if best_score - runner_up >= self.min_margin else 'review'
+            return best[0], best[1], round(best_score, 3), method
+        return None, None, round(best_score, 3), 'unmatched'
+
+    def match(self, df):
+        """
+        Matches every distinct song/artist pair in df to tabdb. build_index must be called first.
+
+        :param df: DataFrame with 'song' and 'artist' columns.
+        :return: Report DataFrame with one row per distinct pair.
+        """
+        pairs = df[['song', 'artist']].drop_duplicates()
+        rows = [(song, artist, *self.match_one(song, artist)) for song, artist in pairs.itertuples(index=False, name=None)]
+        report = pd.DataFrame(rows, columns=self.ALIAS_COLUMNS + ['method'])
+
+        # Remember new fuzzy and normalized matches for the next run, and keep close calls for review
+        for row in report[report['method'].isin(['fuzzy', 'normalized', 'review'])].itertuples(index=False):
+            table = self.review if row.method == 'review' else self.aliases
+            table[(row.song, row.artist)] = (row.matched_song, row.matched_artist, row.confidence)
+        counts = report['method'].value_counts().to_dict()
+        logging.info(f"Matched song/artist pairs to tabdb: {counts}.")
+        return report
+
+    def resolve(self, df):
+        """
+        Replaces song/artist values in df with their matched tabdb titles. Rows that end up with
+        the same title are combined into one, keeping the recorded plays/requests of each.
+
+        :param df: DataFrame with 'song' and 'artist' columns.
+        :return: DataFrame with resolved titles. Unmatched rows and matches needing review are left unchanged.
+        """
+        report = self.match(df)
+        self.last_report = report if self.last_report is None else pd.concat([self.last_report, report], ignore_index=True)
+        resolved = report[report['method'].isin(['fuzzy', 'normalized', 'alias'])]
+        if resolved.empty:
+            return df
+        mapping = resolved.set_index(['song', 'artist'])[['matched_song', 'matched_artist']]
+        df = df.copy()
+        keys = pd.MultiIndex.from_frame(df[['song', 'artist']])
+        matched = mapping.reindex(keys)
+        found = matched['matched_song'].notna().to_numpy()
+        df.loc[found, 'song'] = matched['matched_song'].to_numpy()[found]
+        df.loc[found, 'artist'] = matched['matched_artist'].to_numpy()[found]
+        return self._combine_duplicates(df)
+
+    @staticmethod
+    def _combine_duplicates(df):
+        """
+        Combines rows with the same song and artist into the first of them. For each column the
+        first value recording an event (see event_indicator) is kept, otherwise the first value.
+        Rows with a missing song or artist are kept, as duplicated() treats missing values as equal.
+        """
+        keys = ['song', 'artist']
+        duplicated = df.duplicated(keys)
+        if not duplicated.any():
+            return df
+        value_columns = [col for col in df.columns if col not in keys]
+        groups = [df['song'], df['artist']]
+        events = df[value_columns].apply(lambda col: col.where(event_indicator(col) > 0))
+        first = df[value_columns].groupby(groups, sort=False, dropna=False).first()
+        combined = events.groupby(groups, sort=False, dropna=False).first().fillna(first).astype(first.dtypes)
+        logging.info(f"Combined {int(duplicated.sum())} rows that resolved to an existing song/artist.")
+        return combined.reset_index()
+
+    def resolve_sources(self, tab_db, *dbs):
+        """
+        Resolves the titles of several play/request tables against tabdb, building the index once,
+        and saves the alias table.
+
+        :param tab_db: Cleaned tabdb DataFrame.
+        :param dbs: Cleaned playdb/requestdb DataFrames.
+        :return: List of the resolved DataFrames, in the order given.
+        """
+        self.build_index(tab_db)
+        resolved = [self.resolve(db) for db in dbs]
+        self.save_aliases()
+        logging.info(f"Resolved play/request titles to tabdb, {len(self.unmatched())} pairs unmatched.")
+        return resolved
+
+    def unmatched(self):
+        """Returns the song/artist pairs of the last resolve calls that could not be matched."""
+        if self.last_report is None:
+            return pd.DataFrame(columns=self.ALIAS_COLUMNS + ['method'])
+        return self.last_report[self.last_report['method'] == 'unmatched']
@@ -0,0 +1,253 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+import pandas as pd
+from data_Preprocessing import DataPreprocessing
+
+# Bump when the preprocessing code changes, so results cached by older code are not reused
+PIPELINE_VERSION = 3
+
+def hash_dataframe(df):
+    """
+    Computes a content hash of a DataFrame, including its column names and types.
+
+    :param df: DataFrame to hash.
+    :return: Hex digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns]).encode())
+    digest.update(json.dumps([str(dtype) for dtype in df.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+class Pipeline:
+    """
+    A DAG of named stages whose results are memoized on disk.
+
+    Each stage's cache key is derived from its name, parameters and the keys of its inputs,
+    which bottom out in content hashes of the source DataFrames. Keys can therefore be worked
+    out without running anything: stages whose key is cached are loaded, and only stages
+    downstream of a changed input are rerun. The cache is capped in size and evicts the least
+    recently used results first.
+    """
+    def __init__(self, cache_dir='.pipeline_cache', max_cache_bytes=512 * 1024 * 1024):
+        """
+        :param cache_dir: Directory for cached stage results.
+        :param max_cache_bytes: Maximum total size of the cache directory.
+        """
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.stages = {}
+
+    def add_stage(self, name, func, inputs, params=None):
+        """
+        Adds a stage to the pipeline.
+
+        :param name: Unique name of the stage.
+        :param func: Function called with the results of the inputs, in order, followed by params as keyword arguments.
+        :param inputs: Names of upstream stages or sources.
+        :param params: JSON-serialisable parameters, passed to func and part of the cache key.
+        """
+        self.stages[name] = {'func': func, 'inputs': list(inputs), 'params': params or {}}
+
+    def _keys(self, source_keys):
+        """Works out the cache key of every stage from the source hashes."""
+        keys = dict(source_keys)
+
+        def key_of(name):
+            if name not in keys:
+                if name not in self.stages:
+                    raise KeyError(f"Unknown stage or source: {name}")
+                stage = self.stages[name]
+                payload = json.dumps({
+                    'version': PIPELINE_VERSION,
+                    'stage': name,
+                    'params': stage['params'],
+                    'inputs': [key_of(upstream) for upstream in stage['inputs']],
+                }, sort_keys=True, default=str)
+                keys[name] = hashlib.sha256(payload.encode()).hexdigest()
+            return keys[name]
+
+        for name in self.stages:
+            key_of(name)
+        return keys
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def _load(self, key):
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except Exception as e:
+            logging.error(f"Error reading cached stage result {path}: {e}")
+            return None
+        os.utime(path)  # Mark as recently used
+        return result
+
+    def _store(self, key, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._cache_path(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._cache_path(key))
+        self._evict()
+
+    def _evict(self):
+        """Removes the least recently used results until the cache fits within max_cache_bytes."""
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.pkl'):
+                path = os.path.join(self.cache_dir, file_name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            os.remove(path)
+            total -= size
+            logging.info(f"Evicted cached stage result {path}.")
+
+    def run(self, sources, targets, source_keys=None):
+        """
+        Runs the pipeline up to the given targets, reusing cached results where possible.
+
+        :param sources: Dictionary mapping source names to DataFrames. Sources are never modified.
+        :param targets: Names of the stages whose results are wanted.
+        :param source_keys: Optional dictionary of keys to use for some sources instead of their content hash.
+        :return: Dictionary mapping each target to its result.
+        """
+        source_keys = source_keys or {}
+        keys = self._keys({name: source_keys.get(name) or hash_dataframe(df) for name, df in sources.items()})
+        results = {}
+
+        def result_of(name):
+            if name in results:
+                return results[name]
+            if name in sources:
+                results[name] = sources[name]
+                return results[name]
+            result = self._load(keys[name])
+            if result is not None:
+                logging.info(f"Loaded stage '{name}' from cache.")
+            else:
+                stage = self.stages[name]
+                # Stages work on copies because the cleaning steps modify their input in place
+                inputs = [result_of(upstream) for upstream in stage['inputs']]
+                inputs = [value.copy() if isinstance(value, pd.DataFrame) else value for value in inputs]
+                result = stage['func'](*inputs, **stage['params'])
+                self._store(keys[name], result)
+                logging.info(f"Ran stage '{name}'.")
+            results[name] = result
+            return result
+
+        return {name: result_of(name) for name in targets}
+
+class CachedPreprocessing:
+    """
+    The "Validate and Preprocess Data" pipeline expressed as memoized stages: each source is
+    cleaned, play and request data are reshaped and merged, then merged with tabdb, given the
+    year/decade features and cleaned once more. When a FuzzyMatcher is given, play and request
+    titles are resolved to tabdb titles before reshaping, each source in its own stage, and an
+    'unmatched_titles' report is kept.
+
+    The matcher's alias table is an input of the resolve stages, so editing song_aliases.csv
+    reruns them. The aliases those stages save themselves are not an edit: the table they wrote
+    is recorded with the key they ran with, and that key is used again while the file is unchanged.
+    """
+    ALIAS_KEY_FILE = 'alias_key.json'
+
+    def __init__(self, preprocessor=None, matcher=None, cache_dir='.pipeline_cache', max_cache_bytes=512 * 1024 * 1024):
+        self.preprocessor = preprocessor or DataPreprocessing()
+        self.matcher = matcher
+        self.pipeline = Pipeline(cache_dir, max_cache_bytes)
+        self._build()
+
+    def _resolve(self, db, tab_db, aliases, **_):
+        """Resolves the titles of one play/request table. aliases is only an input for the cache key."""
+        db, = self.matcher.resolve_sources(tab_db, db)
+        unmatched = self.matcher.unmatched().drop_duplicates(subset=['song', 'artist'])
+        return {'db': db, 'unmatched': unmatched}
+
+    def _build(self):
+        pre, add = self.preprocessor, self.pipeline.add_stage
+        add('clean_play', pre.clean_data, ['play_db'])
+        add('clean_request', pre.clean_data, ['request_db'])
+        add('clean_tab', pre.clean_data, ['tab_db'])
+
+        if self.matcher is not None:
+            matcher_params = {'threshold': self.matcher.threshold, 'artist_threshold': self.matcher.artist_threshold,
+                              'min_margin': self.matcher.min_margin, 'max_candidates': self.matcher.max_candidates,
+                              'max_gram_share': self.matcher.max_gram_share}
+            add('resolve_play', self._resolve, ['clean_play', 'clean_tab', 'aliases'], matcher_params)
+            add('resolve_request', self._resolve, ['clean_request', 'clean_tab', 'aliases'], matcher_params)
+            add('reshape_play', lambda resolved, db_name: pre._reshape_db(resolved['db'], db_name),
+                ['resolve_play'], {'db_name': 'play'})
+            add('reshape_request', lambda resolved, db_name: pre._reshape_db(resolved['db'], db_name),
+                ['resolve_request'], {'db_name': 'requested'})
+        else:
+            add('reshape_play', pre._reshape_db, ['clean_play'], {'db_name': 'play'})
+            add('reshape_request', pre._reshape_db, ['clean_request'], {'db_name': 'requested'})
+        add('merge_play_request', pre._merge_play_request, ['reshape_play', 'reshape_request'])
+        add('merge_tab', pre._merge_with_tab, ['merge_play_request', 'clean_tab'])
+        add('add_features', pre._add_features, ['merge_tab'])
+        add('clean_combined', pre.clean_data, ['add_features'])
+
+    def _alias_key_path(self):
+        return os.path.join(self.pipeline.cache_dir, self.ALIAS_KEY_FILE)
+
+    def _alias_key(self, aliases):
+        """
+        Returns the cache key of the alias table: its content hash, or the key the resolve stages
+        ran with if the table is the one they saved.
+        """
+        key = hash_dataframe(aliases)
+        path = self._alias_key_path()
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Error reading {path}: {e}")
+                return key
+            if saved.get('saved') == key:
+                return saved['key']
+        return key
+
+    def _save_alias_key(self, saved, key):
+        """Records that the alias table with hash 'saved' was written by resolve stages keyed on 'key'."""
+        os.makedirs(self.pipeline.cache_dir, exist_ok=True)
+        with open(self._alias_key_path(), 'w') as f:
+            json.dump({'saved': saved, 'key': key}, f)
+
+    def run(self, play_db, request_db, tab_db):
+        """
+        Runs the full preprocessing, equivalent to preprocess_for_analysis followed by clean_data.
+
+        :return: Tuple of (combined DataFrame, unmatched titles DataFrame or None).
+        """
+        sources = {'play_db': play_db, 'request_db': request_db, 'tab_db': tab_db}
+        if self.matcher is None:
+            return self.pipeline.run(sources, ['clean_combined'])['clean_combined'], None
+        # Pick up edits to the alias file; its contents are part of the resolve stages' key
+        loaded = self.matcher.load_aliases()
+        self.matcher.aliases = dict(loaded)
+        sources['aliases'] = self.matcher.alias_table()
+        alias_key = self._alias_key(sources['aliases'])
+        results = self.pipeline.run(sources, ['clean_combined', 'resolve_play', 'resolve_request'],
+                                    {'aliases': alias_key})
+
+        # Aliases saved by the resolve stages must not invalidate them on the next run
+        written = self.matcher.load_aliases()
+        if written != loaded:
+            self.matcher.aliases = written
+            self._save_alias_key(hash_dataframe(self.matcher.alias_table()), alias_key)
+        unmatched = pd.concat([results['resolve_play']['unmatched'], results['resolve_request']['unmatched']],
+                              ignore_index=True).drop_duplicates(subset=['song', 'artist'])
+        return results['clean_combined'], unmatched
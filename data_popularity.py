@@ -0,0 +1,111 @@
+import logging
+import numpy as np
+import pandas as pd
+from data_filtering import event_indicator, new_sessions
+
+class RollingPopularity:
+    """
+    Maintains per-song popularity over time so windowed scores don't require rescanning the history.
+
+    Each Tuesday contributes one point per play and one per request. The class keeps a prefix sum
+    of weekly scores per song, so the score over any window of weeks is a single subtraction, and
+    an exponentially decayed score that is updated as new weeks arrive.
+    """
+    def __init__(self, decay=0.9):
+        """
+        :param decay: Weight applied to the decayed score for every week that passes.
+        """
+        self.decay = decay
+        self.songs = []
+        self.weeks = []
+        self._song_index = {}
+        self._prefix = np.zeros((0, 1))
+        self._decayed = np.zeros(0)
+
+    def _ensure_capacity(self, n_songs, n_weeks):
+        """Grows the prefix sum array geometrically so appending weeks stays cheap."""
+        rows, cols = self._prefix.shape
+        if n_songs <= rows and n_weeks + 1 <= cols:
+            return
+        new_rows = max(n_songs, rows * 2, 16) if n_songs > rows else rows
+        new_cols = max(n_weeks + 1, cols * 2, 16) if n_weeks + 1 > cols else cols
+        prefix = np.zeros((new_rows, new_cols))
+        prefix[:rows, :cols] = self._prefix
+        # New songs carry a zero history, so their prefix sums stay at zero
+        self._prefix = prefix
+
+        decayed = np.zeros(new_rows)
+        decayed[:len(self._decayed)] = self._decayed
+        self._decayed = decayed
+
+    def update(self, df):
+        """
+        Adds the sessions in df that are newer than the latest session already seen.
+
+        :param df: Combined DataFrame with 'song', 'artist', 'dates', 'play_value' and 'requested_value'.
+        """
+        rows = len(df)
+        df, weeks = new_sessions(df, self.weeks[-1] if self.weeks else None)
+        if len(df) < rows:
+            logging.info(f"Ignored {rows - len(df)} rows from weeks already in the popularity index.")
+        if df.empty:
+            return
+
+        request_column = 'requested_value' if 'requested_value' in df.columns else 'request_value'
+        scores = event_indicator(df['play_value'])
+        if request_column in df.columns:
+            scores = scores + event_indicator(df[request_column])
+
+        weekly = (pd.DataFrame({'week': weeks, 'song': df['song'], 'artist': df['artist'], 'score': scores})
+                  .groupby(['week', 'song', 'artist'], sort=True)['score'].sum())
+
+        for key in weekly.index.droplevel('week').unique():
+            if key not in self._song_index:
+                self._song_index[key] = len(self.songs)
+                self.songs.append(key)
+
+        new_weeks = weekly.index.get_level_values('week').unique().sort_values()
+        first = len(self.weeks)
+        self._ensure_capacity(len(self.songs), first + len(new_weeks))
+
+        week_pos = new_weeks.get_indexer(weekly.index.get_level_values('week'))
+        song_pos = np.array([self._song_index[key] for key in weekly.index.droplevel('week')])
+        counts = np.zeros((len(self.songs), len(new_weeks)))
+        np.add.at(counts, (song_pos, week_pos), weekly.to_numpy())
+
+        n = len(self.songs)
+        self._prefix[:n, first + 1:first + 1 + len(new_weeks)] = (
+            self._prefix[:n, first:first + 1] + np.cumsum(counts, axis=1))
+        for j in range(len(new_weeks)):
+            self._decayed[:n] = self._decayed[:n] * self.decay + counts[:, j]
+
+        self.weeks.extend(new_weeks)
+        logging.info(f"Added {len(new_weeks)} weeks to the popularity index ({n} songs).")
+
+    def _index(self):
+        return pd.MultiIndex.from_tuples(self.songs, names=['song', 'artist'])
+
+    def window_scores(self, last_n_weeks=None, end_date=None):
+        """
+        Returns each song's score over a window of weeks.
+
+        :param last_n_weeks: Number of weeks in the window. If None, all weeks up to end_date are used.
+        :param end_date: Last date of the window. If None, the window ends at the latest week.
+        :return: Series of scores indexed by song and artist.
+        """
+        n = len(self.songs)
+        end = len(self.weeks)
+        if end_date is not None:
+            end = int(np.searchsorted(np.array(self.weeks, dtype='datetime64[ns]'),
+                                      np.datetime64(pd.Timestamp(end_date), 'ns'), side='right'))
+        start = 0 if last_n_weeks is None else max(0, end - last_n_weeks)
+        scores = self._prefix[:n, end] - self._prefix[:n, start]
+        return pd.Series(scores, index=self._index(), name='popularity_score')
+
+    def decayed_scores(self):
+        """
+        Returns each song's exponentially decayed score as of the latest week.
+
+        :return: Series of scores indexed by song and artist.
+        """
+        return pd.Series(self._decayed[:len(self.songs)].copy(), index=self._index(), name='decayed_score')
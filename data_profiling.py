@@ -0,0 +1,150 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+class DataProfiler:
+    """
+    Builds a data quality profile of a file or DataFrame in a single pass.
+
+    Files are read in chunks and every column's statistics are accumulated chunk by chunk, so
+    profiling costs one read of the file and can run on every upload. The profile covers null,
+    'Unknown' and '?' counts, cardinality, min/max, unparseable dates and durations, and
+    duplicate rows.
+    """
+    PLACEHOLDER_VALUES = {'unknown': 'Unknown', 'question_mark': '?'}
+    DATE_COLUMNS = {'date': '%Y%m%d', 'first_play_date': None, 'dates': None}
+    DURATION_COLUMNS = ['duration']
+
+    def _new_column_stats(self):
+        return {'count': 0, 'nulls': 0, 'unknown': 0, 'question_mark': 0,
+                'min': None, 'max': None, 'hashes': set(), 'unparseable': None}
+
+    def _update_column(self, stats, column, series):
+        stats['count'] += len(series)
+        stats['nulls'] += int(series.isna().sum())
+        non_null = series.dropna()
+        if non_null.empty:
+            return
+
+        text = non_null.astype(str).str.strip()
+        placeholders = text.isin(self.PLACEHOLDER_VALUES.values())
+        if pd.api.types.is_numeric_dtype(non_null.dtype):
+            low, high = non_null.min(), non_null.max()
+        else:
+            for key, value in self.PLACEHOLDER_VALUES.items():
+                stats[key] += int((text == value).sum())
+            low, high = text.min(), text.max()
+        try:
+            stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+            stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+        except TypeError:
+            # Chunks of the same column were read with different types
+            stats['min'], stats['max'] = min(str(stats['min']), str(low)), max(str(stats['max']), str(high))
+        stats['hashes'].update(np.unique(pd.util.hash_array(non_null.to_numpy(dtype=object))).tolist())
+
+        # Values that should be dates or durations but don't parse
+        if column in self.DATE_COLUMNS:
+            date_format = self.DATE_COLUMNS[column]
+            values = text[~placeholders]
+            if pd.api.types.is_float_dtype(non_null.dtype) and (non_null % 1 == 0).all():
+                values = non_null.astype('int64').astype(str)  # e.g. 20230117.0 read from a column with blanks
+            parsed = pd.to_datetime(values, format=date_format, errors='coerce') if date_format \
+                else pd.to_datetime(values, errors='coerce', format='mixed')
+            stats['unparseable'] = (stats['unparseable'] or 0) + int(parsed.isna().sum())
+        elif column in self.DURATION_COLUMNS:
+            parsed = pd.to_timedelta(text[~placeholders], errors='coerce')
+            stats['unparseable'] = (stats['unparseable'] or 0) + int(parsed.isna().sum())
+
+    def _profile_chunks(self, chunks, name):
+        rows = 0
+        row_hashes = set()
+        columns = {}
+        date_headers = []
+        for chunk in chunks:
+            if not columns:
+                # Date-named columns in playdb/requestdb (e.g. '20230117') must be valid dates themselves
+                date_headers = [col for col in chunk.columns if str(col).isdigit()]
+            rows += len(chunk)
+            row_hashes.update(pd.util.hash_pandas_object(chunk, index=False).tolist())
+            for col in chunk.columns:
+                stats = columns.setdefault(col, self._new_column_stats())
+                self._update_column(stats, col, chunk[col])
+
+        invalid_headers = [col for col in date_headers
+                           if pd.isna(pd.to_datetime(col, format='%Y%m%d', errors='coerce'))]
+        report = {
+            'name': name,
+            'rows': rows,
+            'duplicate_rows': rows - len(row_hashes),
+            'unparseable_date_headers': invalid_headers,
+            'columns': {},
+        }
+        for col, stats in columns.items():
+            count = stats['count'] or 1
+            report['columns'][str(col)] = {
+                'null_rate': round(stats['nulls'] / count, 4),
+                'unknown_rate': round(stats['unknown'] / count, 4),
+                'question_mark_rate': round(stats['question_mark'] / count, 4),
+                'cardinality': len(stats['hashes']),
+                'min': self._to_json_value(stats['min']),
+                'max': self._to_json_value(stats['max']),
+                'unparseable': stats['unparseable'],
+            }
+        logging.info(f"Profiled {name}: {rows} rows, {len(columns)} columns, {report['duplicate_rows']} duplicate rows.")
+        return report
+
+    @staticmethod
+    def _to_json_value(value):
+        if value is None:
+            return None
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+            return str(value)
+        return value
+
+    def profile_file(self, file_path, chunksize=50000):
+        """
+        Profiles a CSV file, reading it once in chunks.
+
+        :param file_path: Path of the CSV file.
+        :param chunksize: Number of rows read at a time.
+        :return: Profile dictionary.
+        """
+        return self._profile_chunks(pd.read_csv(file_path, chunksize=chunksize), os.path.basename(file_path))
+
+    def profile_frame(self, df, name='combined_data', chunksize=50000):
+        """
+        Profiles a DataFrame already in memory.
+
+        :param df: DataFrame to profile.
+        :param name: Name recorded in the profile.
+        :param chunksize: Number of rows processed at a time.
+        :return: Profile dictionary.
+        """
+        chunks = (df.iloc[start:start + chunksize] for start in range(0, max(len(df), 1), chunksize))
+        return self._profile_chunks(chunks, name)
+
+    def summary_frame(self, report):
+        """
+        Converts a profile into a DataFrame with one row per column, for display.
+
+        :param report: Profile dictionary.
+        :return: DataFrame.
+        """
+        summary = pd.DataFrame.from_dict(report['columns'], orient='index')
+        summary.index.name = 'column'
+        return summary.reset_index()
+
+    def save_report(self, reports, file_path='data_profile.json'):
+        """
+        Saves one or more profiles as a JSON report.
+
+        :param reports: List of profile dictionaries.
+        :param file_path: Path of the JSON file.
+        """
+        with open(file_path, 'w') as f:
+            json.dump(reports, f, indent=2, default=str)
+        logging.info(f"Saved data profile report to {file_path}.")
@@ -0,0 +1,377 @@
+import math
+import random
+import logging
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+from data_filtering import event_indicator, new_sessions, decade_labels
+
+class HyperLogLog:
+    """
+    Approximate distinct count in a fixed amount of memory.
+
+    Registers start out sparse (a dictionary of the registers set so far), which keeps the many
+    small per-week sketches cheap, and switch to a dense array once they fill up. Two sketches
+    merge by taking the maximum of each register, giving the distinct count of the union.
+    """
+    def __init__(self, p=12):
+        """
+        :param p: Number of index bits. Uses 2**p registers; the standard error is 1.04 / sqrt(2**p).
+        """
+        if not 4 <= p <= 16:
+            raise ValueError("p must be between 4 and 16.")
+        self.p = p
+        self.m = 1 << p
+        self.sparse = {}
+        self.registers = None
+
+    @property
+    def relative_error(self):
+        """Standard error of count() relative to the true distinct count."""
+        return 1.04 / math.sqrt(self.m)
+
+    def _to_dense(self):
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+        if self.sparse:
+            self.registers[list(self.sparse)] = list(self.sparse.values())
+        self.sparse = None
+
+    @staticmethod
+    def hash_values(values, p=12):
+        """
+        Hashes values to the register each one updates and the rank it sets, so many sketches can
+        be filled from one pass over a column with add_hashed.
+
+        :param values: Series or iterable of values.
+        :param p: Number of index bits of the sketches.
+        :return: Tuple of (register index, rank) arrays aligned with values. Missing values get rank 0,
+                 which never changes a register.
+        """
+        values = pd.Series(values, dtype=object)
+        missing = values.isna().to_numpy()
+        hashes = pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        # Rank of the first set bit in the remaining 64 - p bits (64 - p + 1 if none is set)
+        remainder = (hashes & np.uint64((1 << (64 - p)) - 1)).astype(np.float64)
+        _, bit_length = np.frexp(remainder)
+        rank = ((64 - p) - bit_length + 1).astype(np.uint8)
+        rank[missing] = 0
+        return index, rank
+
+    def add(self, values):
+        """
+        Adds values to the sketch.
+
+        :param values: Iterable of values. Missing values are ignored.
+        """
+        self.add_hashed(*self.hash_values(values, self.p))
+
+    def add_hashed(self, index, rank):
+        """
+        Adds values already hashed with hash_values.
+
+        :param index: Register index array.
+        :param rank: Rank array.
+        """
+        if not len(index):
+            return
+        if self.registers is not None:
+            np.maximum.at(self.registers, index, rank)
+            return
+        for i, r in zip(index.tolist(), rank.tolist()):
+            if r > self.sparse.get(i, 0):
+                self.sparse[i] = r
+        if len(self.sparse) > self.m // 8:
+            self._to_dense()
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one.
+
+        :param other: HyperLogLog with the same p.
+        :return: self.
+        """
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different p.")
+        if self.registers is None and other.registers is None:
+            for i, r in other.sparse.items():
+                if r > self.sparse.get(i, 0):
+                    self.sparse[i] = r
+            if len(self.sparse) > self.m // 8:
+                self._to_dense()
+            return self
+        if self.registers is None:
+            self._to_dense()
+        if other.registers is not None:
+            np.maximum(self.registers, other.registers, out=self.registers)
+        elif other.sparse:
+            index = np.fromiter(other.sparse.keys(), dtype=np.int64)
+            np.maximum.at(self.registers, index, np.fromiter(other.sparse.values(), dtype=np.uint8))
+        return self
+
+    def count(self):
+        """Returns the estimated number of distinct values added."""
+        if self.registers is None:
+            ranks = np.fromiter(self.sparse.values(), dtype=np.float64)
+            zeros = self.m - len(ranks)
+        else:
+            ranks = self.registers.astype(np.float64)
+            zeros = int((self.registers == 0).sum())
+            ranks = ranks[ranks > 0]
+        harmonic = zeros + np.sum(2.0 ** -ranks)
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / harmonic
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # Linear counting is more accurate for small counts
+        return int(round(estimate))
+
+class KLLSketch:
+    """
+    Approximate quantiles in a bounded amount of memory (KLL sketch).
+
+    Values are kept in a stack of compactors. When a level overflows it is sorted and every
+    other item, starting at a random offset, is promoted to the level above with double the
+    weight. Lower levels get geometrically smaller capacities, so the sketch holds about 3 * k
+    items however many values are added. Sketches merge by concatenating their levels.
+    """
+    def __init__(self, k=200, seed=None):
+        """
+        :param k: Size of the top compactor. The rank error shrinks roughly as 1/k.
+        :param seed: Seed for the compaction offsets, for reproducible results.
+        """
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self._random = random.Random(seed)
+
+    @property
+    def rank_error(self):
+        """Normalized rank error of quantile estimates (99% confidence, as measured for KLL sketches)."""
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        # Compact the lowest full level until the sketch fits within its total capacity
+        while sum(map(len, self.compactors)) > sum(self._capacity(level) for level in range(len(self.compactors))):
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    items = sorted(items)
+                    kept = [items.pop()] if len(items) % 2 else []
+                    self.compactors[level + 1].extend(items[self._random.randint(0, 1)::2])
+                    self.compactors[level] = kept
+                    break
+
+    def update(self, values):
+        """
+        Adds values to the sketch.
+
+        :param values: Iterable of numbers. Missing values are ignored.
+        """
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+            values = values[~np.isnan(values)].tolist()
+        else:
+            values = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').dropna().astype(float).tolist()
+        if not values:
+            return
+        for start in range(0, len(values), self.k):
+            self.compactors[0].extend(values[start:start + self.k])
+            self._compress()
+        self.n += len(values)
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one.
+
+        :param other: KLLSketch.
+        :return: self.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """
+        Returns the estimated quantiles.
+
+        :param qs: List of quantiles between 0 and 1.
+        :return: List of values, or NaN for each quantile if the sketch is empty.
+        """
+        items = np.array([item for items in self.compactors for item in items], dtype=np.float64)
+        if not len(items):
+            return [np.nan for _ in qs]
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.float64)
+                                  for level, items in enumerate(self.compactors)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs, dtype=np.float64) * cumulative[-1], side='left')
+        return items[np.minimum(positions, len(items) - 1)].tolist()
+
+class SketchStore:
+    """
+    Approximate distinct counts and quantiles of the played songs over any date range.
+
+    For every Tuesday session, overall and per category of each GROUP_COLUMNS column, it keeps
+    HyperLogLog sketches of the distinct songs and artists and KLL sketches of difficulty and
+    duration. A query merges the sketches of the sessions in the range, so it costs the same for
+    one month or several years of data. Stores built from different partitions can be merged.
+    """
+    GROUP_COLUMNS = ['type_of_performer', 'decade', 'language', 'source']
+    DISTINCT_COLUMNS = ['song', 'artist']
+    QUANTILE_COLUMNS = ['difficulty', 'duration']
+
+    def __init__(self, p=12, k=200):
+        """
+        :param p: HyperLogLog index bits (see HyperLogLog).
+        :param k: KLL compactor size (see KLLSketch).
+        """
+        self.p = p
+        self.k = k
+        self.dates = []
+        self._sketches = {}
+
+    def _new_sketches(self):
+        sketches = {column: HyperLogLog(self.p) for column in self.DISTINCT_COLUMNS}
+        sketches.update({column: KLLSketch(self.k, seed=0) for column in self.QUANTILE_COLUMNS})
+        return sketches
+
+    @staticmethod
+    def _values(df, column):
+        """Returns the values sketched for a column: song/artist pairs for songs, seconds for durations."""
+        if column == 'song':
+            return df['song'].astype(str) + ' - ' + df['artist'].astype(str)
+        if column == 'duration':
+            return pd.to_timedelta(df['duration'], errors='coerce').dt.total_seconds()
+        if column == 'difficulty':
+            return pd.to_numeric(df['difficulty'], errors='coerce')
+        return df[column]
+
+    @staticmethod
+    def _categories(df, group_column):
+        if group_column == 'decade':
+            return decade_labels(df)
+        return df[group_column].fillna('Unknown').astype(str)
+
+    def update(self, df):
+        """
+        Adds the sessions in df that are newer than the latest session already sketched.
+
+        :param df: Combined DataFrame with 'song', 'artist', 'dates' and 'play_value' columns.
+        """
+        df, dates = new_sessions(df, self.dates[-1] if self.dates else None)
+        if df.empty:
+            return
+
+        new_dates = sorted(pd.Timestamp(date) for date in dates.dropna().unique())
+        played = event_indicator(df['play_value']) > 0
+        df, dates = df[played], dates[played]
+        # Hash or convert each column once; each group then only takes a slice of the arrays
+        hashed = {column: HyperLogLog.hash_values(self._values(df, column), self.p)
+                  for column in self.DISTINCT_COLUMNS if column in df.columns}
+        numbers = {column: self._values(df, column).to_numpy(dtype=np.float64, na_value=np.nan)
+                   for column in self.QUANTILE_COLUMNS if column in df.columns}
+
+        groupings = [(None, pd.Series('All', index=df.index))]
+        groupings += [(col, self._categories(df, col)) for col in self.GROUP_COLUMNS
+                      if col in df.columns or (col == 'decade' and 'year' in df.columns)]
+        for date in new_dates:
+            self._sketches[date] = {}
+        for group_column, categories in groupings:
+            for (date, category), positions in df.groupby([dates, categories]).indices.items():
+                sketches = self._new_sketches()
+                for column, (index, rank) in hashed.items():
+                    sketches[column].add_hashed(index[positions], rank[positions])
+                for column, values in numbers.items():
+                    sketches[column].update(values[positions])
+                self._sketches[pd.Timestamp(date)][(group_column, category)] = sketches
+
+        self.dates.extend(new_dates)
+        logging.info(f"Added sketches for {len(new_dates)} sessions.")
+
+    def merge(self, other):
+        """
+        Merges the sketches of another store, e.g. one built from a different partition.
+
+        :param other: SketchStore with the same p and k.
+        :return: self.
+        """
+        for date, groups in other._sketches.items():
+            target = self._sketches.setdefault(date, {})
+            for key, sketches in groups.items():
+                merged = target.setdefault(key, self._new_sketches())
+                for column, sketch in sketches.items():
+                    merged[column].merge(sketch)
+        self.dates = sorted(self._sketches)
+        return self
+
+    def _merged(self, column, start_date, end_date, group_column, freq):
+        """Merges the sketches of one column per (period, category) within the date range."""
+        lo = bisect_left(self.dates, pd.Timestamp(start_date)) if start_date is not None else 0
+        hi = bisect_right(self.dates, pd.Timestamp(end_date)) if end_date is not None else len(self.dates)
+        merged = {}
+        for date in self.dates[lo:hi]:
+            period = str(date.to_period(freq)) if freq else None
+            for (key_group, category), sketches in self._sketches[date].items():
+                if key_group != group_column or column not in sketches:
+                    continue
+                if (period, category) not in merged:
+                    merged[(period, category)] = self._new_sketches()[column]
+                merged[(period, category)].merge(sketches[column])
+        return merged
+
+    @staticmethod
+    def _key_columns(group_column, freq):
+        return (['period'] if freq else []) + [group_column or 'category']
+
+    def distinct_count(self, column, start_date=None, end_date=None, group_column=None, freq=None):
+        """
+        Estimates the number of distinct songs or artists played.
+
+        :param column: 'song' or 'artist'.
+        :param start_date: Start of the range (inclusive). None for the first session.
+        :param end_date: End of the range (inclusive). None for the last session.
+        :param group_column: One of GROUP_COLUMNS to count per category, or None for all songs.
+        :param freq: Optional pandas period frequency ('M', 'Q', 'Y') to count per period.
+        :return: DataFrame with 'estimate' and 'low'/'high' bounds of about 95% confidence.
+        """
+        if column not in self.DISTINCT_COLUMNS:
+            raise ValueError(f"No distinct count sketch for '{column}'.")
+        rows = []
+        for (period, category), sketch in sorted(self._merged(column, start_date, end_date, group_column, freq).items()):
+            estimate = sketch.count()
+            margin = 2 * sketch.relative_error * estimate
+            rows.append(([period] if freq else []) + [category, estimate,
+                                                      max(0, int(estimate - margin)), int(math.ceil(estimate + margin))])
+        logging.info(f"Estimated distinct {column} counts for {len(rows)} groups.")
+        return pd.DataFrame(rows, columns=self._key_columns(group_column, freq) + ['estimate', 'low', 'high'])
+
+    def quantiles(self, column, qs=(0.5, 0.9), start_date=None, end_date=None, group_column=None, freq=None):
+        """
+        Estimates quantiles of difficulty or duration (in seconds) over the songs played.
+
+        :param column: 'difficulty' or 'duration'.
+        :param qs: Quantiles between 0 and 1.
+        :param start_date: Start of the range (inclusive). None for the first session.
+        :param end_date: End of the range (inclusive). None for the last session.
+        :param group_column: One of GROUP_COLUMNS to compute per category, or None for all songs.
+        :param freq: Optional pandas period frequency ('M', 'Q', 'Y') to compute per period.
+        :return: DataFrame with 'count', one 'q<percent>' column per quantile and 'rank_error',
+                 the bound on how far each estimate's rank may be from the requested quantile.
+        """
+        if column not in self.QUANTILE_COLUMNS:
+            raise ValueError(f"No quantile sketch for '{column}'.")
+        rows = []
+        for (period, category), sketch in sorted(self._merged(column, start_date, end_date, group_column, freq).items()):
+            rows.append(([period] if freq else []) + [category, sketch.n] + sketch.quantiles(qs)
+                        + [round(sketch.rank_error, 4)])
+        quantile_columns = [f"q{q * 100:g}" for q in qs]
+        logging.info(f"Estimated {column} quantiles for {len(rows)} groups.")
+        return pd.DataFrame(rows, columns=self._key_columns(group_column, freq) + ['count'] + quantile_columns + ['rank_error'])
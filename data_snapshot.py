@@ -0,0 +1,279 @@
+import os
+import json
+import pickle
+import hashlib
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+
+class DataSnapshot:
+    """
+    This class persists the processed dataset and the last session selections so the program
+    can restore them on startup instead of re-uploading and re-preprocessing the source files.
+
+    Every column is stored as its own .npy file so it can be memory-mapped on load. Text columns
+    are dictionary-encoded (integer codes plus a small table of unique values), which also serves
+    as a ready-made index for columns like 'song', 'artist' and 'language'.
+    """
+    MANIFEST_FILE = 'manifest.json'
+    CATEGORIES_FILE = 'categories.pkl'
+    UI_STATE_FILE = 'ui_state.json'
+    DATES_INDEX_FILE = 'dates_order.npy'
+
+    def __init__(self, snapshot_dir='session_snapshot'):
+        self.snapshot_dir = snapshot_dir
+        self._manifest = None
+        self._date_index = None
+
+    def fingerprint(self, source_paths):
+        """
+        Computes a fingerprint of the source files the dataset was built from.
+
+        :param source_paths: Dictionary mapping a source name (e.g. 'tabdb') to its file path.
+        :return: Hex digest, or None if any source file is missing.
+        """
+        digest = hashlib.sha256()
+        for name in sorted(source_paths):
+            path = source_paths[name]
+            if not path or not os.path.exists(path):
+                logging.info(f"Source file for '{name}' not found: {path}")
+                return None
+            digest.update(name.encode())
+            digest.update(str(os.path.getsize(path)).encode())
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def save(self, df, source_paths):
+        """
+        Saves the processed dataset along with the fingerprint of its source files.
+
+        :param df: Processed DataFrame to persist.
+        :param source_paths: Dictionary mapping a source name to its file path.
+        :return: Fingerprint of the source files.
+        """
+        tmp_dir = self.snapshot_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        columns = []
+        categories = {}
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            file_name = f'col_{i}.npy'
+            dtype = str(series.dtype)
+            if pd.api.types.is_datetime64_dtype(series.dtype):
+                kind = 'datetime'
+                values = series.to_numpy().view('i8')
+            elif pd.api.types.is_bool_dtype(series.dtype) and not series.hasnans:
+                kind = 'numeric'
+                values = series.to_numpy(dtype=bool)
+            elif pd.api.types.is_numeric_dtype(series.dtype):
+                kind = 'numeric'
+                values = series.to_numpy(dtype='float64', na_value=np.nan) if series.hasnans else series.to_numpy()
+            else:
+                kind = 'encoded'
+                codes, uniques = pd.factorize(series)
+                values = codes.astype('int32')
+                categories[i] = np.asarray(uniques, dtype=object)
+            np.save(os.path.join(tmp_dir, file_name), values, allow_pickle=False)
+            columns.append({'name': col, 'file': file_name, 'kind': kind, 'dtype': dtype})
+
+        with open(os.path.join(tmp_dir, self.CATEGORIES_FILE), 'wb') as f:
+            pickle.dump(categories, f)
+
+        # Row order sorted by date, so date range lookups can use a binary search
+        if 'dates' in df.columns and pd.api.types.is_datetime64_dtype(df['dates'].dtype):
+            np.save(os.path.join(tmp_dir, self.DATES_INDEX_FILE),
+                    np.argsort(df['dates'].to_numpy(), kind='stable'), allow_pickle=False)
+
+        manifest = {
+            'rows': len(df),
+            'columns': columns,
+            'source_paths': {name: os.path.abspath(path) for name, path in source_paths.items()},
+            'fingerprint': self.fingerprint(source_paths),
+        }
+        with open(os.path.join(tmp_dir, self.MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Keep the UI state of the previous snapshot
+        ui_state_path = os.path.join(self.snapshot_dir, self.UI_STATE_FILE)
+        if os.path.exists(ui_state_path):
+            shutil.copy(ui_state_path, tmp_dir)
+
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+        os.replace(tmp_dir, self.snapshot_dir)
+        self._manifest = manifest
+        self._date_index = None
+        logging.info(f"Saved session snapshot of {len(df)} rows to '{self.snapshot_dir}'.")
+        return manifest['fingerprint']
+
+    def _read_manifest(self):
+        if self._manifest is None:
+            path = os.path.join(self.snapshot_dir, self.MANIFEST_FILE)
+            if not os.path.exists(path):
+                return None
+            with open(path) as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    def is_valid(self):
+        """
+        Checks that a snapshot exists and that its source files have not changed since it was saved.
+
+        :return: True if the snapshot can be restored.
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return False
+        current = self.fingerprint(manifest['source_paths'])
+        if current is None or current != manifest['fingerprint']:
+            logging.info("Session snapshot is out of date with its source files.")
+            return False
+        return True
+
+    def saved_fingerprint(self):
+        """Returns the source fingerprint recorded when the snapshot was saved."""
+        manifest = self._read_manifest()
+        return manifest['fingerprint'] if manifest else None
+
+    def rows(self):
+        """Returns the number of rows in the snapshot, or None if there is none."""
+        manifest = self._read_manifest()
+        return manifest['rows'] if manifest else None
+
+    def source_paths(self):
+        """Returns the source file paths recorded in the snapshot."""
+        manifest = self._read_manifest()
+        return dict(manifest['source_paths']) if manifest else {}
+
+    def columns(self):
+        """Returns the column names of the snapshot without loading it, or None if there is none."""
+        manifest = self._read_manifest()
+        return [column['name'] for column in manifest['columns']] if manifest else None
+
+    def _read_rows(self, manifest, categories, rows, mmap):
+        """Decodes the given rows (a slice) of every column into a DataFrame."""
+        data = {}
+        for i, column in enumerate(manifest['columns']):
+            values = np.load(os.path.join(self.snapshot_dir, column['file']), mmap_mode='r')[rows]
+            if column['kind'] == 'encoded':
+                uniques = categories[i]
+                restored = np.empty(len(values), dtype=object)
+                valid = values >= 0
+                restored[valid] = uniques[values[valid]]
+                restored[~valid] = np.nan
+                series = pd.Series(restored)
+                if column['dtype'] != 'object':
+                    series = series.astype(column['dtype'])
+            else:
+                if not mmap:
+                    values = np.array(values)
+                if column['kind'] == 'datetime':
+                    values = values.view(column['dtype'])
+                series = pd.Series(values)
+                if str(series.dtype) != column['dtype']:
+                    series = series.astype(column['dtype'])
+            data[column['name']] = series
+        return pd.DataFrame(data)
+
+    def _read_categories(self):
+        with open(os.path.join(self.snapshot_dir, self.CATEGORIES_FILE), 'rb') as f:
+            return pickle.load(f)
+
+    def load(self, mmap=False):
+        """
+        Loads the persisted dataset.
+
+        :param mmap: If True, numeric and date columns are read-only memory-mapped views instead of copies.
+        :return: DataFrame, or None if there is no snapshot.
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return None
+        df = self._read_rows(manifest, self._read_categories(), slice(None), mmap)
+        logging.info(f"Restored session snapshot of {len(df)} rows from '{self.snapshot_dir}'.")
+        return df
+
+    def iter_chunks(self, chunksize=50000):
+        """
+        Reads the persisted dataset in chunks of rows, so it can be copied elsewhere without
+        holding all of it in memory.
+
+        :param chunksize: Number of rows per chunk.
+        :return: Generator of DataFrames, empty if there is no snapshot.
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return
+        categories = self._read_categories()
+        for start in range(0, manifest['rows'], chunksize):
+            chunk = self._read_rows(manifest, categories, slice(start, start + chunksize), mmap=False)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            yield chunk
+
+    def rows_between(self, start_date, end_date):
+        """
+        Returns the row positions with 'dates' between the given dates, using the persisted date index.
+
+        :param start_date: Start of the range (inclusive).
+        :param end_date: End of the range (inclusive).
+        :return: Sorted array of row positions, or None if the snapshot has no date index.
+        """
+        if self._date_index is None:
+            manifest = self._read_manifest()
+            index_path = os.path.join(self.snapshot_dir, self.DATES_INDEX_FILE)
+            if manifest is None or not os.path.exists(index_path):
+                return None
+            column = next(c for c in manifest['columns'] if c['name'] == 'dates')
+            dates = np.load(os.path.join(self.snapshot_dir, column['file']), mmap_mode='r').view(column['dtype'])
+            order = np.load(index_path)
+            # Keep the sorted dates, so each lookup is only two binary searches
+            self._date_index = (order, np.asarray(dates[order]))
+        order, sorted_dates = self._date_index
+        lo = np.searchsorted(sorted_dates, np.datetime64(pd.Timestamp(start_date)), side='left')
+        hi = np.searchsorted(sorted_dates, np.datetime64(pd.Timestamp(end_date)), side='right')
+        return np.sort(order[lo:hi])
+
+    def load_ui_state(self):
+        """Returns the last saved chart and query selections."""
+        path = os.path.join(self.snapshot_dir, self.UI_STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading session UI state: {e}")
+            return {}
+
+    def save_ui_state(self, ui_state):
+        """
+        Saves the chart and query selections so they can be restored next session.
+
+        :param ui_state: JSON-serialisable dictionary of selections.
+        """
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with open(os.path.join(self.snapshot_dir, self.UI_STATE_FILE), 'w') as f:
+            json.dump(ui_state, f, indent=2)
+
+def load_dataset(data_path=None, snapshot_dir='session_snapshot'):
+    """
+    Loads the persisted combined dataset, preferring the session snapshot.
+
+    :param data_path: Combined dataset CSV, used if given or if there is no snapshot.
+    :param snapshot_dir: Session snapshot directory saved by the GUI.
+    :return: DataFrame.
+    """
+    if data_path is None:
+        snapshot = DataSnapshot(snapshot_dir)
+        df = snapshot.load(mmap=True)
+        if df is not None:
+            return df
+        data_path = 'combined_dataset.csv'
+    df = pd.read_csv(data_path)
+    df['dates'] = pd.to_datetime(df['dates'], errors='coerce')
+    logging.info(f"Loaded {len(df)} rows from {data_path}.")
+    return df
@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import logging
+import pandas as pd
+
+class SQLiteQueryBackend:
+    """
+    Optional embedded SQLite backend for querying the combined dataset.
+
+    The dataset is bulk-loaded into an indexed table on disk, filters and play-count aggregation
+    are pushed down to SQL, and results stream back in pages, so datasets larger than memory can
+    be queried locally without a server.
+    """
+    TABLE = 'combined_data'
+    INDEXES = {
+        'idx_dates': ['dates'],
+        'idx_song_artist': ['song', 'artist'],
+        'idx_language': ['language'],
+        'idx_source': ['source'],
+        'idx_difficulty': ['difficulty'],
+    }
+    DATE_FORMAT = '%Y-%m-%d'
+
+    def __init__(self, db_path='combined_data.sqlite'):
+        self.db_path = db_path
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    @staticmethod
+    def _quote(column):
+        """Quotes a column name for use in SQL (columns like 'special books' contain spaces)."""
+        return '"' + column.replace('"', '""') + '"'
+
+    def _format_date(self, value):
+        return pd.to_datetime(value).strftime(self.DATE_FORMAT)
+
+    def _prepare_chunk(self, chunk):
+        """Stores dates as ISO text so range predicates compare correctly and can use the index."""
+        if 'dates' in chunk.columns:
+            chunk = chunk.copy()
+            chunk['dates'] = pd.to_datetime(chunk['dates'], errors='coerce').dt.strftime(self.DATE_FORMAT)
+        return chunk
+
+    def _load_chunks(self, chunks, version):
+        tmp_path = self.db_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute('PRAGMA journal_mode=OFF')
+            conn.execute('PRAGMA synchronous=OFF')
+            total = 0
+            for chunk in chunks:
+                self._prepare_chunk(chunk).to_sql(self.TABLE, conn, if_exists='append', index=False)
+                total += len(chunk)
+
+            columns = self._table_columns(conn)
+            for name, index_columns in self.INDEXES.items():
+                if all(col in columns for col in index_columns):
+                    conn.execute(f"CREATE INDEX {name} ON {self.TABLE} "
+                                 f"({', '.join(self._quote(col) for col in index_columns)})")
+            conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (version,))
+            conn.execute('ANALYZE')
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.db_path)
+        logging.info(f"Loaded {total} rows into SQLite backend '{self.db_path}'.")
+
+    def load_dataframe(self, df, version=None, chunksize=50000):
+        """
+        Bulk-loads a DataFrame into the backend, replacing any previously loaded data.
+
+        :param df: Combined DataFrame to load.
+        :param version: Identifier of the dataset, used to skip reloading unchanged data.
+        :param chunksize: Number of rows inserted per batch.
+        """
+        chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+        self._load_chunks(chunks, version)
+
+    def load_csv(self, file_path, version=None, chunksize=50000):
+        """
+        Bulk-loads a combined dataset CSV into the backend without reading it into memory at once.
+
+        :param file_path: Path of the combined dataset CSV.
+        :param version: Identifier of the dataset, used to skip reloading unchanged data.
+        :param chunksize: Number of rows read and inserted per batch.
+        """
+        self._load_chunks(pd.read_csv(file_path, chunksize=chunksize), version)
+
+    def load_snapshot(self, snapshot, version=None, chunksize=50000):
+        """
+        Bulk-loads a session snapshot into the backend chunk by chunk, without restoring the whole
+        dataset as a DataFrame first.
+
+        :param snapshot: DataSnapshot to load.
+        :param version: Identifier of the dataset. Defaults to the snapshot's source fingerprint.
+        :param chunksize: Number of rows read and inserted per batch.
+        """
+        if version is None:
+            version = snapshot.saved_fingerprint()
+        self._load_chunks(snapshot.iter_chunks(chunksize), version)
+
+    def version(self):
+        """Returns the version of the loaded dataset, or None if nothing is loaded."""
+        if not os.path.exists(self.db_path):
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+
+    def _table_columns(self, conn):
+        return [row[1] for row in conn.execute(f'PRAGMA table_info({self.TABLE})')]
+
+    def columns(self):
+        """Returns the columns of the loaded table."""
+        conn = self._connect()
+        try:
+            return self._table_columns(conn)
+        finally:
+            conn.close()
+
+    def _build_where(self, columns, filters=None, date_range=None):
+        """
+        Translates filters and a date range, as given to DataFiltering.filter_data, into a SQL WHERE clause.
+
+        :return: Tuple of (where clause, parameters).
+        """
+        clauses, params = [], []
+        if filters:
+            for col, value in filters.items():
+                if col in columns:
+                    clauses.append(f'{self._quote(col)} = ?')
+                    params.append(value)
+        if date_range and 'dates' in columns:
+            start_date, end_date = date_range
+            clauses.append('dates BETWEEN ? AND ?')
+            params.extend([self._format_date(start_date), self._format_date(end_date)])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        return where, params
+
+    def _read_pages(self, sql, params, page_size):
+        conn = self._connect()
+        try:
+            for page in pd.read_sql_query(sql, conn, params=params, chunksize=page_size):
+                if 'dates' in page.columns:
+                    page['dates'] = pd.to_datetime(page['dates'])
+                yield page
+        finally:
+            conn.close()
+
+    def query_play_counts(self, columns, date_range=None, filters=None, page_size=10000):
+        """
+        SQL equivalent of the Data Query window: selects columns in a date range, flags played rows,
+        counts plays per song and artist, and drops duplicate song/artist/date rows.
+
+        :param columns: Columns to return.
+        :param date_range: Tuple containing start and end dates for filtering.
+        :param filters: Dictionary with column names as keys and values to filter by.
+        :param page_size: Number of rows per page.
+        :return: Generator of DataFrames with an added 'play_count' column.
+        """
+        table_columns = self.columns()
+        where, params = self._build_where(table_columns, filters, date_range)
+        # Same rule as the pandas query: any value other than a numeric zero counts as played
+        played = "CASE WHEN typeof(play_value) IN ('integer', 'real') AND play_value = 0 THEN 0 ELSE 1 END"
+
+        select = []
+        for col in columns:
+            if col == 'play_value':
+                select.append(f'{played} AS play_value')
+            elif col in table_columns:
+                select.append(self._quote(col))
+        select.append(f'SUM({played}) OVER (PARTITION BY song, artist) AS play_count')
+        select.append('ROW_NUMBER() OVER (PARTITION BY song, artist, dates ORDER BY rowid) AS row_number')
+
+        output = ', '.join(self._quote(col) for col in columns if col in table_columns) + ', play_count'
+        sql = (f"SELECT {output} FROM (SELECT rowid AS row_id, {', '.join(select)} FROM {self.TABLE}{where}) "
+               f"WHERE row_number = 1 ORDER BY row_id")
+        logging.info(f"Running SQLite play-count query for columns {columns} and date range {date_range}.")
+        return self._read_pages(sql, params, page_size)
@@ -0,0 +1,89 @@
+import logging
+import numpy as np
+import pandas as pd
+
+def lttb(x, y, n_out):
+    """
+    Downsamples a line to n_out points with the Largest-Triangle-Three-Buckets algorithm,
+    which keeps the visual shape of the line (peaks and steps) with far fewer points.
+
+    :param x: Increasing numeric x values.
+    :param y: Numeric y values.
+    :param n_out: Number of points to keep.
+    :return: Array of the indices of the kept points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # First and last points are always kept, the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third corner of the triangle
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+    return indices
+
+class WeeklySeries:
+    """
+    Weekly row counts of the combined dataset, optionally split by a categorical column.
+
+    The series is extended as newer sessions are appended, so the cumulative chart doesn't need
+    to regroup the whole dataset every time it is drawn.
+    """
+    def __init__(self, group_column=None):
+        """
+        :param group_column: Optional column (e.g. 'language' or 'source') to count separately.
+        """
+        self.group_column = group_column
+        self.last_date = None
+        self.counts = pd.DataFrame(index=pd.DatetimeIndex([], name='week'), dtype='int64')
+        self._cumulative = self.counts.copy()
+
+    def update(self, df):
+        """
+        Adds the rows of df dated after the latest date already counted.
+
+        :param df: DataFrame with a 'dates' column.
+        """
+        dates = df['dates']
+        if self.last_date is not None:
+            newer = dates > self.last_date
+            df, dates = df[newer], dates[newer]
+        dates = dates.dropna()
+        if dates.empty:
+            return
+
+        weeks = dates.dt.to_period('W').dt.start_time
+        if self.group_column and self.group_column in df.columns:
+            groups = df.loc[dates.index, self.group_column].fillna('Unknown').astype(str)
+            new_counts = groups.groupby([weeks, groups]).size().unstack(fill_value=0)
+        else:
+            new_counts = weeks.groupby(weeks).size().to_frame('count')
+        new_counts.index.name = 'week'
+
+        # Only weeks from the first new one onwards change, earlier totals are kept
+        first_week = new_counts.index.min()
+        self.counts = self.counts.add(new_counts, fill_value=0).fillna(0).astype('int64').sort_index()
+        before = self._cumulative[self._cumulative.index < first_week].reindex(columns=self.counts.columns, fill_value=0)
+        base = before.iloc[-1] if not before.empty else 0
+        changed = self.counts[self.counts.index >= first_week].cumsum() + base
+        self._cumulative = pd.concat([before, changed])
+
+        self.last_date = dates.max()
+        logging.info(f"Extended weekly series to {len(self.counts)} weeks.")
+
+    def cumulative(self):
+        """Returns the cumulative weekly counts, one column per group."""
+        return self._cumulative
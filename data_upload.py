@@ -1,11 +1,22 @@
 import os
 import pandas as pd
 import logging
-from tkinter import messagebox
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Expected structure of the three source files
+TABDB_REQUIRED_COLUMNS = [
+    'song', 'artist', 'year', 'type', 'gender', 'duration',
+    'language', 'source', 'date', 'difficulty', 'specialbooks'
+]
+TABDB_COLUMN_RENAMES = {
+    'specialbooks': 'special books',
+    'gender': 'type_of_performer'
+}
+PLAYDB_REQUIRED_COLUMNS = ['song', 'artist']
+REQUESTDB_REQUIRED_COLUMNS = ['song', 'artist']
+
 class DataUpload:
     """
     This class is responsible for loading CSV files and ensuring proper structure.
@@ -25,10 +36,12 @@ class DataUpload:
                 return df
             except Exception as e:
                 logging.error(f"Error loading {file_path}: {e}")
+                from tkinter import messagebox
                 messagebox.showerror("Error", f"Error loading file: {e}")
                 return None
         else:
             logging.error(f"File {file_path} not found.")
+            from tkinter import messagebox
             messagebox.showerror("Error", f"File not found: {file_path}")
             return None
 
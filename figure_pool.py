@@ -0,0 +1,195 @@
+import logging
+from collections import OrderedDict
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+class FigurePool:
+    """
+    Owns the figures shown in the chart viewer and frees them when they are no longer needed.
+
+    Figures are created through pyplot, because the plotting methods select them with
+    plt.figure(fig.number), and are removed from pyplot's registry as soon as they are drawn, so
+    pyplot keeps no hidden reference to them. The pool keeps at most max_figures figures and
+    max_render_bytes of cached renders, evicting the least recently viewed first. Renders are
+    dropped before figures, since they can be redrawn from the figure.
+    """
+    def __init__(self, max_figures=30, max_render_bytes=200 * 1024 * 1024):
+        """
+        :param max_figures: Maximum number of figures kept.
+        :param max_render_bytes: Maximum total size of the cached renders.
+        """
+        self.max_figures = max_figures
+        self.max_render_bytes = max_render_bytes
+        self._figures = OrderedDict()
+        self._viewed = {}
+        self._renders = OrderedDict()
+        self._render_bytes = 0
+        self.pinned = None
+
+    def new_figure(self):
+        """Creates a pyplot figure for a plotting method to draw on. Pass it to add() once drawn."""
+        return plt.figure()
+
+    def add(self, name, fig):
+        """
+        Takes ownership of a drawn figure, replacing any figure with the same name.
+
+        :param name: Name shown in the viewer, e.g. 'Pie Chart by language'.
+        :param fig: Figure from new_figure().
+        """
+        if name in self._figures:
+            self.remove(name)
+        plt.close(fig)  # Remove from pyplot's registry; the figure itself stays usable
+        self._figures[name] = fig
+        self._touch(name)
+        self._evict()
+
+    def names(self):
+        """Returns the names of the figures in the order they were added."""
+        return list(self._figures)
+
+    def figures(self):
+        """Returns the figures in the order they were added."""
+        return list(self._figures.values())
+
+    def _touch(self, name):
+        self._viewed[name] = max(self._viewed.values(), default=0) + 1
+
+    def get(self, name):
+        """Returns a figure and marks it as recently viewed."""
+        self._touch(name)
+        return self._figures[name]
+
+    def __len__(self):
+        return len(self._figures)
+
+    def cached_render(self, name, size):
+        """Returns the cached render of a figure at a canvas size (width, height), or None."""
+        key = (name, size)
+        if key not in self._renders:
+            return None
+        self._renders.move_to_end(key)
+        return self._renders[key][0]
+
+    def store_render(self, name, size, region):
+        """
+        Caches a render of a figure, as returned by the canvas's copy_from_bbox.
+
+        :param name: Figure name.
+        :param size: Canvas size (width, height) in pixels.
+        :param region: Saved pixel region.
+        """
+        key = (name, size)
+        if key in self._renders:
+            self._render_bytes -= self._renders.pop(key)[1]
+        size_bytes = size[0] * size[1] * 4  # RGBA
+        self._renders[key] = (region, size_bytes)
+        self._render_bytes += size_bytes
+        self._evict()
+
+    def _drop_renders(self, name):
+        for key in [key for key in self._renders if key[0] == name]:
+            self._render_bytes -= self._renders.pop(key)[1]
+
+    def remove(self, name):
+        """Frees a figure and its cached renders."""
+        fig = self._figures.pop(name, None)
+        self._viewed.pop(name, None)
+        self._drop_renders(name)
+        if fig is not None:
+            fig.clear()
+            plt.close(fig)
+
+    def _evict(self):
+        for key in list(self._renders):
+            if self._render_bytes <= self.max_render_bytes:
+                break
+            if key[0] != self.pinned:
+                self._render_bytes -= self._renders.pop(key)[1]
+        for name in sorted(self._figures, key=self._viewed.get):
+            if len(self._figures) <= self.max_figures:
+                break
+            if name != self.pinned:
+                self.remove(name)
+                logging.info(f"Evicted figure '{name}' from the chart viewer.")
+
+    def clear(self):
+        """Frees all figures."""
+        for name in list(self._figures):
+            self.remove(name)
+        self.pinned = None
+
+class FigureViewer:
+    """
+    Shows the figures of a FigurePool one at a time on a single embedded canvas.
+
+    Switching figures attaches the next figure to the same canvas instead of building a new
+    canvas widget. The first time a figure is shown at a given canvas size it is drawn and its
+    pixels are cached in the pool; after that it is restored from the cache and blitted.
+    """
+    def __init__(self, master, pool, canvas_class=None):
+        """
+        :param master: Tk widget to pack the canvas into.
+        :param pool: FigurePool with the figures to show.
+        :param canvas_class: Figure canvas class. Defaults to FigureCanvasTkAgg.
+        """
+        if canvas_class is None:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as canvas_class
+        self.pool = pool
+        self.index = 0
+        self._blank = Figure()
+        self.canvas = canvas_class(self._blank, master=master)
+        widget = getattr(self.canvas, 'get_tk_widget', None)
+        if widget is not None:
+            widget().pack(fill='both', expand=True)
+
+    def _canvas_size(self, fig):
+        widget = getattr(self.canvas, 'get_tk_widget', None)
+        if widget is not None and widget().winfo_width() > 1:
+            return widget().winfo_width(), widget().winfo_height()
+        return tuple(int(round(value)) for value in fig.bbox.size)
+
+    def show(self, index=None):
+        """
+        Shows the figure at index (wrapping around), or the current one if index is None.
+
+        :return: Name of the figure shown, or None if the pool is empty.
+        """
+        names = self.pool.names()
+        if not names:
+            # Release the last figure shown
+            self.pool.pinned = None
+            self.canvas.figure = self._blank
+            self._blank.set_canvas(self.canvas)
+            self.canvas.draw_idle()
+            return None
+        self.index = (self.index if index is None else index) % len(names)
+        name = names[self.index]
+        fig = self.pool.get(name)
+        self.pool.pinned = name
+
+        size = self._canvas_size(fig)
+        self.canvas.figure = fig
+        fig.set_canvas(self.canvas)
+        fig.set_size_inches(size[0] / fig.dpi, size[1] / fig.dpi, forward=False)
+
+        region = self.pool.cached_render(name, size)
+        if region is None:
+            self.canvas.draw()
+            self.pool.store_render(name, size, self.canvas.copy_from_bbox(fig.bbox))
+        else:
+            self.canvas.restore_region(region)
+            self.canvas.blit(fig.bbox)
+        return name
+
+    def show_name(self, name):
+        """Shows the figure with the given name."""
+        return self.show(self.pool.names().index(name))
+
+    def next(self):
+        """Shows the next figure."""
+        return self.show(self.index + 1)
+
+    def previous(self):
+        """Shows the previous figure."""
+        return self.show(self.index - 1)
@@ -3,18 +3,31 @@ from tkinter import filedialog, messagebox, ttk
 from tkcalendar import Calendar
 from PIL import Image, ImageTk
 import pandas as pd
-from data_upload import DataUpload
+from data_upload import (DataUpload, TABDB_REQUIRED_COLUMNS, TABDB_COLUMN_RENAMES,
+                         PLAYDB_REQUIRED_COLUMNS, REQUESTDB_REQUIRED_COLUMNS)
 from data_Preprocessing import DataPreprocessing
 from data_filtering import DataFiltering
-from data_Visualisation_plots import DataVisualisation
+from data_Visualisation_plots import DataVisualisation, BASIC_CHARTS, advanced_chart
+from data_snapshot import DataSnapshot
+from data_sql_backend import SQLiteQueryBackend
+from data_leaderboard import Leaderboard
+from data_sketches import SketchStore
+from data_coplay import CoPlayIndex
+from data_timeseries import WeeklySeries
+from data_matching import FuzzyMatcher
+from data_pipeline_cache import CachedPreprocessing
+from data_profiling import DataProfiler
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from figure_pool import FigurePool, FigureViewer
 from matplotlib.backends.backend_pdf import PdfPages
 import pygame
 import threading
+import uuid
 
 
 class UkuleleTuesdayProgram:
+    QUERY_PAGE_SIZE = 1000
+
     def __init__(self, root):
         self.root = root
         self.root.title("Ukulele Tuesday Data Analysis Program")
@@ -28,13 +41,38 @@ class UkuleleTuesdayProgram:
         self.data_preprocessor = DataPreprocessing()
         self.data_filterer = DataFiltering()
         self.data_visualiser = DataVisualisation()
+        self.data_snapshot = DataSnapshot()
+        self.sql_backend = SQLiteQueryBackend()
+        self.fuzzy_matcher = FuzzyMatcher()
+        self.data_profiler = DataProfiler()
+        self.cached_preprocessing = CachedPreprocessing(self.data_preprocessor, matcher=self.fuzzy_matcher)
 
         # Initialize data
         self.tab_db = None
         self.play_db = None
         self.request_db = None
-        self.combined_data = None
-        self.generated_figures = []
+        self.source_paths = {}
+        self.data_profiles = {}
+        self._combined_data = None
+        self.data_version = None
+        # Data that was never snapshotted is versioned by this session and the number of times it was set
+        self._session_id = uuid.uuid4().hex
+        self._memory_version = 0
+        self.leaderboard = None
+        self.sketches = None
+        self.coplay_index = None
+        self.weekly_series = {}
+        self.query_result = None
+        self.query_pages = None
+        self.figure_pool = FigurePool()
+        self.figure_viewer = None
+
+        # Restore the previous session if its source files have not changed
+        self.ui_state = self.data_snapshot.load_ui_state()
+        self._snapshot_pending = self.data_snapshot.is_valid()
+        if self._snapshot_pending:
+            self.source_paths = self.data_snapshot.source_paths()
+            self.data_version = self.data_snapshot.saved_fingerprint()
 
         # Apply styles
         self.setup_styles()
@@ -43,6 +81,131 @@ class UkuleleTuesdayProgram:
         self.main_menu = None
         self.create_main_menu()
    
+    @property
+    def combined_data(self):
+        """Combined dataset, restored from the session snapshot on first access."""
+        if self._snapshot_pending:
+            self._snapshot_pending = False
+            try:
+                self._combined_data = self.data_snapshot.load()
+            except Exception as e:
+                print(f"Error restoring session snapshot: {e}")
+        return self._combined_data
+
+    @combined_data.setter
+    def combined_data(self, value):
+        self._snapshot_pending = False
+        self._combined_data = value
+        self.data_version = None
+        self._memory_version += 1
+        self.leaderboard = None
+        self.sketches = None
+        self.coplay_index = None
+        self.weekly_series = {}
+
+    def rows_in_date_range(self, start_date, end_date):
+        """Return the combined rows between two dates, using the snapshot's date index if it matches the data."""
+        df = self.combined_data
+        if self.data_version is not None and self.data_version == self.data_snapshot.saved_fingerprint():
+            positions = self.data_snapshot.rows_between(start_date, end_date)
+            if positions is not None and len(df) == self.data_snapshot.rows():
+                return df.iloc[positions]
+        return df[(df['dates'] >= start_date) & (df['dates'] <= end_date)]
+
+    def data_columns(self):
+        """Return the columns of the combined dataset without restoring the snapshot, or None if there is no data."""
+        if self._snapshot_pending:
+            return self.data_snapshot.columns()
+        return list(self._combined_data.columns) if self._combined_data is not None else None
+
+    def get_sql_backend(self):
+        """Return the SQLite backend, (re)building its database from the session snapshot if it is out of date."""
+        version = self.data_version or f"memory-{self._session_id}-{self._memory_version}"
+        if self.sql_backend.version() != version:
+            if self.data_version is not None and self.data_version == self.data_snapshot.saved_fingerprint():
+                self.sql_backend.load_snapshot(self.data_snapshot, version=version)
+            else:
+                # The data was never snapshotted, so it only exists in memory
+                self.sql_backend.load_dataframe(self.combined_data, version=version)
+        return self.sql_backend
+
+    def get_weekly_series(self, group_column=None):
+        """Return the weekly counts for the line charts, extended with any newly added weeks."""
+        if group_column not in self.weekly_series:
+            self.weekly_series[group_column] = WeeklySeries(group_column)
+        self.weekly_series[group_column].update(self.combined_data)
+        return self.weekly_series[group_column]
+
+    def plot_chart(self, method, kwargs, fig):
+        """Draw a chart of the combined dataset, reusing the cached weekly series for line charts."""
+        extra = {}
+        if method == 'plot_cumulative_line':
+            extra['series'] = self.get_weekly_series(kwargs.get('group_column'))
+        self.data_visualiser.plot_chart(self.combined_data, method, kwargs, fig, **extra)
+
+    def clear_figures(self):
+        """Free the generated figures and blank the viewer if it is open."""
+        self.figure_pool.clear()
+        if self.figure_viewer is not None:
+            self.figure_viewer.show()
+
+    def show_figure_viewer(self, name=None):
+        """Show the generated figures in the viewer window, opening it if it isn't open yet."""
+        if self.figure_viewer is None:
+            viewer_window = tk.Toplevel(self.root)
+            viewer_window.title("Generated Visualizations")
+            viewer_window.geometry("800x600")
+
+            figure_container = tk.Frame(viewer_window, bg="#FFCC99")
+            figure_container.pack(fill="both", expand=True)
+            button_container = tk.Frame(viewer_window, bg="#FFCC99")
+            button_container.pack(pady=10)
+            self.figure_viewer = FigureViewer(figure_container, self.figure_pool)
+            ttk.Button(button_container, text="Previous Graph", command=self.figure_viewer.previous).pack(side="left", padx=5)
+            ttk.Button(button_container, text="Next Graph", command=self.figure_viewer.next).pack(side="left", padx=5)
+
+            def close_viewer():
+                self.figure_viewer = None
+                self.figure_pool.pinned = None
+                viewer_window.destroy()
+
+            viewer_window.protocol("WM_DELETE_WINDOW", close_viewer)
+            viewer_window.update_idletasks()  # Lay out the canvas so the first figure is drawn at its size
+
+        if name is not None:
+            self.figure_viewer.show_name(name)
+        else:
+            self.figure_viewer.show(0)
+
+    def get_leaderboard(self):
+        """Return the leaderboard of the combined dataset, building its weekly counts on first use."""
+        if self.leaderboard is None:
+            self.leaderboard = Leaderboard()
+            self.leaderboard.update(self.combined_data)
+        return self.leaderboard
+
+    def get_sketches(self):
+        """Return the distinct count and quantile sketches of the combined dataset, building them on first use."""
+        if self.sketches is None:
+            self.sketches = SketchStore()
+            self.sketches.update(self.combined_data)
+        return self.sketches
+
+    def get_coplay_index(self):
+        """Return the co-play index of the combined dataset, extended with any newly added sessions."""
+        if self.coplay_index is None:
+            self.coplay_index = CoPlayIndex()
+        self.coplay_index.update(self.combined_data)
+        return self.coplay_index
+
+    def save_ui_state(self, **selections):
+        """Remember the latest chart and query selections for the next session."""
+        self.ui_state.update(selections)
+        try:
+            self.data_snapshot.save_ui_state(self.ui_state)
+        except Exception as e:
+            print(f"Error saving session selections: {e}")
+
     def play_background_music(self, file_path):
         """Play background music using pygame."""
         def play_music():
@@ -105,6 +268,8 @@ class UkuleleTuesdayProgram:
         ttk.Button(self.main_menu, text="Upload Data", command=self.open_upload_window).pack(pady=5)
         ttk.Button(self.main_menu, text="Data Query", command=self.open_query_window).pack(pady=5)
         ttk.Button(self.main_menu, text="Generate Visualizations", command=self.open_visualisation_window).pack(pady=5)
+        ttk.Button(self.main_menu, text="Leaderboard", command=self.open_leaderboard_window).pack(pady=5)
+        ttk.Button(self.main_menu, text="Similar Songs", command=self.open_similar_songs_window).pack(pady=5)
         ttk.Button(self.main_menu, text="Exit", command=self.root.quit).pack(pady=5)
 
     def open_upload_window(self):
@@ -123,17 +288,13 @@ class UkuleleTuesdayProgram:
                     if not file_path.endswith("tabdb.csv"):
                         messagebox.showerror("Error", "Invalid file. Please upload the correct tabdb.csv file.")
                         return
-                    self.tab_db = self.data_uploader.load_csv(file_path, required_columns=[
-                        'song', 'artist', 'year', 'type', 'gender', 'duration',
-                        'language', 'source', 'date', 'difficulty', 'specialbooks'
-                    ])
+                    self.tab_db = self.data_uploader.load_csv(file_path, required_columns=TABDB_REQUIRED_COLUMNS)
                     if self.tab_db is not None:
+                        # Profile the file as loaded, before the columns are renamed
+                        self.data_profiles['tabdb'] = self.data_profiler.profile_frame(self.tab_db, name='tabdb.csv')
                         # Rename columns after successful validation
-                        column_renames = {
-                            'specialbooks': 'special books',
-                            'gender': 'type_of_performer'
-                        }
-                        self.tab_db = self.data_uploader.ensure_consistent_columns(self.tab_db, column_renames)
+                        self.tab_db = self.data_uploader.ensure_consistent_columns(self.tab_db, TABDB_COLUMN_RENAMES)
+                        self.source_paths['tabdb'] = file_path
                         messagebox.showinfo("Success", "tabdb.csv loaded successfully.")
                 except Exception as e:
                     messagebox.showerror("Error", f"Error loading file: {e}")
@@ -146,8 +307,10 @@ class UkuleleTuesdayProgram:
                     if not file_path.endswith("playdb.csv"):
                         messagebox.showerror("Error", "Invalid file. Please upload the correct playdb.csv file.")
                         return
-                    self.play_db = self.data_uploader.load_csv(file_path, required_columns=['song', 'artist'])
+                    self.play_db = self.data_uploader.load_csv(file_path, required_columns=PLAYDB_REQUIRED_COLUMNS)
                     if self.play_db is not None:
+                        self.source_paths['playdb'] = file_path
+                        self.data_profiles['playdb'] = self.data_profiler.profile_frame(self.play_db, name='playdb.csv')
                         messagebox.showinfo("Success", "playdb.csv loaded successfully.")
                 except Exception as e:
                     messagebox.showerror("Error", f"Error loading file: {e}")
@@ -160,8 +323,10 @@ class UkuleleTuesdayProgram:
                     if not file_path.endswith("requestdb.csv"):
                         messagebox.showerror("Error", "Invalid file. Please upload the correct requestdb.csv file.")
                         return
-                    self.request_db = self.data_uploader.load_csv(file_path, required_columns=['song', 'artist'])
+                    self.request_db = self.data_uploader.load_csv(file_path, required_columns=REQUESTDB_REQUIRED_COLUMNS)
                     if self.request_db is not None:
+                        self.source_paths['requestdb'] = file_path
+                        self.data_profiles['requestdb'] = self.data_profiler.profile_frame(self.request_db, name='requestdb.csv')
                         messagebox.showinfo("Success", "requestdb.csv loaded successfully.")
                 except Exception as e:
                     messagebox.showerror("Error", f"Error loading file: {e}")
@@ -174,21 +339,28 @@ class UkuleleTuesdayProgram:
             """Validate uploaded files, preprocess the data, and export the cleaned CSV."""
             if self.tab_db is not None and self.play_db is not None and self.request_db is not None:
                 try:
-                    # Combine and preprocess the data
-                    self.combined_data = self.data_preprocessor.preprocess_for_analysis(
+                    # Combine, preprocess and clean the data, reusing cached stages for unchanged inputs
+                    self.combined_data, unmatched = self.cached_preprocessing.run(
                         tab_db=self.tab_db, play_db=self.play_db, request_db=self.request_db)
 
-                    # Apply additional data cleaning on the combined dataset
-                    self.combined_data = self.data_preprocessor.clean_data(self.combined_data)
+                    # Report play/request titles that could not be matched to tabdb
+                    if unmatched is not None and not unmatched.empty:
+                        unmatched.to_csv('unmatched_titles.csv', index=False)
+                        messagebox.showwarning("Warning", f"{len(unmatched)} song/artist pairs could not be matched to tabdb. "
+                                                          "See unmatched_titles.csv.")
 
                     # Export the combined and cleaned data
                     if self.combined_data is not None:
+                        self.data_profiles['combined'] = self.data_profiler.profile_frame(self.combined_data)
                         self.combined_data.to_csv('combined_data_cleaned.csv', index=False)
                         messagebox.showinfo("Success", "Data files successfully cleaned and combined. Exported to combined_data_cleaned.csv.")
 
                         # Save combined dataset to CSV
                         self.combined_data.to_csv('combined_dataset.csv', index=False)
                         messagebox.showinfo("Success", "Combined dataset saved to combined_dataset.csv.")
+
+                        # Snapshot the session so it can be restored on the next launch
+                        self.data_version = self.data_snapshot.save(self.combined_data, self.source_paths)
                     else:
                         messagebox.showerror("Error", "Preprocessing failed. Check your data files.")
                 except Exception as e:
@@ -197,8 +369,43 @@ class UkuleleTuesdayProgram:
                 messagebox.showerror("Error", "Please upload all three data files before validating.")
                 
         ttk.Button(upload_window, text="Validate and Preprocess Data", command=validate_and_clean_data).pack(pady=10)
+        ttk.Button(upload_window, text="Show Data Profile", command=self.display_data_profile).pack(pady=5)
         ttk.Button(upload_window, text="Back to Main Menu", command=lambda: [upload_window.destroy(), self.create_main_menu()]).pack(pady=5)
 
+    def display_data_profile(self):
+        """Display the data quality profile of the uploaded and combined datasets and save it as JSON."""
+        if not self.data_profiles:
+            messagebox.showerror("Error", "No data profiled yet. Please upload data files first.")
+            return
+
+        try:
+            self.data_profiler.save_report(list(self.data_profiles.values()), 'data_profile.json')
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save data profile: {e}")
+
+        profile_window = tk.Toplevel(self.root)
+        profile_window.title("Data Profile")
+        profile_window.geometry("1000x600")
+
+        notebook = ttk.Notebook(profile_window)
+        notebook.pack(expand=True, fill='both')
+        for name, report in self.data_profiles.items():
+            tab = ttk.Frame(notebook)
+            notebook.add(tab, text=name)
+            ttk.Label(tab, text=f"{report['rows']} rows, {report['duplicate_rows']} duplicate rows, "
+                                f"{len(report['unparseable_date_headers'])} invalid date columns").pack(pady=5)
+
+            summary = self.data_profiler.summary_frame(report)
+            tree = ttk.Treeview(tab, columns=list(summary.columns), show='headings')
+            tree.pack(expand=True, fill='both')
+            for col in summary.columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=110, anchor='center')
+            for row in summary.itertuples(index=False):
+                tree.insert("", "end", values=['' if pd.isna(value) else value for value in row])
+
+        ttk.Button(profile_window, text="Close", command=profile_window.destroy).pack(pady=10)
+
     def open_query_window(self):
         """Tkinter window for data query with proper center alignment, even on fullscreen."""
         self.main_menu.destroy()  # Hide main menu
@@ -207,7 +414,9 @@ class UkuleleTuesdayProgram:
         query_window = tk.Frame(self.root, bg="#FFCC99")
         query_window.pack(expand=True, fill="both")
 
-        if self.combined_data is None:
+        # Only the column names are needed here, so a restored snapshot isn't loaded until a query needs it
+        data_columns = self.data_columns()
+        if data_columns is None:
             messagebox.showerror("Error", "No data available. Please upload and preprocess data first.")
             self.create_main_menu()  # Return to main menu
             return
@@ -258,11 +467,17 @@ class UkuleleTuesdayProgram:
         tk.Label(date_container, text="End Date", font=("Helvetica", 12), bg="#FFCC99", fg="black").grid(row=0, column=1, padx=10, pady=5)
         end_calendar = Calendar(date_container)
         end_calendar.grid(row=1, column=1, padx=10)
+
+        # Restore the date range used in the last query
+        for calendar, key in ((start_calendar, 'query_start_date'), (end_calendar, 'query_end_date')):
+            if self.ui_state.get(key):
+                calendar.selection_set(pd.to_datetime(self.ui_state[key]).date())
         
         # Columns selection
         ttk.Label(container, text="Select Columns for Query:", style='TLabel').pack(pady=20)
-        columns = [col for col in self.combined_data.columns if col != "tabber"]  # Exclude 'tabber' column
-        selected_columns = {column: tk.IntVar() for column in columns}
+        columns = [col for col in data_columns if col != "tabber"]  # Exclude 'tabber' column
+        last_columns = self.ui_state.get('query_columns', [])
+        selected_columns = {column: tk.IntVar(value=int(column in last_columns)) for column in columns}
 
         # Checkbox container
         column_container = tk.Frame(container, bg="#FFCC99")
@@ -271,30 +486,51 @@ class UkuleleTuesdayProgram:
         for column, var in selected_columns.items():
             tk.Checkbutton(column_container, text=column, variable=var, bg="#FFCC99", fg="black").pack(anchor="w")
 
+        # Optional SQLite backend for datasets too large to filter in memory
+        use_sql_backend = tk.IntVar(value=self.ui_state.get('query_use_sql', 0))
+        tk.Checkbutton(container, text="Use SQLite backend (large datasets)", variable=use_sql_backend,
+                       bg="#FFCC99", fg="black").pack(pady=5)
+
         # Action buttons container
         button_container = tk.Frame(container, bg="#FFCC99")
         button_container.pack(pady=30)
 
-        def perform_query(self):
+        def perform_query():
             """Perform query based on selected columns and date range."""
             try:
-                start_date = pd.to_datetime(self.start_calendar.get_date())
-                end_date = pd.to_datetime(self.end_calendar.get_date())
+                start_date = pd.to_datetime(start_calendar.get_date())
+                end_date = pd.to_datetime(end_calendar.get_date())
 
-                if 'dates' not in self.combined_data.columns:
+                if 'dates' not in data_columns:
                     messagebox.showerror("Error", "The combined data does not contain a 'dates' column.")
                     return
 
-                # Filter by date range
-                filtered_data = self.combined_data[
-                    (self.combined_data['dates'] >= start_date) & (self.combined_data['dates'] <= end_date)
-                ]
-
                 # Get selected columns
-                selected_cols = [col for col, var in self.selected_columns.items() if var.get() == 1]
+                selected_cols = [col for col, var in selected_columns.items() if var.get() == 1]
                 if not selected_cols:
                     messagebox.showerror("Error", "Please select at least one column for query.")
                     return
+                self.save_ui_state(query_columns=selected_cols,
+                                   query_start_date=start_date.strftime('%Y-%m-%d'),
+                                   query_end_date=end_date.strftime('%Y-%m-%d'),
+                                   query_use_sql=use_sql_backend.get())
+
+                if use_sql_backend.get():
+                    # Push the date filter and play counts down to SQL and page through the result
+                    backend = self.get_sql_backend()
+                    self.query_result = None
+                    self.query_pages = lambda: backend.query_play_counts(
+                        selected_cols, (start_date, end_date), page_size=self.QUERY_PAGE_SIZE)
+                    pages = self.query_pages()
+                    first_page = next(pages, None)
+                    if first_page is None:
+                        first_page = pd.DataFrame(columns=selected_cols + ['play_count'])
+                    self.display_filtered_result(first_page, more_pages=pages)
+                    messagebox.showinfo("Success", "Query executed successfully!")
+                    return
+
+                # Filter by date range
+                filtered_data = self.rows_in_date_range(start_date, end_date)
 
                 # Prepare DataFrame with selected columns and send to DataFiltering
                 selected_df = filtered_data[selected_cols]
@@ -313,6 +549,7 @@ class UkuleleTuesdayProgram:
 
                 # Store filtered result for saving as CSV
                 self.query_result = filtered_result
+                self.query_pages = None
                 
                 # Display the filtered result
                 self.display_filtered_result(filtered_result)
@@ -323,14 +560,19 @@ class UkuleleTuesdayProgram:
         # Save Query Result Button
         def save_query_result():
             """Save the query result to a CSV file."""
-            if hasattr(self, 'query_result') and self.query_result is not None:
+            if self.query_result is not None or self.query_pages is not None:
                 file_path = filedialog.asksaveasfilename(
                     defaultextension=".csv",
                     filetypes=[("CSV files", "*.csv")],
                     title="Save Query Result as CSV"
                 )
                 if file_path:
-                    self.query_result.to_csv(file_path, index=False)
+                    if self.query_result is not None:
+                        self.query_result.to_csv(file_path, index=False)
+                    else:
+                        # Stream the SQL result page by page
+                        for i, page in enumerate(self.query_pages()):
+                            page.to_csv(file_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
                     messagebox.showinfo("Success", f"Query result saved to {file_path}")
             else:
                 messagebox.showerror("Error", "No query result available to save.")
@@ -341,8 +583,8 @@ class UkuleleTuesdayProgram:
                 command=lambda: [query_window.destroy(), self.create_main_menu()]
                 ).pack(side="left", padx=10)
 
-    def display_filtered_result(self, df):
-        """Display the filtered result in a new window."""
+    def display_filtered_result(self, df, more_pages=None):
+        """Display the filtered result in a new window, with a button to load further pages if given."""
         result_window = tk.Toplevel(self.root)
         result_window.title("Query Results")
         result_window.geometry("1000x600")
@@ -359,8 +601,161 @@ class UkuleleTuesdayProgram:
         for _, row in df.iterrows():
             tree.insert("", "end", values=list(row))
 
+        if more_pages is not None:
+            def load_more():
+                page = next(more_pages, None)
+                if page is None:
+                    load_more_button.configure(state="disabled")
+                    return
+                for _, row in page.iterrows():
+                    tree.insert("", "end", values=list(row))
+
+            load_more_button = ttk.Button(result_window, text="Load More", command=load_more)
+            load_more_button.pack(pady=5)
+
         ttk.Button(result_window, text="Close", command=result_window.destroy).pack(pady=10)
 
+    def open_leaderboard_window(self):
+        """Window showing the top songs, artists, decades or requesters for a date range."""
+        self.main_menu.destroy()
+
+        if self.combined_data is None:
+            messagebox.showerror("Error", "No data available. Please upload and preprocess data first.")
+            self.create_main_menu()
+            return
+
+        leaderboard_window = tk.Frame(self.root, bg="#FFCC99")
+        leaderboard_window.pack(expand=True, fill="both", pady=10)
+
+        tk.Label(leaderboard_window, text="Leaderboard", font=("Helvetica", 16), bg="#FFCC99", fg="black").pack(pady=10)
+
+        # Date selection container
+        date_container = tk.Frame(leaderboard_window, bg="#FFCC99")
+        date_container.pack(pady=5)
+        tk.Label(date_container, text="Start Date", font=("Helvetica", 12), bg="#FFCC99", fg="black").grid(row=0, column=0, padx=10)
+        start_calendar = Calendar(date_container)
+        start_calendar.grid(row=1, column=0, padx=10)
+        tk.Label(date_container, text="End Date", font=("Helvetica", 12), bg="#FFCC99", fg="black").grid(row=0, column=1, padx=10)
+        end_calendar = Calendar(date_container)
+        end_calendar.grid(row=1, column=1, padx=10)
+
+        # Leaderboard options
+        options_container = tk.Frame(leaderboard_window, bg="#FFCC99")
+        options_container.pack(pady=5)
+        dimension_var = tk.StringVar(value=self.ui_state.get('leaderboard_dimension', 'song'))
+        metric_var = tk.StringVar(value=self.ui_state.get('leaderboard_metric', 'plays'))
+        k_var = tk.IntVar(value=self.ui_state.get('leaderboard_k', 20))
+        ttk.Combobox(options_container, textvariable=dimension_var, values=Leaderboard.DIMENSIONS, width=12).pack(side="left", padx=5)
+        ttk.Combobox(options_container, textvariable=metric_var, values=Leaderboard.METRICS, width=12).pack(side="left", padx=5)
+        ttk.Spinbox(options_container, from_=1, to=500, textvariable=k_var, width=5).pack(side="left", padx=5)
+
+        columns = ['rank', 'name', 'count', 'previous_rank', 'rank_change']
+        tree = ttk.Treeview(leaderboard_window, columns=columns, show='headings', height=12)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=300 if col == 'name' else 100, anchor='center')
+
+        def show_leaderboard():
+            try:
+                start_date = pd.to_datetime(start_calendar.get_date())
+                end_date = pd.to_datetime(end_calendar.get_date())
+                dimension, metric = dimension_var.get(), metric_var.get()
+                self.save_ui_state(leaderboard_dimension=dimension, leaderboard_metric=metric, leaderboard_k=k_var.get())
+                result = self.get_leaderboard().top_k(dimension, start_date, end_date, k=k_var.get(), metric=metric)
+                tree.delete(*tree.get_children())
+                for row in result.itertuples(index=False):
+                    tree.insert("", "end", values=['' if pd.isna(value) else value for value in row])
+
+                # Approximate summary of the range from the sketches
+                sketches = self.get_sketches()
+                songs = sketches.distinct_count('song', start_date, end_date)
+                if songs.empty:
+                    summary_label.config(text="No songs played in this range.")
+                    return
+                songs = songs.iloc[0]
+                artists = sketches.distinct_count('artist', start_date, end_date).iloc[0]
+                difficulty = sketches.quantiles('difficulty', (0.5, 0.9), start_date, end_date).iloc[0]
+                summary_label.config(text=f"~{songs['estimate']} distinct songs ({songs['low']}-{songs['high']}), "
+                                          f"~{artists['estimate']} artists ({artists['low']}-{artists['high']}), "
+                                          f"difficulty median {difficulty['q50']:.2f}, 90th percentile {difficulty['q90']:.2f}")
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred: {e}")
+
+        ttk.Button(leaderboard_window, text="Show Leaderboard", command=show_leaderboard).pack(pady=5)
+        tree.pack(expand=True, fill='both', padx=20)
+        summary_label = tk.Label(leaderboard_window, text="", font=("Helvetica", 11), bg="#FFCC99", fg="black")
+        summary_label.pack(pady=5)
+        ttk.Button(leaderboard_window, text="Back to Main Menu",
+                   command=lambda: [leaderboard_window.destroy(), self.create_main_menu()]).pack(pady=10)
+
+    def open_similar_songs_window(self):
+        """Window showing the songs most often played on the same Tuesday as a chosen song."""
+        self.main_menu.destroy()
+
+        if self.combined_data is None:
+            messagebox.showerror("Error", "No data available. Please upload and preprocess data first.")
+            self.create_main_menu()
+            return
+
+        similar_window = tk.Frame(self.root, bg="#FFCC99")
+        similar_window.pack(expand=True, fill="both", pady=10)
+
+        tk.Label(similar_window, text="Songs Often Played Together", font=("Helvetica", 16), bg="#FFCC99", fg="black").pack(pady=10)
+
+        try:
+            index = self.get_coplay_index()
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {e}")
+            similar_window.destroy()
+            self.create_main_menu()
+            return
+
+        # Song and number of results
+        options_container = tk.Frame(similar_window, bg="#FFCC99")
+        options_container.pack(pady=5)
+        song_var = tk.StringVar(value=self.ui_state.get('similar_song', ''))
+        n_var = tk.IntVar(value=self.ui_state.get('similar_n', index.top_n))
+        ttk.Combobox(options_container, textvariable=song_var, values=sorted(index.songs), width=60).pack(side="left", padx=5)
+        ttk.Spinbox(options_container, from_=1, to=200, textvariable=n_var, width=5).pack(side="left", padx=5)
+
+        # Optional date window
+        use_dates_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(similar_window, text="Only count sessions between these dates", variable=use_dates_var).pack(pady=5)
+        date_container = tk.Frame(similar_window, bg="#FFCC99")
+        date_container.pack(pady=5)
+        tk.Label(date_container, text="Start Date", font=("Helvetica", 12), bg="#FFCC99", fg="black").grid(row=0, column=0, padx=10)
+        start_calendar = Calendar(date_container)
+        start_calendar.grid(row=1, column=0, padx=10)
+        tk.Label(date_container, text="End Date", font=("Helvetica", 12), bg="#FFCC99", fg="black").grid(row=0, column=1, padx=10)
+        end_calendar = Calendar(date_container)
+        end_calendar.grid(row=1, column=1, padx=10)
+
+        columns = ['song', 'co_plays', 'score']
+        tree = ttk.Treeview(similar_window, columns=columns, show='headings', height=12)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=400 if col == 'song' else 100, anchor='center')
+
+        def show_similar():
+            try:
+                song = song_var.get()
+                self.save_ui_state(similar_song=song, similar_n=n_var.get())
+                start_date = end_date = None
+                if use_dates_var.get():
+                    start_date = pd.to_datetime(start_calendar.get_date())
+                    end_date = pd.to_datetime(end_calendar.get_date())
+                result = index.similar(song, n=n_var.get(), start_date=start_date, end_date=end_date)
+                tree.delete(*tree.get_children())
+                for row in result.itertuples(index=False):
+                    tree.insert("", "end", values=list(row))
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred: {e}")
+
+        ttk.Button(similar_window, text="Find Similar Songs", command=show_similar).pack(pady=5)
+        tree.pack(expand=True, fill='both', padx=20)
+        ttk.Button(similar_window, text="Back to Main Menu",
+                   command=lambda: [similar_window.destroy(), self.create_main_menu()]).pack(pady=10)
+
     def open_visualisation_window(self):
         """Window for generating visualizations with Basic and Advanced options."""
         self.main_menu.destroy()
@@ -402,7 +797,7 @@ class UkuleleTuesdayProgram:
         ttk.Button(vis_window, text="Advanced Charts (Choose your own charts)", command=show_advanced_charts).pack(pady=5)
         # Add Save to PDF functionality
         def save_to_pdf():
-            if not self.generated_figures:
+            if not len(self.figure_pool):
                 messagebox.showerror("Error", "No visualizations available to save.")
                 return
 
@@ -414,7 +809,7 @@ class UkuleleTuesdayProgram:
 
             if file_path:
                 with PdfPages(file_path) as pdf:
-                    for fig in self.generated_figures:
+                    for fig in self.figure_pool.figures():
                         pdf.savefig(fig)
                 messagebox.showinfo("Success", f"Visualizations saved to {file_path}")
 
@@ -422,7 +817,7 @@ class UkuleleTuesdayProgram:
         ttk.Button(vis_window, text="Save to PDF", command=save_to_pdf).pack(pady=10)
 
         # Clear previous figures
-        self.generated_figures.clear()
+        self.clear_figures()
         # Function to create basic chart options
         def create_basic_chart_options(frame):
             for widget in frame.winfo_children():
@@ -434,89 +829,39 @@ class UkuleleTuesdayProgram:
             style.configure("TCheckbutton", background="#FFCC99")  # Match the background color
 
             visualizations = [
-                ("Histogram of Songs by Difficulty Level", lambda fig: self.data_visualiser.plot_histogram(self.combined_data, 'difficulty', "Histogram of Songs by Difficulty Level", fig)),
-                ("Histogram of Songs by Duration", lambda fig: self.data_visualiser.plot_histogram(self.combined_data, 'duration', "Histogram of Songs by Duration", fig)),
-                ("Bar Chart of Songs by Language", lambda fig: self.data_visualiser.plot_bar_chart(self.combined_data, 'language', "Bar Chart of Songs by Language", fig)),
-                ("Bar Chart of Songs by Source", lambda fig: self.data_visualiser.plot_bar_chart(self.combined_data, 'source', "Bar Chart of Songs by Source", fig)),
-                ("Bar Chart of Songs by Decade", lambda fig: self.data_visualiser.plot_decade_bar(self.combined_data, fig)),
-                ("Cumulative Line Chart of Songs Played Each Tuesday", lambda fig: self.data_visualiser.plot_cumulative_line(self.combined_data, fig)),
-                ("Pie Chart of Songs by Type of Performer", lambda fig: self.data_visualiser.plot_pie_chart(self.combined_data, 'type_of_performer', "Pie Chart of Songs by Type of Performer", fig))
+                (vis_name, lambda fig, method=method, kwargs=kwargs: self.plot_chart(method, kwargs, fig))
+                for vis_name, method, kwargs in BASIC_CHARTS
             ]
 
-            selected_visualizations = {vis_name: tk.IntVar() for vis_name, _ in visualizations}
+            last_visualizations = self.ui_state.get('visualizations', [])
+            selected_visualizations = {vis_name: tk.IntVar(value=int(vis_name in last_visualizations))
+                                       for vis_name, _ in visualizations}
 
             for vis_name, _ in visualizations:
                 ttk.Checkbutton(frame, text=vis_name, variable=selected_visualizations[vis_name]).pack(anchor="w")
 
-            # Function to toggle between graphs
-            def toggle_graph(canvas, figure_container, figures, index_var):
-                """Toggle to the next graph in the list."""
-                if not figures:
-                    return  # No figures to toggle
-                index_var.set((index_var.get() + 1) % len(figures))  # Move to the next figure index
-                fig = figures[index_var.get()]  # Get the current figure
-                for widget in figure_container.winfo_children():
-                    widget.destroy()  # Clear previous graph
-                canvas = FigureCanvasTkAgg(fig, master=figure_container)
-                canvas_widget = canvas.get_tk_widget()
-                canvas_widget.pack(fill='both', expand=True)
-                canvas.draw()
-
             # Updated perform_visualisation
             def perform_visualisation():
-                self.generated_figures.clear()  # Clear previous figures
+                self.clear_figures()  # Free previous figures
+                self.save_ui_state(visualizations=[vis_name for vis_name, _ in visualizations
+                                                   if selected_visualizations[vis_name].get()])
                 for vis_name, vis_function in visualizations:
                     if selected_visualizations[vis_name].get():
+                        fig = self.figure_pool.new_figure()
                         try:
-                            fig = plt.figure()
                             vis_function(fig)
-                            self.generated_figures.append(fig)
+                            self.figure_pool.add(vis_name, fig)
                         except Exception as e:
+                            plt.close(fig)
                             messagebox.showerror("Error", f"Could not generate {vis_name}: {e}")
 
-                if not self.generated_figures:
+                if not len(self.figure_pool):
                     messagebox.showinfo("Info", "No visualizations selected.")
                     return
 
-                # Open a new window to display all figures
-                vis_window = tk.Toplevel(self.root)
-                vis_window.title("Generated Visualizations")
-                vis_window.geometry("800x600")
-
-                figure_container = tk.Frame(vis_window, bg="#FFCC99")
-                figure_container.pack(fill="both", expand=True)
-
-                # Variable to track the current figure index
-                current_figure_index = tk.IntVar(value=0)
-
-                # Display the first figure
-                if self.generated_figures:
-                    fig = self.generated_figures[current_figure_index.get()]
-                    canvas = FigureCanvasTkAgg(fig, master=figure_container)
-                    canvas_widget = canvas.get_tk_widget()
-                    canvas_widget.pack(fill='both', expand=True)
-                    canvas.draw()
-
-                # Add Next Graph button
-                next_button = ttk.Button(
-                    vis_window,
-                    text="Next Graph",
-                    command=lambda: toggle_graph(canvas, figure_container, self.generated_figures, current_figure_index)
-                )
-                next_button.pack(pady=10)
-
+                # Show the figures in the viewer window, reusing it if it is already open
+                self.show_figure_viewer()
 
-            #def perform_visualisation():
-            #    self.generated_figures.clear()
-            #    for vis_name, vis_function in visualizations:
-            #        if selected_visualizations[vis_name].get():
-            #            try:
-            #                fig = plt.figure()
-            #                vis_function(fig)
-            #                self.generated_figures.append(fig)
-            #                plt.show()
-            #            except Exception as e:
-            #                messagebox.showerror("Error", f"Could not generate {vis_name}: {e}")
 
             ttk.Button(frame, text="Generate Visualizations", command=perform_visualisation).pack(pady=10)
 
@@ -528,13 +873,13 @@ class UkuleleTuesdayProgram:
             ttk.Label(frame, text="Advanced Chart Options", font=("Helvetica", 14)).pack(pady=10)
 
             categorical_columns = ['type', 'type_of_performer', 'language', 'source', 'Category']
-            group_by_var = tk.StringVar()
+            group_by_var = tk.StringVar(value=self.ui_state.get('advanced_group_by', ''))
 
             ttk.Label(frame, text="Group Data By (Categorical Column):").pack()
             group_by_dropdown = ttk.Combobox(frame, textvariable=group_by_var, values=categorical_columns)
             group_by_dropdown.pack(pady=5)
 
-            chart_type = tk.StringVar()
+            chart_type = tk.StringVar(value=self.ui_state.get('advanced_chart_type', ''))
             ttk.Label(frame, text="Select Chart Type:").pack()
             chart_type_dropdown = ttk.Combobox(frame, textvariable=chart_type, values=["Bar Chart", "Pie Chart", "Line Chart"])
             chart_type_dropdown.pack(pady=5)
@@ -545,18 +890,16 @@ class UkuleleTuesdayProgram:
                 if not group_by or not chart:
                     messagebox.showerror("Error", "Please select both grouping column and chart type.")
                     return
+                self.save_ui_state(advanced_group_by=group_by, advanced_chart_type=chart)
 
+                fig = self.figure_pool.new_figure()
                 try:
-                    fig = plt.figure()
-                    if chart == "Bar Chart":
-                        self.data_visualiser.plot_bar_chart(self.combined_data, group_by, f"{chart} by {group_by}", fig)
-                    elif chart == "Pie Chart":
-                        self.data_visualiser.plot_pie_chart(self.combined_data, group_by, f"{chart} by {group_by}", fig)
-                    elif chart == "Line Chart":
-                        self.data_visualiser.plot_cumulative_line(self.combined_data, fig)
-                    self.generated_figures.append(fig)
-                    plt.show()
+                    name, method, kwargs = advanced_chart(chart, group_by)
+                    self.plot_chart(method, kwargs, fig)
+                    self.figure_pool.add(name, fig)
+                    self.show_figure_viewer(name)
                 except Exception as e:
+                    plt.close(fig)
                     messagebox.showerror("Error", f"Error generating {chart}: {e}")
 
             ttk.Button(frame, text="Generate Chart", command=generate_grouped_chart).pack(pady=10)
@@ -0,0 +1,233 @@
+import os
+import asyncio
+import hashlib
+import functools
+import logging
+import argparse
+from collections import OrderedDict, namedtuple
+import pandas as pd
+from aiohttp import web
+from data_snapshot import DataSnapshot, load_dataset
+from data_filtering import DataFiltering, event_indicator
+from data_popularity import RollingPopularity
+from data_latency import RequestLatency
+
+# Dataset shared by the queries; snapshot is set when it was loaded from the session snapshot
+LoadedData = namedtuple('LoadedData', ['df', 'popularity', 'snapshot', 'version'])
+
+class QueryService:
+    """
+    Local HTTP/JSON service answering aggregate queries over the processed dataset.
+
+    The dataset is loaded once and shared by all clients; it is reloaded when the file it comes
+    from changes. Queries run in a thread pool so the event loop keeps serving other (keep-alive)
+    connections, identical queries in flight share one computation, and responses are cached per
+    data version and sent with an ETag.
+
+    Endpoints (all GET; any other query parameter naming a column is an equality filter, and
+    'start'/'end' limit the date range, as in DataFiltering.filter_data):
+
+        /health                                 Data version, rows and date range.
+        /play_counts?group_by=song,artist       Plays and requests per group.
+        /group_counts?column=language&top=20    Row counts per value, as in the bar and pie charts.
+        /popular_songs?last_n_weeks=12          Songs selected by DataFiltering.filter_popular_songs.
+        /request_latency?freq=Q&max_lag_weeks=8 Request to play lag and conversion per requester type.
+    """
+    RESERVED_PARAMS = {'start', 'end', 'group_by', 'column', 'top', 'limit', 'min_score', 'last_n_weeks',
+                       'freq', 'max_lag_weeks'}
+
+    def __init__(self, data_path=None, snapshot_dir='session_snapshot', cache_size=256):
+        """
+        :param data_path: Combined dataset CSV. If None, the session snapshot is used, or
+                          combined_dataset.csv if there is none.
+        :param snapshot_dir: Session snapshot directory saved by the GUI.
+        :param cache_size: Number of responses kept in the cache.
+        """
+        self.data_path = data_path
+        self.snapshot_dir = snapshot_dir
+        self.cache_size = cache_size
+        self.data_filterer = DataFiltering()
+        self.data = None
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._reload_lock = None
+
+    def _source_file(self):
+        """Returns the file whose changes mean the dataset must be reloaded."""
+        if self.data_path is not None:
+            return self.data_path
+        manifest = os.path.join(self.snapshot_dir, DataSnapshot.MANIFEST_FILE)
+        return manifest if os.path.exists(manifest) else 'combined_dataset.csv'
+
+    def current_version(self):
+        """Returns a version string that changes whenever the dataset file is rewritten."""
+        path = self._source_file()
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+    @property
+    def version(self):
+        return self.data.version if self.data is not None else None
+
+    def _load(self, version):
+        snapshot = None
+        if self.data_path is None and os.path.exists(os.path.join(self.snapshot_dir, DataSnapshot.MANIFEST_FILE)):
+            snapshot = DataSnapshot(self.snapshot_dir)
+            df = snapshot.load(mmap=True)
+        else:
+            df = load_dataset(self.data_path, self.snapshot_dir)
+        popularity = RollingPopularity()
+        popularity.update(df)
+        return LoadedData(df, popularity, snapshot, version)
+
+    async def ensure_loaded(self):
+        """Loads the dataset on first use and reloads it if its file has changed."""
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        version = self.current_version()
+        if version == self.version:
+            return
+        async with self._reload_lock:
+            if version == self.version:
+                return
+            self.data = await asyncio.get_running_loop().run_in_executor(None, self._load, version)
+            self._cache.clear()
+            logging.info(f"Loaded dataset version {version} ({len(self.data.df)} rows) into the query service.")
+
+    def _filtered(self, data, params):
+        """Applies the column and date range filters given as query parameters."""
+        df = data.df
+        filters = {}
+        for col, value in params.items():
+            if col in self.RESERVED_PARAMS:
+                continue
+            if col not in df.columns:
+                raise ValueError(f"Unknown column: {col}")
+            filters[col] = pd.to_numeric(value) if pd.api.types.is_numeric_dtype(df[col].dtype) else value
+        date_range = None
+        if 'start' in params or 'end' in params:
+            date_range = (pd.Timestamp(params.get('start', df['dates'].min())),
+                          pd.Timestamp(params.get('end', df['dates'].max())))
+            positions = data.snapshot.rows_between(*date_range) if data.snapshot is not None else None
+            if positions is not None:
+                # Look the range up in the snapshot's date index instead of scanning every date
+                df, date_range = df.iloc[positions], None
+        return self.data_filterer.filter_data(df, filters, date_range)
+
+    @staticmethod
+    def _limit(result, params, default=None):
+        limit = params.get('limit', default)
+        return result.head(int(limit)) if limit is not None else result
+
+    def play_counts(self, data, params):
+        """Plays and requests per group, most played first."""
+        group_by = params.get('group_by', 'song,artist').split(',')
+        missing = [col for col in group_by if col not in data.df.columns]
+        if missing:
+            raise ValueError(f"Unknown group_by column: {', '.join(missing)}")
+        filtered = self._filtered(data, params)
+        counts = pd.DataFrame({'plays': event_indicator(filtered['play_value'])})
+        if 'requested_value' in filtered.columns:
+            counts['requests'] = event_indicator(filtered['requested_value'])
+        counts = counts.groupby([filtered[col] for col in group_by]).sum().reset_index()
+        return self._limit(counts.sort_values(['plays'] + group_by, ascending=[False] + [True] * len(group_by)), params)
+
+    def group_counts(self, data, params):
+        """Row counts per value of a column, largest first, with the remainder after 'top' as 'Other'."""
+        column = params.get('column')
+        if column not in data.df.columns:
+            raise ValueError(f"Unknown or missing column: {column}")
+        counts = self._filtered(data, params)[column].value_counts()
+        counts = counts.sort_index().sort_values(ascending=False, kind='stable')  # Ties by value, not row order
+        if 'top' in params and len(counts) > int(params['top']):
+            top = int(params['top'])
+            counts = pd.concat([counts.iloc[:top], pd.Series({'Other': counts.iloc[top:].sum()})])
+        return counts.rename_axis(column).reset_index(name='count')
+
+    def popular_songs(self, data, params):
+        """Songs whose play and request score over the window reaches min_score (default: the mean)."""
+        last_n_weeks = int(params['last_n_weeks']) if 'last_n_weeks' in params else None
+        min_score = float(params['min_score']) if 'min_score' in params else None
+        end_date = params.get('end')
+        popular = self.data_filterer.filter_popular_songs(self._filtered(data, params), min_score, data.popularity,
+                                                          last_n_weeks, end_date)
+        scores = data.popularity.window_scores(last_n_weeks, end_date)
+        songs = popular[['song', 'artist']].drop_duplicates()
+        songs['popularity_score'] = scores.reindex(pd.MultiIndex.from_frame(songs)).to_numpy()
+        return self._limit(songs.sort_values(['popularity_score', 'song'], ascending=[False, True]), params)
+
+    def request_latency(self, data, params):
+        """Request to play lag and conversion per requester type, optionally per period of the request date."""
+        max_lag_weeks = float(params['max_lag_weeks']) if 'max_lag_weeks' in params else None
+        filtered = self._filtered(data, {col: value for col, value in params.items() if col not in ('start', 'end')})
+        return RequestLatency(max_lag_weeks).summary(filtered, params.get('freq'), params.get('start'), params.get('end'))
+
+    def health(self, data, params):
+        """Version and size of the loaded dataset."""
+        df = data.df
+        return pd.DataFrame([{'rows': len(df), 'columns': len(df.columns),
+                              'first_date': df['dates'].min(), 'last_date': df['dates'].max()}])
+
+    def _run(self, query, data, params):
+        """Runs a query in a worker thread and serializes the response."""
+        result = query(data, params)
+        records = result.to_json(orient='records', date_format='iso')
+        return f'{{"version": "{data.version}", "count": {len(result)}, "results": {records}}}'.encode()
+
+    async def _respond(self, request, query):
+        try:
+            await self.ensure_loaded()
+        except FileNotFoundError as e:
+            return web.json_response({'error': f"No processed dataset available: {e}"}, status=503)
+        data = self.data
+        version = data.version
+        params = dict(request.query)
+        key = (version, request.path, tuple(sorted(params.items())))
+        etag = '"' + hashlib.sha256(repr(key).encode()).hexdigest()[:20] + '"'
+        headers = {'ETag': etag, 'X-Data-Version': version}
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers=headers)
+
+        body = self._cache.get(key)
+        if body is not None:
+            self._cache.move_to_end(key)
+        else:
+            try:
+                if key not in self._pending:
+                    self._pending[key] = asyncio.get_running_loop().run_in_executor(
+                        None, self._run, query, data, params)
+                try:
+                    body = await asyncio.shield(self._pending[key])
+                finally:
+                    self._pending.pop(key, None)
+            except (ValueError, KeyError, TypeError) as e:
+                return web.json_response({'error': str(e)}, status=400)
+            if version == self.version:
+                self._cache[key] = body
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    def create_app(self):
+        """Returns the aiohttp application serving the query endpoints."""
+        app = web.Application()
+        for name in ['health', 'play_counts', 'group_counts', 'popular_songs', 'request_latency']:
+            app.router.add_get(f'/{name}', functools.partial(self._respond, query=getattr(self, name)))
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve aggregate queries over the processed dataset as JSON.")
+    parser.add_argument('--data', default=None, help="Combined dataset CSV. Defaults to the session snapshot.")
+    parser.add_argument('--snapshot', default='session_snapshot', help="Session snapshot directory.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on.")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on.")
+    parser.add_argument('--keepalive', type=float, default=75.0, help="Seconds an idle keep-alive connection stays open.")
+    parser.add_argument('--cache-size', type=int, default=256, help="Number of responses kept in the cache.")
+    args = parser.parse_args()
+
+    service = QueryService(args.data, args.snapshot, args.cache_size)
+    web.run_app(service.create_app(), host=args.host, port=args.port, keepalive_timeout=args.keepalive)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the top level of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Charts are drawn without a display
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+def make_combined(rows=600, seed=0):
+    """
+    Synthetic combined dataset with the columns preprocessing produces, over 40 Tuesdays and
+    in shuffled date order. play_value is a score or NaN and requested_value a requester type or NaN.
+    """
+    rng = np.random.default_rng(seed)
+    songs = [(f'Song {i}', f'Artist {i % 7}') for i in range(30)]
+    picks = rng.integers(0, len(songs), rows)
+    tuesdays = pd.date_range('2022-01-04', periods=40, freq='W-TUE')
+    return pd.DataFrame({
+        'song': [songs[i][0] for i in picks],
+        'artist': [songs[i][1] for i in picks],
+        'dates': tuesdays[rng.integers(0, len(tuesdays), rows)],
+        'play_value': np.where(rng.random(rows) < 0.5, rng.integers(10, 17, rows).astype(float), np.nan),
+        'requested_value': pd.Series(rng.choice(['Audience', 'Group', 'Unknown'], rows)).where(rng.random(rows) < 0.3),
+        'year': pd.array(rng.integers(1960, 2020, rows), dtype='Int64'),
+        'language': rng.choice(['english', 'french', 'irish'], rows),
+        'difficulty': rng.integers(10, 40, rows) / 10,
+        'duration': [f'00:{m:02d}:{s:02d}' for m, s in zip(rng.integers(2, 7, rows), rng.integers(0, 60, rows))],
+    })
+
+@pytest.fixture
+def combined():
+    return make_combined()
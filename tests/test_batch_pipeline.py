@@ -0,0 +1,66 @@
+import json
+import pandas as pd
+import pytest
+from batch_pipeline import BatchPipeline, process_partition
+from data_Preprocessing import DataPreprocessing
+from data_upload import DataUpload, TABDB_COLUMN_RENAMES
+from test_data_engine import make_sources
+
+def write_partition(directory, play_value=None):
+    directory.mkdir()
+    play_db, request_db, tab_db = make_sources()
+    if play_value is not None:
+        play_db.loc[0, '20220419'] = play_value
+    tab_db.rename(columns={new: old for old, new in TABDB_COLUMN_RENAMES.items()}).to_csv(directory / 'tabdb.csv', index=False)
+    play_db.to_csv(directory / 'playdb.csv', index=False)
+    request_db.to_csv(directory / 'requestdb.csv', index=False)
+    return {'tabdb': f'{directory.name}/tabdb.csv', 'playdb': f'{directory.name}/playdb.csv',
+            'requestdb': f'{directory.name}/requestdb.csv'}
+
+def expected_partition(directory):
+    tab_db = DataUpload().ensure_consistent_columns(pd.read_csv(directory / 'tabdb.csv'), TABDB_COLUMN_RENAMES)
+    preprocessor = DataPreprocessing()
+    return preprocessor.clean_data(preprocessor.preprocess_for_analysis(
+        pd.read_csv(directory / 'playdb.csv'), pd.read_csv(directory / 'requestdb.csv'), tab_db))
+
+@pytest.fixture
+def manifest(tmp_path):
+    entries = [dict(write_partition(tmp_path / 'dublin'), partition='dublin-2022', venue='Dublin'),
+               dict(write_partition(tmp_path / 'cork', play_value=9.0), venue='Cork')]
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(entries))
+    return path
+
+def test_load_manifest_resolves_paths(manifest, tmp_path):
+    partitions = BatchPipeline().load_manifest(str(manifest))
+    assert [partition['partition'] for partition in partitions] == ['dublin-2022', 'partition_1']
+    assert partitions[1]['playdb'] == str(tmp_path / 'cork' / 'playdb.csv')
+
+def test_load_manifest_rejects_missing_sources(tmp_path):
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps({'partitions': [{'tabdb': 'tabdb.csv'}]}))
+    with pytest.raises(ValueError, match='playdb, requestdb'):
+        BatchPipeline().load_manifest(str(path))
+
+def test_process_partition_adds_provenance(manifest, tmp_path):
+    partition = BatchPipeline().load_manifest(str(manifest))[0]
+    result = process_partition(partition)
+    expected = expected_partition(tmp_path / 'dublin')
+    expected['partition'] = 'dublin-2022'
+    expected['partition_venue'] = 'Dublin'
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_run_combines_partitions(manifest, tmp_path):
+    pipeline = BatchPipeline(max_workers=2)
+    partitions = pipeline.load_manifest(str(manifest))
+    result = pipeline.run(partitions)
+    expected = pd.concat([process_partition(partition) for partition in partitions], ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.groupby('partition')['partition_venue'].first().to_dict() == {'dublin-2022': 'Dublin',
+                                                                               'partition_1': 'Cork'}
+
+def test_missing_source_file(tmp_path):
+    partition = {'partition': 'p', 'tabdb': str(tmp_path / 'tabdb.csv'),
+                 'playdb': str(tmp_path / 'playdb.csv'), 'requestdb': str(tmp_path / 'requestdb.csv')}
+    with pytest.raises(FileNotFoundError):
+        process_partition(partition)
@@ -0,0 +1,54 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+from data_Visualisation_plots import DataVisualisation, BASIC_CHARTS, advanced_chart
+
+@pytest.fixture
+def visualiser():
+    return DataVisualisation()
+
+@pytest.fixture
+def figure():
+    fig = plt.figure()
+    yield fig
+    plt.close(fig)
+
+def test_collapse_categories(visualiser):
+    counts = pd.Series(np.arange(30, 0, -1), index=[f'c{i}' for i in range(30)])
+    collapsed = visualiser._collapse_categories(counts)
+    assert len(collapsed) == DataVisualisation.MAX_CATEGORIES + 1
+    assert collapsed['Other'] == counts.iloc[20:].sum()
+    assert collapsed.sum() == counts.sum()
+
+    covered = visualiser._collapse_categories(counts, top_n=25, coverage=0.5)
+    assert covered.iloc[:-1].sum() / counts.sum() >= 0.5
+    assert (covered.iloc[:-2].sum() / counts.sum()) < 0.5
+    pd.testing.assert_series_equal(visualiser._collapse_categories(counts.iloc[:5]), counts.iloc[:5])
+
+def test_collapse_keeps_existing_other(visualiser):
+    counts = pd.Series([10, 8, 5, 3, 2], index=['a', 'Other', 'b', 'c', 'd'])
+    collapsed = visualiser._collapse_categories(counts, top_n=3)
+    assert collapsed.to_dict() == {'a': 10, 'Other': 13, 'b': 5}
+
+@pytest.mark.parametrize('categorical', [False, True])
+def test_collapse_column(visualiser, categorical):
+    series = pd.Series(['a'] * 5 + ['b'] * 3 + ['c', 'd'])
+    if categorical:
+        series = series.astype('category')
+    collapsed = visualiser._collapse_column(series, top_n=2)
+    assert collapsed.astype(str).value_counts().to_dict() == {'a': 5, 'b': 3, 'Other': 2}
+
+def test_decade_bar_with_missing_years(visualiser, figure, combined):
+    combined.loc[:10, 'year'] = pd.NA
+    visualiser.plot_decade_bar(combined, fig=figure)
+    labels = [label.get_text() for label in figure.axes[0].get_xticklabels()]
+    assert labels[-1] == 'Unknown'
+    heights = [bar.get_height() for bar in figure.axes[0].patches]
+    assert heights[-1] == 11 and sum(heights) == len(combined)
+
+@pytest.mark.parametrize('chart', BASIC_CHARTS + [advanced_chart('Grouped Bar Chart', 'language', 'artist'),
+                                                  advanced_chart('Line Chart', 'language')], ids=lambda chart: chart[0])
+def test_charts_draw(visualiser, figure, combined, chart):
+    _, method, kwargs = chart
+    visualiser.plot_chart(combined, method, kwargs, figure)
@@ -0,0 +1,40 @@
+import math
+from collections import Counter
+import pandas as pd
+import pytest
+from data_coplay import CoPlayIndex
+from data_filtering import event_indicator
+
+def brute_force_similar(df, song_key, n, start=None, end=None, min_co_plays=2):
+    """Co-plays and cosine scores from the sets of songs played each Tuesday."""
+    df = df[event_indicator(df['play_value']) > 0]
+    if start is not None:
+        df = df[(df['dates'] >= start) & (df['dates'] <= end)]
+    sessions = (df['song'] + ' - ' + df['artist']).groupby(df['dates']).agg(set)
+    plays = Counter(key for session in sessions for key in session)
+    co_plays = Counter(other for session in sessions if song_key in session for other in session if other != song_key)
+    rows = [(other, count, round(count / math.sqrt(plays[song_key] * plays[other]), 3))
+            for other, count in co_plays.items() if count >= min_co_plays]
+    # Ties are broken by co-plays, then by name, on the unrounded score
+    rows.sort(key=lambda row: (-co_plays[row[0]] / math.sqrt(plays[row[0]]), -row[1], row[0]))
+    return rows[:n]
+
+@pytest.fixture
+def index(combined):
+    index = CoPlayIndex(top_n=5)
+    index.update(combined[combined['dates'] < pd.Timestamp('2022-06-01')])
+    index.similar('Song 1 - Artist 1')  # Computes the top neighbours before the second update
+    index.update(combined)
+    return index
+
+@pytest.mark.parametrize('song_key', ['Song 1 - Artist 1', 'Song 12 - Artist 5'])
+@pytest.mark.parametrize('n, start, end', [(5, None, None), (8, None, None), (5, '2022-03-01', '2022-07-31')])
+def test_similar_matches_brute_force(index, combined, song_key, n, start, end):
+    start = pd.Timestamp(start) if start else None
+    end = pd.Timestamp(end) if end else None
+    result = index.similar(song_key, n, start, end)
+    assert list(result.itertuples(index=False, name=None)) == brute_force_similar(combined, song_key, n, start, end)
+
+def test_unknown_song(index):
+    with pytest.raises(ValueError):
+        index.similar('No Song - Nobody')
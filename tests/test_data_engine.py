@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_engine import PandasEngine, get_engine
+from data_Preprocessing import DataPreprocessing
+from data_filtering import DataFiltering
+from data_upload import DataUpload, TABDB_COLUMN_RENAMES
+
+ENGINE_NAMES = ['pandas', 'polars']
+
+def make_sources():
+    """
+    Small tabdb/playdb/requestdb fixture covering the cases the engines must agree on. Missing
+    values are NaN, as pd.read_csv gives them.
+    """
+    tab_db = pd.DataFrame({
+        'song': ['Jolene', 'Zombie', 'Hey Jude', ' Wonderwall ', 'Dreams'],
+        'artist': ['Dolly Parton', 'The Cranberries', 'The Beatles', 'Oasis', 'The Cranberries'],
+        'year': [1973.0, 1994.0, 1968.0, np.nan, 1992.0],
+        'type': ['Person', 'Group', 'Group', 'Group', 'Group'],
+        'gender': ['female', 'female', 'male', 'male', 'female'],
+        'duration': ['00:02:42', '00:05:06', '00:07:11', '00:04:18', np.nan],
+        'language': ['english', 'english', 'english', 'english', 'english'],
+        'tabber': ['Bea', 'Bastien', 'Bea', np.nan, 'Bea'],
+        'source': ['new', 'old', 'new', 'old', 'new'],
+        'date': ['20220419', '20220823', ' ', '20230103', 'not a date'],
+        'difficulty': [2.1, 3.4, np.nan, 2.8, 1.9],
+        'specialbooks': ['halloween', np.nan, 'xmas', np.nan, 'halloween,xmas'],
+    })
+    tab_db = DataUpload().ensure_consistent_columns(tab_db, TABDB_COLUMN_RENAMES)
+    play_db = pd.DataFrame({
+        'song': ['Jolene', 'Zombie', 'Hey Jude', 'Wonderwall', 'Unknown Song'],
+        'artist': ['Dolly Parton', 'The Cranberries', 'The Beatles', 'Oasis', 'Nobody'],
+        '20220419': [14.0, np.nan, 13.5, np.nan, 12.0],
+        '20220823': [np.nan, 15.0, np.nan, 16.0, np.nan],
+        '20230103': [12.0, 14.0, np.nan, np.nan, np.nan],
+        'notadate': [1.0, np.nan, np.nan, np.nan, np.nan],
+    })
+    request_db = pd.DataFrame({
+        'song': ['Jolene', 'Zombie', 'Dreams'],
+        'artist': ['Dolly Parton', 'The Cranberries', 'The Cranberries'],
+        '20220419': ['A', np.nan, 'G'],
+        '20220823': [np.nan, 'A.', '?'],
+        '20230103': ['G', 'S', np.nan],
+    })
+    return play_db, request_db, tab_db
+
+def engine_or_skip(name):
+    if name == 'polars':
+        pytest.importorskip('polars')
+        pytest.importorskip('pyarrow')
+    return get_engine(name)
+
+def preprocess(engine):
+    preprocessor = DataPreprocessing(engine)
+    play_db, request_db, tab_db = make_sources()
+    return preprocessor.clean_data(preprocessor.preprocess_for_analysis(play_db, request_db, tab_db))
+
+@pytest.fixture(scope='module')
+def reference():
+    return preprocess(PandasEngine())
+
+@pytest.mark.parametrize('name', ENGINE_NAMES)
+def test_preprocess_matches_pandas(name, reference):
+    result = preprocess(engine_or_skip(name))
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(result, reference)
+
+@pytest.mark.parametrize('name', ENGINE_NAMES)
+@pytest.mark.parametrize('filters, date_range', [
+    ({'song': 'Zombie'}, None),
+    (None, (pd.Timestamp('2022-08-01'), pd.Timestamp('2023-01-31'))),
+    ({'type_of_performer': 'female', 'source': 'new'}, (pd.Timestamp('2022-04-19'), pd.Timestamp('2022-04-19'))),
+    ({'no_such_column': 'x'}, None),
+])
+def test_filter_data_matches_pandas(name, reference, filters, date_range):
+    expected = DataFiltering(PandasEngine()).filter_data(reference.copy(), filters, date_range)
+    result = DataFiltering(engine_or_skip(name)).filter_data(reference.copy(), filters, date_range)
+    pd.testing.assert_frame_equal(result, expected)
+
+@pytest.mark.parametrize('name', ENGINE_NAMES)
+def test_create_flags_matches_pandas(name, reference):
+    expected = DataFiltering(PandasEngine()).create_flags(reference.copy())
+    result = DataFiltering(engine_or_skip(name)).create_flags(reference.copy())
+    assert 'popularity_score' in result.columns
+    pd.testing.assert_frame_equal(result, expected)
+
+@pytest.mark.parametrize('name', ENGINE_NAMES)
+def test_standardize_text_columns_matches_pandas(name, reference):
+    columns = ['song', 'artist', 'language', 'not_a_column']
+    expected = DataFiltering(PandasEngine()).standardize_text_columns(reference.copy(), columns)
+    result = DataFiltering(engine_or_skip(name)).standardize_text_columns(reference.copy(), columns)
+    pd.testing.assert_frame_equal(result, expected)
+
+@pytest.mark.parametrize('name', ENGINE_NAMES)
+@pytest.mark.parametrize('subset', [None, ['song', 'artist'], ['dates']])
+def test_remove_duplicates_matches_pandas(name, reference, subset):
+    df = pd.concat([reference, reference.iloc[:3]])
+    expected = DataFiltering(PandasEngine()).remove_duplicates(df.copy(), subset)
+    result = DataFiltering(engine_or_skip(name)).remove_duplicates(df.copy(), subset)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_filtering import event_indicator
+from data_latency import RequestLatency
+
+def brute_force_lags(df, max_lag_weeks=None):
+    """Scans every play of the song for each request."""
+    df = df.dropna(subset=['dates'])
+    played = df[event_indicator(df['play_value']) > 0]
+    rows = []
+    for row in df[event_indicator(df['requested_value']) > 0].itertuples(index=False):
+        plays = played[(played['song'] == row.song) & (played['artist'] == row.artist) & (played['dates'] >= row.dates)]
+        if max_lag_weeks is not None:
+            plays = plays[plays['dates'] - row.dates <= pd.Timedelta(weeks=max_lag_weeks)]
+        rows.append((row.song, row.artist, row.requested_value, row.dates, plays['dates'].min()))
+    return pd.DataFrame(rows, columns=['song', 'artist', 'requested_by', 'request_date', 'play_date'])
+
+def sort_lags(lags):
+    return lags.sort_values(['song', 'artist', 'request_date', 'requested_by']).reset_index(drop=True)
+
+@pytest.mark.parametrize('max_lag_weeks', [None, 0, 4])
+def test_request_lags_match_brute_force(combined, max_lag_weeks):
+    lags = RequestLatency(max_lag_weeks).request_lags(combined)
+    expected = brute_force_lags(combined, max_lag_weeks)
+    pd.testing.assert_frame_equal(sort_lags(lags[expected.columns]), sort_lags(expected), check_dtype=False)
+    assert (lags['played'] == lags['play_date'].notna()).all()
+    assert (lags['lag_days'].dropna() >= 0).all()
+    if max_lag_weeks is not None:
+        assert (lags['lag_days'].dropna() <= 7 * max_lag_weeks).all()
+
+def test_lag_in_sessions():
+    df = pd.DataFrame({
+        'song': ['A', 'B', 'A', 'A'],
+        'artist': ['x', 'x', 'x', 'x'],
+        'dates': pd.to_datetime(['2022-01-04', '2022-01-11', '2022-02-01', '2022-02-08']),
+        'play_value': [np.nan, 12.0, np.nan, 13.0],
+        'requested_value': ['Audience', np.nan, 'Group', np.nan],
+    })
+    lags = RequestLatency().request_lags(df)
+    assert list(lags['lag_days']) == [35, 7]
+    # Only Tuesdays with any activity count as sessions
+    assert list(lags['lag_sessions']) == [3, 1]
+
+def test_summary(combined):
+    latency = RequestLatency(max_lag_weeks=8)
+    lags = latency.request_lags(combined)
+    summary = latency.summary(combined, lags=lags).set_index('requested_by')
+    counts = lags.groupby('requested_by')['played'].agg(['size', 'sum'])
+    assert (summary['requests'] == counts['size']).all()
+    assert (summary['played'] == counts['sum']).all()
+    np.testing.assert_allclose(summary['conversion_rate'], (counts['sum'] / counts['size']).round(3))
+
+    by_quarter = latency.summary(combined, freq='Q', start_date='2022-04-01', end_date='2022-06-30', lags=lags)
+    assert set(by_quarter['period']) == {'2022Q2'}
+    in_range = lags[(lags['request_date'] >= '2022-04-01') & (lags['request_date'] <= '2022-06-30')]
+    assert by_quarter['requests'].sum() == len(in_range)
+
+def test_missing_requester_column(combined):
+    with pytest.raises(ValueError):
+        RequestLatency().request_lags(combined.drop(columns=['requested_value']))
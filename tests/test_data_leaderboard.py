@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+from data_filtering import event_indicator, decade_labels
+from data_leaderboard import Leaderboard
+
+def brute_force_counts(df, dimension, metric, start, end):
+    df = df[(df['dates'] >= start) & (df['dates'] <= end)]
+    events = event_indicator(df['play_value' if metric == 'plays' else 'requested_value']) > 0
+    keys = {'song': df['song'] + ' - ' + df['artist'], 'artist': df['artist'],
+            'decade': decade_labels(df), 'requester': df['requested_value'].astype(str)}[dimension]
+    return keys[events].value_counts()
+
+@pytest.fixture
+def leaderboard(combined):
+    leaderboard = Leaderboard()
+    leaderboard.update(combined[combined['dates'] < pd.Timestamp('2022-04-01')])
+    leaderboard.update(combined)
+    return leaderboard
+
+@pytest.mark.parametrize('dimension, metric', [('song', 'plays'), ('artist', 'plays'), ('decade', 'plays'),
+                                               ('song', 'requests'), ('requester', 'requests')])
+@pytest.mark.parametrize('start, end', [('2022-01-01', '2022-12-31'), ('2022-03-01', '2022-05-31')])
+def test_top_k_matches_brute_force(leaderboard, combined, dimension, metric, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    counts = brute_force_counts(combined, dimension, metric, start, end)
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    top = leaderboard.top_k(dimension, start, end, k=5, metric=metric)
+    assert list(zip(top[dimension], top['count'])) == ranked[:5]
+
+    previous_end = start - pd.Timedelta(days=1)
+    previous = brute_force_counts(combined, dimension, metric, previous_end - (end - start), previous_end)
+    previous_ranks = {key: rank for rank, (key, _) in
+                      enumerate(sorted(previous.items(), key=lambda item: (-item[1], item[0])), start=1)}
+    result = [None if pd.isna(rank) else int(rank) for rank in top['previous_rank']]
+    assert result == [previous_ranks.get(key) for key in top[dimension]]
+
+def test_unknown_dimension(leaderboard):
+    with pytest.raises(ValueError):
+        leaderboard.top_k('song', '2022-01-01', '2022-12-31', metric='tabs')
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_matching import FuzzyMatcher, normalize_text
+
+TAB = pd.DataFrame({
+    'song': ['Wonderwall', 'Jolene', 'Yesterday', 'Song 2', 'Angel', 'Help!', 'Let It Be', 'Let It Bleed'],
+    'artist': ['Oasis', 'Dolly Parton', 'The Beatles', 'Blur', 'Sarah McLachlan', 'The Beatles', 'The Beatles',
+               'The Rolling Stones'],
+})
+
+@pytest.fixture
+def matcher(tmp_path):
+    matcher = FuzzyMatcher(alias_path=str(tmp_path / 'aliases.csv'), review_path=str(tmp_path / 'review.csv'))
+    matcher.build_index(TAB)
+    return matcher
+
+def test_normalize_text():
+    assert normalize_text('The Song (Remastered 2011) - Live') == 'song'
+    assert normalize_text('Beyoncé & Jay-Z feat. Someone', strip_versions=False) == 'beyonce and jay z'
+    assert normalize_text(np.nan) == ''
+
+@pytest.mark.parametrize('song, artist, expected, method', [
+    ('Wonderwall', 'Oasis', 'Wonderwall', 'exact'),
+    ('HELP', 'Beatles', 'Help!', 'normalized'),
+    ('Wonderwal', 'Oasis', 'Wonderwall', 'fuzzy'),
+    ('Jolenne', 'Dolly Parton', 'Jolene', 'fuzzy'),
+    ('Yesterdays', "Guns N' Roses", None, 'unmatched'),
+    ('Song 3', 'Blur', None, 'unmatched'),
+    ('Angie', 'Sarah McLachlan', None, 'unmatched'),
+])
+def test_match_one(matcher, song, artist, expected, method):
+    matched_song, _, _, matched_method = matcher.match_one(song, artist)
+    assert (matched_song, matched_method) == (expected, method)
+
+def test_close_candidates_go_to_review(tmp_path):
+    matcher = FuzzyMatcher(alias_path=str(tmp_path / 'aliases.csv'), review_path=str(tmp_path / 'review.csv'))
+    matcher.build_index(pd.DataFrame({'song': ['Jolene', 'Jolena'], 'artist': ['Dolly Parton', 'Dolly Parton']}))
+    assert matcher.match_one('Jolen', 'Dolly Parton')[3] == 'review'
+    df = pd.DataFrame({'song': ['Jolen'], 'artist': ['Dolly Parton'], '20220101': [12.0]})
+    pd.testing.assert_frame_equal(matcher.resolve(df), df)
+    matcher.save_aliases()
+    assert not (tmp_path / 'aliases.csv').exists()
+    assert list(pd.read_csv(tmp_path / 'review.csv')['song']) == ['Jolen']
+
+def test_resolve_combines_duplicates_and_keeps_missing_titles(matcher, tmp_path):
+    df = pd.DataFrame({
+        'song': ['Wonderwall', 'Wonderwal', np.nan, 'Jolene', np.nan],
+        'artist': ['Oasis', 'Oasis', 'Oasis', np.nan, 'Oasis'],
+        '20220101': [np.nan, 12.0, 13.0, 14.0, np.nan],
+        '20220108': [15.0, np.nan, np.nan, np.nan, 16.0],
+    })
+    resolved = matcher.resolve(df)
+    assert len(resolved) == 3
+    wonderwall = resolved[resolved['song'] == 'Wonderwall'].iloc[0]
+    assert (wonderwall['20220101'], wonderwall['20220108']) == (12.0, 15.0)
+    missing_song = resolved[resolved['song'].isna()].iloc[0]
+    assert (missing_song['20220101'], missing_song['20220108']) == (13.0, 16.0)
+    assert resolved['artist'].isna().sum() == 1
+
+    matcher.save_aliases()
+    aliases = FuzzyMatcher(alias_path=str(tmp_path / 'aliases.csv')).aliases
+    assert aliases == {('Wonderwal', 'Oasis'): ('Wonderwall', 'Oasis', 0.947)}
@@ -0,0 +1,67 @@
+import logging
+import pandas as pd
+import pytest
+from data_matching import FuzzyMatcher
+from data_pipeline_cache import CachedPreprocessing
+from data_Preprocessing import DataPreprocessing
+from test_data_engine import make_sources
+
+def make_pipeline(tmp_path, matcher=True):
+    matcher = FuzzyMatcher(alias_path=str(tmp_path / 'aliases.csv'),
+                           review_path=str(tmp_path / 'review.csv')) if matcher else None
+    return CachedPreprocessing(DataPreprocessing(), matcher, cache_dir=str(tmp_path / 'cache'))
+
+def ran_stages(caplog):
+    return {record.getMessage().split("'")[1] for record in caplog.records if record.getMessage().startswith('Ran stage')}
+
+def expected_result(matcher=None):
+    preprocessor = DataPreprocessing()
+    return preprocessor.clean_data(preprocessor.preprocess_for_analysis(*make_sources(), matcher=matcher))
+
+@pytest.fixture
+def caplog_info(caplog):
+    caplog.set_level(logging.INFO)
+    return caplog
+
+@pytest.mark.parametrize('matcher', [False, True])
+def test_matches_preprocess_for_analysis(tmp_path, matcher):
+    result, _ = make_pipeline(tmp_path, matcher).run(*make_sources())
+    expected = expected_result(FuzzyMatcher(alias_path=None, review_path=None) if matcher else None)
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_second_run_is_served_from_cache(tmp_path, caplog_info):
+    first, unmatched = make_pipeline(tmp_path).run(*make_sources())
+    assert (tmp_path / 'aliases.csv').exists()  # ' Wonderwall ' is saved as an alias
+    # clean_data drops the tabdb rows without a valid first play date, so 'Hey Jude' and 'Dreams' can't match
+    assert set(unmatched['song']) == {'Unknown Song', 'Hey Jude', 'Dreams'}
+
+    caplog_info.clear()
+    second, unmatched = make_pipeline(tmp_path).run(*make_sources())
+    assert ran_stages(caplog_info) == set()
+    pd.testing.assert_frame_equal(second, first)
+    assert set(unmatched['song']) == {'Unknown Song', 'Hey Jude', 'Dreams'}
+
+def test_play_change_only_reruns_play_stages(tmp_path, caplog_info):
+    pipeline = make_pipeline(tmp_path)
+    pipeline.run(*make_sources())
+    play_db, request_db, tab_db = make_sources()
+    play_db.loc[0, '20220823'] = 11.0
+
+    caplog_info.clear()
+    pipeline.run(play_db, request_db, tab_db)
+    assert ran_stages(caplog_info) == {'clean_play', 'resolve_play', 'reshape_play', 'merge_play_request',
+                                       'merge_tab', 'add_features', 'clean_combined'}
+
+def test_alias_edit_reruns_resolve(tmp_path, caplog_info):
+    pipeline = make_pipeline(tmp_path)
+    pipeline.run(*make_sources())
+    aliases = pd.read_csv(tmp_path / 'aliases.csv')
+    pd.concat([aliases, pd.DataFrame([{'song': 'Unknown Song', 'artist': 'Nobody', 'matched_song': 'Zombie',
+                                       'matched_artist': 'The Cranberries', 'confidence': 1.0}])]) \
+        .to_csv(tmp_path / 'aliases.csv', index=False)
+
+    caplog_info.clear()
+    result, unmatched = pipeline.run(*make_sources())
+    assert {'resolve_play', 'resolve_request'} <= ran_stages(caplog_info)
+    assert 'Unknown Song' not in set(unmatched['song'])
+    assert 'Unknown Song' not in set(result['song'])
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_filtering import DataFiltering, event_indicator
+from data_popularity import RollingPopularity
+
+def weekly_scores(df):
+    """One point per play and one per request, per song and Tuesday."""
+    scores = event_indicator(df['play_value']) + event_indicator(df['requested_value'])
+    return scores.groupby([df['song'], df['artist'], df['dates']]).sum().unstack(fill_value=0)
+
+@pytest.fixture
+def popularity(combined):
+    popularity = RollingPopularity(decay=0.8)
+    cut = pd.Timestamp('2022-05-01')
+    popularity.update(combined[combined['dates'] < cut])
+    popularity.update(combined)
+    return popularity
+
+@pytest.mark.parametrize('last_n_weeks, end_date', [(None, None), (4, None), (10, '2022-06-15'), (1, '2022-01-04')])
+def test_window_scores_match_brute_force(popularity, combined, last_n_weeks, end_date):
+    weekly = weekly_scores(combined)
+    weeks = weekly.columns
+    if end_date is not None:
+        weeks = weeks[weeks <= pd.Timestamp(end_date)]
+    if last_n_weeks is not None:
+        weeks = weeks[-last_n_weeks:]
+    expected = weekly[weeks].sum(axis=1).astype(float)
+    scores = popularity.window_scores(last_n_weeks, end_date)
+    pd.testing.assert_series_equal(scores.sort_index(), expected.sort_index(), check_names=False)
+
+def test_decayed_scores_match_brute_force(popularity, combined):
+    weekly = weekly_scores(combined)
+    weights = 0.8 ** np.arange(len(weekly.columns))[::-1]
+    expected = (weekly * weights).sum(axis=1)
+    pd.testing.assert_series_equal(popularity.decayed_scores().sort_index(), expected.sort_index(), check_names=False)
+
+def test_old_weeks_are_ignored(popularity, combined):
+    before = popularity.window_scores()
+    popularity.update(combined)
+    pd.testing.assert_series_equal(popularity.window_scores(), before)
+
+def test_filter_popular_songs_uses_window(popularity, combined):
+    scores = popularity.window_scores(8)
+    popular = DataFiltering().filter_popular_songs(combined, None, popularity, last_n_weeks=8)
+    expected = set(scores[scores >= scores.mean()].index)
+    assert set(zip(popular['song'], popular['artist'])) == expected
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from data_profiling import DataProfiler
+
+@pytest.fixture
+def tab_file(tmp_path):
+    df = pd.DataFrame({
+        'song': ['Zombie', 'Zombie', 'Unknown', '?', None, 'Creep'],
+        'date': ['20220104', '20220104', 'not a date', '20221399', None, '20220201'],
+        'duration': ['00:03:10', '00:03:10', 'Unknown', 'long', '00:04:00', None],
+        'year': [1994, 1994, None, 1992, 2001, 1993],
+    })
+    path = tmp_path / 'tabdb.csv'
+    df.to_csv(path, index=False)
+    return path
+
+def test_column_statistics(tab_file):
+    report = DataProfiler().profile_file(str(tab_file), chunksize=4)
+    assert report['rows'] == 6 and report['duplicate_rows'] == 1
+    song = report['columns']['song']
+    assert (song['null_rate'], song['unknown_rate'], song['question_mark_rate']) == (0.1667, 0.1667, 0.1667)
+    assert song['cardinality'] == 4
+    assert report['columns']['date']['unparseable'] == 2
+    assert report['columns']['duration']['unparseable'] == 1
+    year = report['columns']['year']
+    assert (year['min'], year['max'], year['cardinality']) == (1992.0, 2001.0, 4)
+
+def test_unparseable_date_headers(tmp_path):
+    path = tmp_path / 'playdb.csv'
+    pd.DataFrame({'song': ['Zombie'], '20220104': [1.0], '20221399': [0.0]}).to_csv(path, index=False)
+    assert DataProfiler().profile_file(str(path))['unparseable_date_headers'] == ['20221399']
+
+@pytest.mark.parametrize('chunksize', [2, 4, 50000])
+def test_frame_matches_file(tab_file, chunksize):
+    profiler = DataProfiler()
+    from_file = profiler.profile_file(str(tab_file), chunksize=chunksize)
+    from_frame = profiler.profile_frame(pd.read_csv(tab_file), name='tabdb.csv', chunksize=chunksize)
+    assert from_frame == from_file
+
+def test_summary_frame(tab_file):
+    profiler = DataProfiler()
+    summary = profiler.summary_frame(profiler.profile_file(str(tab_file)))
+    assert list(summary['column']) == ['song', 'date', 'duration', 'year']
+    assert 'null_rate' in summary.columns
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_sketches import HyperLogLog, KLLSketch, SketchStore
+from data_filtering import event_indicator, new_sessions, decade_labels
+
+@pytest.mark.parametrize('n', [50, 2000, 100000])
+def test_hyperloglog_within_error(n):
+    sketch = HyperLogLog(p=12)
+    sketch.add([f'song {i}' for i in range(n)] * 2)
+    assert abs(sketch.count() - n) <= 3 * sketch.relative_error * n + 1
+
+def test_hyperloglog_merge_equals_union():
+    left, right, union = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+    left.add(range(0, 3000))
+    right.add(range(2000, 2100))  # Still sparse when merged into the dense left sketch
+    union.add(range(0, 3000))
+    assert left.merge(right).count() == union.count()
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(11))
+
+def test_kll_rank_error():
+    values = np.random.default_rng(0).normal(size=100000)
+    sketch = KLLSketch(k=200, seed=0)
+    sketch.update(values[:60000])
+    other = KLLSketch(k=200, seed=1)
+    other.update(values[60000:])
+    sketch.merge(other)
+    assert sketch.n == len(values)
+    qs = [0.01, 0.25, 0.5, 0.9, 0.99]
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / len(values)
+    assert np.all(np.abs(ranks - qs) <= sketch.rank_error)
+    assert np.isnan(KLLSketch().quantiles([0.5])[0])
+
+def test_store_bounds_contain_exact_counts(combined):
+    store = SketchStore()
+    store.update(combined)
+    played = combined[event_indicator(combined['play_value']) > 0]
+    played = played.assign(decade=decade_labels(played))
+    result = store.distinct_count('song', group_column='decade').set_index('decade')
+    exact = (played['song'] + ' - ' + played['artist']).groupby(played['decade']).nunique()
+    assert (result['low'] <= exact).all() and (exact <= result['high']).all()
+
+    quantiles = store.quantiles('difficulty', qs=(0.5,), start_date='2022-03-01', end_date='2022-06-30')
+    in_range = played[(played['dates'] >= '2022-03-01') & (played['dates'] <= '2022-06-30')]['difficulty']
+    assert quantiles['count'].iloc[0] == len(in_range)
+    rank = (in_range < quantiles['q50'].iloc[0]).mean()
+    assert abs(rank - 0.5) <= quantiles['rank_error'].iloc[0] + 1 / len(in_range)
+
+def test_incremental_and_merged_stores_match_full(combined):
+    full = SketchStore()
+    full.update(combined)
+    cut = pd.Timestamp('2022-06-01')
+    incremental = SketchStore()
+    incremental.update(combined[combined['dates'] < cut])
+    incremental.update(combined)
+    merged = SketchStore()
+    merged.update(combined[combined['dates'] < cut])
+    later = SketchStore()
+    later.update(combined[combined['dates'] >= cut])
+    merged.merge(later)
+    for store in (incremental, merged):
+        assert store.dates == full.dates
+        pd.testing.assert_frame_equal(store.distinct_count('artist', freq='M'), full.distinct_count('artist', freq='M'))
+        pd.testing.assert_frame_equal(store.quantiles('duration', group_column='language'),
+                                      full.quantiles('duration', group_column='language'))
+
+def test_new_sessions(combined):
+    df, dates = new_sessions(combined)
+    assert len(df) == len(combined)
+    last = pd.Timestamp('2022-06-07')
+    df, dates = new_sessions(combined.assign(dates=combined['dates'] + pd.Timedelta(hours=20)), last)
+    assert (dates > last).all() and (dates == dates.dt.normalize()).all()
+    assert len(df) == int((combined['dates'] > last).sum())
+
+def test_decade_labels():
+    df = pd.DataFrame({'year': pd.array([1994, None, 2001], dtype='Int64')})
+    assert list(decade_labels(df)) == ['1990s', 'Unknown', '2000s']
+    assert list(decade_labels(df.assign(decade=[1980, None, 2000]))) == ['1980s', 'Unknown', '2000s']
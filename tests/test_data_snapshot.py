@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_snapshot import DataSnapshot, load_dataset
+
+@pytest.fixture
+def source_paths(tmp_path):
+    paths = {}
+    for name in ['tabdb', 'playdb', 'requestdb']:
+        path = tmp_path / f'{name}.csv'
+        path.write_text(f'{name}\n')
+        paths[name] = str(path)
+    return paths
+
+@pytest.fixture
+def snapshot(tmp_path, combined, source_paths):
+    snapshot = DataSnapshot(str(tmp_path / 'snapshot'))
+    snapshot.save(combined, source_paths)
+    return snapshot
+
+def test_roundtrip(snapshot, combined):
+    pd.testing.assert_frame_equal(snapshot.load(), combined)
+    pd.testing.assert_frame_equal(snapshot.load(mmap=True), combined)
+    assert snapshot.rows() == len(combined)
+    assert snapshot.columns() == list(combined.columns)
+
+def test_iter_chunks_matches_load(snapshot, combined):
+    chunks = list(snapshot.iter_chunks(chunksize=128))
+    assert [len(chunk) for chunk in chunks] == [128, 128, 128, 128, 88]
+    pd.testing.assert_frame_equal(pd.concat(chunks), combined)
+
+@pytest.mark.parametrize('start, end', [
+    ('2022-01-04', '2022-10-04'),
+    ('2022-03-01', '2022-03-31'),
+    ('2022-05-10', '2022-05-10'),
+    ('2021-01-01', '2021-12-31'),
+    ('2022-09-01', '2030-01-01'),
+])
+def test_rows_between_matches_mask(snapshot, combined, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    expected = np.flatnonzero(((combined['dates'] >= start) & (combined['dates'] <= end)).to_numpy())
+    np.testing.assert_array_equal(snapshot.rows_between(start, end), expected)
+
+def test_rows_between_without_index(tmp_path, combined, source_paths):
+    snapshot = DataSnapshot(str(tmp_path / 'snapshot'))
+    snapshot.save(combined.drop(columns=['dates']), source_paths)
+    assert snapshot.rows_between('2022-01-04', '2022-10-04') is None
+
+def test_fingerprint_tracks_source_files(snapshot, source_paths):
+    assert snapshot.is_valid()
+    assert DataSnapshot(snapshot.snapshot_dir).saved_fingerprint() == snapshot.fingerprint(source_paths)
+    with open(source_paths['playdb'], 'a') as f:
+        f.write('changed\n')
+    assert not DataSnapshot(snapshot.snapshot_dir).is_valid()
+
+def test_load_dataset_prefers_snapshot(tmp_path, snapshot, combined):
+    pd.testing.assert_frame_equal(load_dataset(snapshot_dir=snapshot.snapshot_dir), combined)
+    csv_path = tmp_path / 'combined.csv'
+    combined.to_csv(csv_path, index=False)
+    from_csv = load_dataset(str(csv_path), snapshot.snapshot_dir)
+    pd.testing.assert_series_equal(from_csv['dates'], combined['dates'], check_dtype=False)
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from data_snapshot import DataSnapshot
+from data_sql_backend import SQLiteQueryBackend
+
+COLUMNS = ['song', 'artist', 'dates', 'play_value', 'language']
+
+def pandas_play_counts(df, columns, start, end, filters=None):
+    """The Data Query window's in-memory query, which the SQL query must reproduce."""
+    df = df[(df['dates'] >= start) & (df['dates'] <= end)]
+    for col, value in (filters or {}).items():
+        df = df[df[col] == value]
+    result = df[columns].copy()
+    result['play_value'] = result['play_value'].apply(lambda x: 1 if x != 0 else 0)
+    result['play_count'] = result.groupby(['song', 'artist'])['play_value'].transform('sum')
+    return result.drop_duplicates(subset=['song', 'artist', 'dates']).reset_index(drop=True)
+
+def sql_play_counts(backend, columns, start, end, filters=None):
+    pages = list(backend.query_play_counts(columns, (start, end), filters, page_size=50))
+    return pd.concat(pages, ignore_index=True)
+
+@pytest.fixture(params=['dataframe', 'snapshot'])
+def backend(request, tmp_path, combined):
+    backend = SQLiteQueryBackend(str(tmp_path / 'combined.sqlite'))
+    if request.param == 'dataframe':
+        backend.load_dataframe(combined, version='v1', chunksize=100)
+    else:
+        snapshot = DataSnapshot(str(tmp_path / 'snapshot'))
+        snapshot.save(combined, {})
+        backend.load_snapshot(snapshot, version='v1', chunksize=100)
+    return backend
+
+def test_version_and_columns(backend, combined, tmp_path):
+    assert backend.version() == 'v1'
+    assert backend.columns() == list(combined.columns)
+    assert SQLiteQueryBackend(str(tmp_path / 'missing.sqlite')).version() is None
+
+@pytest.mark.parametrize('start, end, filters', [
+    ('2022-01-01', '2022-12-31', None),
+    ('2022-03-01', '2022-05-31', None),
+    ('2022-02-01', '2022-08-31', {'language': 'french'}),
+    ('2021-01-01', '2021-12-31', None),
+])
+def test_play_counts_match_pandas(backend, combined, start, end, filters):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    expected = pandas_play_counts(combined, COLUMNS, start, end, filters)
+    result = sql_play_counts(backend, COLUMNS, start, end, filters)
+    assert list(result.columns) == COLUMNS + ['play_count']
+    if expected.empty:
+        assert result.empty
+    else:
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+def test_reload_replaces_data(backend, combined):
+    backend.load_dataframe(combined.iloc[:10], version='v2')
+    assert backend.version() == 'v2'
+    result = sql_play_counts(backend, COLUMNS, pd.Timestamp('2022-01-01'), pd.Timestamp('2022-12-31'))
+    assert len(result) == len(combined.iloc[:10].drop_duplicates(subset=['song', 'artist', 'dates']))
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_timeseries import WeeklySeries, lttb
+
+@pytest.mark.parametrize('group_column', [None, 'language'])
+def test_incremental_matches_full(combined, group_column):
+    # French is only sung from May, so its column is added by the second update
+    cut = pd.Timestamp('2022-05-01')
+    data = combined[(combined['dates'] >= cut) | (combined['language'] != 'french')]
+    full = WeeklySeries(group_column)
+    full.update(data)
+    incremental = WeeklySeries(group_column)
+    incremental.update(data[data['dates'] < cut])
+    assert 'french' not in incremental.counts.columns
+    incremental.update(data[data['dates'] >= cut])
+    incremental.update(data)  # Nothing newer, so nothing changes
+
+    pd.testing.assert_frame_equal(incremental.counts, full.counts, check_like=True)
+    pd.testing.assert_frame_equal(incremental.cumulative(), full.cumulative(), check_like=True, check_dtype=False)
+    pd.testing.assert_frame_equal(full.cumulative(), full.counts.cumsum(), check_dtype=False)
+    assert full.counts.to_numpy().sum() == len(data)
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 10.0
+    indices = lttb(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices
+
+@pytest.mark.parametrize('n_out', [2, 10, 20])
+def test_lttb_without_downsampling(n_out):
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), n_out), np.arange(10))
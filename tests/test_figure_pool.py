@@ -0,0 +1,69 @@
+import matplotlib.pyplot as plt
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from figure_pool import FigurePool, FigureViewer
+
+def add_figures(pool, count):
+    for i in range(count):
+        fig = pool.new_figure()
+        fig.gca().plot([0, i])
+        pool.add(f'Chart {i}', fig)
+
+@pytest.fixture
+def pool():
+    pool = FigurePool(max_figures=3, max_render_bytes=2 * 100 * 100 * 4)
+    yield pool
+    pool.clear()
+
+@pytest.fixture
+def viewer(pool):
+    return FigureViewer(None, pool, canvas_class=lambda fig, master: FigureCanvasAgg(fig))
+
+def test_add_releases_pyplot_reference(pool):
+    add_figures(pool, 2)
+    assert plt.get_fignums() == []
+    assert pool.names() == ['Chart 0', 'Chart 1']
+
+def test_evicts_least_recently_viewed(pool):
+    add_figures(pool, 3)
+    pool.get('Chart 0')
+    pool.add('Chart 3', pool.new_figure())
+    assert pool.names() == ['Chart 0', 'Chart 2', 'Chart 3']
+
+def test_pinned_figure_is_kept(pool):
+    add_figures(pool, 3)
+    pool.pinned = 'Chart 0'
+    pool.add('Chart 3', pool.new_figure())
+    pool.add('Chart 4', pool.new_figure())
+    assert 'Chart 0' in pool.names() and len(pool) == 3
+
+def test_replacing_a_name_drops_its_renders(pool):
+    add_figures(pool, 1)
+    pool.store_render('Chart 0', (100, 100), object())
+    pool.add('Chart 0', pool.new_figure())
+    assert pool.cached_render('Chart 0', (100, 100)) is None and len(pool) == 1
+
+def test_render_cache_is_bounded(pool):
+    add_figures(pool, 3)
+    for name in pool.names():
+        pool.store_render(name, (100, 100), name)
+    assert pool.cached_render('Chart 0', (100, 100)) is None
+    assert pool.cached_render('Chart 2', (100, 100)) == 'Chart 2'
+
+def test_viewer_caches_renders(pool, viewer):
+    add_figures(pool, 2)
+    assert viewer.show(0) == 'Chart 0'
+    assert pool.pinned == 'Chart 0'
+    size = tuple(int(round(value)) for value in pool.get('Chart 0').bbox.size)
+    assert pool.cached_render('Chart 0', size) is not None
+    assert viewer.next() == 'Chart 1'
+    assert viewer.next() == 'Chart 0'
+    assert viewer.previous() == 'Chart 1'
+    assert viewer.show_name('Chart 0') == 'Chart 0'
+
+def test_viewer_releases_last_figure(pool, viewer):
+    add_figures(pool, 1)
+    viewer.show(0)
+    pool.clear()
+    assert viewer.show() is None
+    assert pool.pinned is None
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from data_filtering import event_indicator
+from data_snapshot import DataSnapshot
+from query_service import QueryService
+
+@pytest.fixture(params=['csv', 'snapshot'])
+def service(request, tmp_path, combined):
+    if request.param == 'csv':
+        path = tmp_path / 'combined.csv'
+        combined.to_csv(path, index=False)
+        return QueryService(data_path=str(path), snapshot_dir=str(tmp_path / 'none'))
+    DataSnapshot(str(tmp_path / 'snapshot')).save(combined, {})
+    return QueryService(snapshot_dir=str(tmp_path / 'snapshot'))
+
+def get(service, *requests):
+    """Sends GET requests, each a path or (path, headers), and returns (status, headers, body) for each."""
+    async def run():
+        async with TestClient(TestServer(service.create_app())) as client:
+            responses = []
+            for request in requests:
+                path, headers = request if isinstance(request, tuple) else (request, None)
+                response = await client.get(path, headers=headers)
+                body = await response.text()
+                responses.append((response.status, response.headers, json.loads(body) if body else None))
+            return responses
+    return asyncio.run(run())
+
+def test_play_counts(service, combined):
+    [(status, _, body)] = get(service, '/play_counts?group_by=song,artist&language=irish&start=2022-03-01&end=2022-06-30')
+    assert status == 200
+    df = combined[(combined['language'] == 'irish') & (combined['dates'] >= '2022-03-01') & (combined['dates'] <= '2022-06-30')]
+    expected = event_indicator(df['play_value']).groupby([df['song'], df['artist']]).sum()
+    result = {(row['song'], row['artist']): row['plays'] for row in body['results']}
+    assert result == expected.to_dict()
+    assert [row['plays'] for row in body['results']] == sorted(result.values(), reverse=True)
+
+def test_group_counts_with_top(service, combined):
+    [(_, _, body)] = get(service, '/group_counts?column=song&top=5')
+    counts = combined['song'].value_counts()
+    assert len(body['results']) == 6
+    assert body['results'][-1] == {'song': 'Other', 'count': int(counts.iloc[5:].sum())}
+    assert sum(row['count'] for row in body['results']) == len(combined)
+
+def test_etag_and_errors(service):
+    (status, headers, first), (cached_status, _, _), (bad_status, _, error), (missing_status, _, _) = get(
+        service, '/health', ('/health', None), '/group_counts?column=nope', '/play_counts?nope=1')
+    assert status == 200 and first['results'][0]['rows'] == 600
+    [(not_modified, _, _)] = get(service, ('/health', {'If-None-Match': headers['ETag']}))
+    assert cached_status == 200 and not_modified == 304
+    assert bad_status == 400 and 'nope' in error['error']
+    assert missing_status == 400
+
+def test_request_latency(service):
+    [(status, _, body)] = get(service, '/request_latency?freq=Q&max_lag_weeks=4&start=2022-04-01&end=2022-09-30')
+    assert status == 200
+    assert {row['period'] for row in body['results']} == {'2022Q2', '2022Q3'}
+
+def test_no_dataset(tmp_path):
+    service = QueryService(data_path=str(tmp_path / 'missing.csv'))
+    [(status, _, body)] = get(service, '/health')
+    assert status == 503